@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_bars.py
+@Description: K线合成基准：生成多合约交错、跨午夜的精简格式行情，按块送入BarEngine，统计不同周期组合下的吞吐
+              不需要连接前置
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ctp_api.bars import BarEngine
+from ctp_api.recorder import PACKED_TICK_DTYPE
+
+
+def make_ticks(n: int, instruments: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    ticks = np.zeros(n, dtype=PACKED_TICK_DTYPE)
+    ticks['instrument'] = rng.integers(0, instruments, n)
+    # 21:00 到次日 01:00，覆盖夜盘跨午夜
+    ticks['time_ms'] = np.linspace(21 * 3_600_000, 25 * 3_600_000, n).astype(np.int64) % 86_400_000
+    ticks['last_price'] = 3000.0 + rng.integers(0, 100, n)
+    ticks['volume'] = np.arange(n) // instruments
+    ticks['turnover'] = ticks['volume'] * 30000.0
+    ticks['open_interest'] = 100000.0
+    return ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="K线合成基准")
+    parser.add_argument("-n", "--ticks", type=int, default=4_000_000, help="行情条数")
+    parser.add_argument("--instruments", type=int, default=500, help="合约数")
+    parser.add_argument("--chunk", type=int, default=1 << 16, help="每批行情条数")
+    args = parser.parse_args()
+
+    ticks = make_ticks(args.ticks, args.instruments)
+    names = [f"rb{2500 + i:04d}" for i in range(args.instruments)]
+    print(f"{'周期':>12}{'K线':>10}{'耗时(s)':>10}{'条/秒':>14}")
+    for intervals in ((60,), (1,), (1, 60, 300)):
+        engine = BarEngine(intervals)
+        bars = 0
+        start = time.perf_counter()
+        for i in range(0, len(ticks), args.chunk):
+            bars += sum(len(v) for v in engine.update(ticks[i:i + args.chunk], 20251208, names).values())
+        bars += sum(len(v) for v in engine.flush().values())
+        elapsed = time.perf_counter() - start
+        label = ','.join(str(v) for v in intervals)
+        print(f"{label:>12}{bars:>10}{elapsed:>10.3f}{len(ticks) / elapsed:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_bus.py
+@Description: 共享内存行情总线基准：主进程发布行情，多个订阅进程按合约过滤读取，统计吞吐、丢失和缺失
+              不需要连接前置
+"""
+import argparse
+import multiprocessing as mp
+import os
+import time
+
+import ctp_api.thostmduserapi as mdapi
+from ctp_api.bus import GapDetector, bus_path, stream
+
+
+def subscriber_main(path: str, instruments: list[str], ready, results) -> None:
+    subscriber = mdapi.TickBusSubscriber(path)
+    if instruments:
+        subscriber.subscribe(instruments)
+    detector = GapDetector()
+    received = 0
+    ready.set()
+    start = None
+    for records in stream(subscriber, timeout=5.0):
+        if start is None:
+            start = time.perf_counter()
+        received += len(records)
+        detector.update(records)
+    elapsed = time.perf_counter() - start if start is not None else 0.0
+    results.put((len(instruments), received, subscriber.lost(), detector.missing, elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享内存行情总线基准")
+    parser.add_argument("-n", "--ticks", type=int, default=500000, help="发布的行情条数")
+    parser.add_argument("-s", "--subscribers", type=int, default=4, help="订阅进程数")
+    parser.add_argument("--instruments", type=int, default=400, help="合约数")
+    parser.add_argument("--capacity", type=int, default=1 << 16, help="环形缓冲区槽位数")
+    args = parser.parse_args()
+
+    path = bus_path(f"bench_{os.getpid()}")
+    publisher = mdapi.TickBusPublisher(path, args.capacity)
+    names = [f"rb{2500 + i:04d}" for i in range(args.instruments)]
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    workers = []
+    for k in range(args.subscribers):
+        # 第一个订阅进程接收全部合约，其余各自订阅一部分
+        subset = [] if k == 0 else names[k - 1::max(args.subscribers - 1, 1)]
+        ready = ctx.Event()
+        worker = ctx.Process(target=subscriber_main, args=(path, subset, ready, results))
+        worker.start()
+        ready.wait()
+        workers.append(worker)
+
+    ticks = []
+    for name in names:
+        tick = mdapi.CThostFtdcDepthMarketDataField()
+        tick.InstrumentID = name
+        tick.TradingDay = "20251204"
+        ticks.append(tick)
+    start = time.perf_counter()
+    for i in range(args.ticks):
+        tick = ticks[i % len(ticks)]
+        publisher.publish(tick)
+    elapsed = time.perf_counter() - start
+    publisher.close()
+    print(f"发布: {args.ticks} 条, {args.ticks / elapsed:,.0f} 条/秒（Python循环逐条publish）")
+
+    print(f"{'订阅合约数':>10}{'收到':>12}{'丢失':>10}{'缺失':>10}{'条/秒':>14}")
+    for _ in workers:
+        count, received, lost, missing, seconds = results.get()
+        rate = received / seconds if seconds else 0.0
+        print(f"{count or args.instruments:>10}{received:>12}{lost:>10}{missing:>10}{rate:>14,.0f}")
+    for worker in workers:
+        worker.join()
+    os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_dispatch.py
+@Description: 回调分发吞吐与延迟基准，需要以 python build.py --fake-ctp 构建（链接本地模拟前置）
+              模拟前置在行情的PreDelta字段中写入发送时刻的steady_clock纳秒数，
+              与time.perf_counter_ns()相减即为从CTP线程发出到Python收到的分发延迟
+              director：Python子类的OnRtnDepthMarketData；queue：MdTickQueueSpi批量读取；
+              trader：Python子类的OnRtnOrder/OnRtnTrade
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+
+def percentiles(latencies_ns) -> str:
+    if not len(latencies_ns):
+        return "无数据"
+    p50, p99 = np.percentile(np.asarray(latencies_ns, dtype=np.float64), [50, 99]) / 1000.0
+    return f"p50 {p50:8.1f} us  p99 {p99:8.1f} us"
+
+
+def report(name: str, count: int, elapsed: float, latencies_ns=None):
+    rate = count / elapsed if elapsed > 0 else 0.0
+    line = f"{name:<10}{count:>10} 次  {rate:>12,.0f} 次/秒"
+    if latencies_ns is not None:
+        line += "  " + percentiles(latencies_ns)
+    print(line)
+
+
+def bench_md(mode: str, count: int, instruments: list[str]):
+    import ctp_api.thostmduserapi as mdapi
+
+    base = mdapi.MdTickQueueSpi if mode == 'queue' else mdapi.CThostFtdcMdSpi
+    done = threading.Event()
+
+    class Spi(base):
+        def __init__(self):
+            base.__init__(self, *((1 << 20,) if mode == 'queue' else ()))
+            self.api = None
+            self.received = 0
+            self.latencies = []
+            self.first = self.last = 0.0
+
+        def OnFrontConnected(self):
+            self.api.ReqUserLogin(mdapi.CThostFtdcReqUserLoginField(), 1)
+
+        def OnRspUserLogin(self, *args):
+            self.api.subscribe_market_data(instruments)
+
+        if mode == 'director':
+            def OnRtnDepthMarketData(self, tick):
+                now = time.perf_counter_ns()
+                self.latencies.append(now - tick.PreDelta)
+                if not self.received:
+                    self.first = time.perf_counter()
+                self.received += 1
+                if self.received >= count:
+                    self.last = time.perf_counter()
+                    done.set()
+
+    api = mdapi.CThostFtdcMdApi.CreateFtdcMdApi("")
+    if mdapi.CThostFtdcMdApi.GetApiVersion() != "FakeCTP":
+        raise SystemExit("需要链接模拟前置：python build.py --fake-ctp")
+    spi = Spi()
+    spi.api = api
+    api.RegisterSpi(spi)
+    api.RegisterFront("tcp://127.0.0.1:0")
+    api.Init()
+
+    if mode == 'queue':
+        out = np.empty(4096, dtype=mdapi.DepthMarketData_dtype)
+        while spi.received < count:
+            if not spi.wait(1000):
+                continue
+            batch = spi.drain(len(out), out)
+            now = time.perf_counter_ns()
+            if not spi.received:
+                spi.first = time.perf_counter()
+            spi.latencies.append(now - batch['PreDelta'])
+            spi.received += len(batch)
+        spi.last = time.perf_counter()
+        spi.latencies = np.concatenate(spi.latencies)
+    else:
+        done.wait()
+    api.RegisterSpi(None)
+    api.Release()
+    report(mode, spi.received, spi.last - spi.first, spi.latencies)
+
+
+def bench_trader(count: int):
+    import ctp_api.thosttraderapi as traderapi
+
+    done = threading.Event()
+
+    class Spi(traderapi.CThostFtdcTraderSpi):
+        def __init__(self):
+            traderapi.CThostFtdcTraderSpi.__init__(self)
+            self.received = 0
+            self.first = self.last = 0.0
+
+        def _count(self):
+            if not self.received:
+                self.first = time.perf_counter()
+            self.received += 1
+            if self.received >= count:
+                self.last = time.perf_counter()
+                done.set()
+
+        def OnRtnOrder(self, order):
+            self._count()
+
+        def OnRtnTrade(self, trade):
+            self._count()
+
+    api = traderapi.CThostFtdcTraderApi.CreateFtdcTraderApi("")
+    spi = Spi()
+    api.RegisterSpi(spi)
+    api.RegisterFront("tcp://127.0.0.1:0")
+    api.Init()
+    done.wait()
+    api.RegisterSpi(None)
+    api.Release()
+    report('trader', spi.received, spi.last - spi.first)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回调分发吞吐与延迟基准（模拟前置）")
+    parser.add_argument("--mode", choices=["director", "queue", "trader", "all"], default="all")
+    parser.add_argument("-n", "--count", type=int, default=200_000, help="每项测试接收的回调数")
+    parser.add_argument("--rate", type=float, default=1_000_000, help="模拟前置每秒推送条数")
+    parser.add_argument("--instruments", type=int, default=100, help="订阅的合约数")
+    args = parser.parse_args()
+
+    # 模拟前置在创建API时读取推送速率
+    os.environ["CTP_FAKE_TICK_RATE"] = str(args.rate)
+    os.environ["CTP_FAKE_ORDER_RATE"] = str(args.rate)
+    instruments = [f"FAKE{i:04d}" for i in range(args.instruments)]
+    modes = ["director", "queue", "trader"] if args.mode == "all" else [args.mode]
+    for mode in modes:
+        if mode == "trader":
+            bench_trader(args.count)
+        else:
+            bench_md(mode, args.count, instruments)
+
+    # 以 python build.py --probes 构建时，列出各回调的GIL等待与处理耗时分布
+    from ctp_api import probes, thostmduserapi, thosttraderapi
+    for module in (thostmduserapi, thosttraderapi):
+        if module.probe_enabled():
+            print(f"\n{module.__name__}")
+            print(probes.report(module))
+
+
+if __name__ == '__main__':
+    main()
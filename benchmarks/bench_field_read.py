@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_field_read.py
+@Description: 结构体字段读取开销基准，分别测试ASCII字符串、中文字符串和数值字段
+              在构建前后各运行一次即可对比char[ANY]类型映射的改动效果
+"""
+import argparse
+import ctypes
+import time
+
+import ctp_api.thostmduserapi as mdapi
+
+
+def bench_attr(obj, name: str, iterations: int) -> float:
+    """返回单次读取obj.name的平均耗时（纳秒）"""
+    descriptor = type(obj).__dict__[name]
+    # 默认构建为property，-builtin构建为getset_descriptor
+    getter = getattr(descriptor, 'fget', None) or descriptor.__get__
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        getter(obj)
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def make_market_data() -> mdapi.CThostFtdcDepthMarketDataField:
+    """构造一条典型的深度行情"""
+    field = mdapi.CThostFtdcDepthMarketDataField()
+    field.InstrumentID = "rb2510"
+    field.ExchangeID = "SHFE"
+    field.TradingDay = "20250303"
+    field.UpdateTime = "21:00:01"
+    field.LastPrice = 3321.0
+    field.Volume = 123456
+    return field
+
+
+def make_rsp_info() -> mdapi.CThostFtdcRspInfoField:
+    """构造一条含中文错误信息的响应，直接写入GB18030字节模拟CTP前置返回的数据"""
+    field = mdapi.CThostFtdcRspInfoField()
+    field.ErrorID = 3
+    raw = "CTP:不合法的登录".encode("gb18030") + b"\0"
+    offset = ctypes.sizeof(ctypes.c_int)
+    field._raw_view()[offset:offset + len(raw)] = raw
+    return field
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CTP结构体字段读取开销基准")
+    parser.add_argument("-n", "--iterations", type=int, default=1_000_000, help="每个字段的读取次数")
+    args = parser.parse_args()
+
+    market_data = make_market_data()
+    rsp_info = make_rsp_info()
+    cases = [
+        (market_data, "InstrumentID"),
+        (market_data, "ExchangeID"),
+        (market_data, "TradingDay"),
+        (market_data, "UpdateTime"),
+        (market_data, "LastPrice"),
+        (market_data, "Volume"),
+        (rsp_info, "ErrorMsg"),
+    ]
+
+    print(f"{'字段':<32}{'ns/次':>10}")
+    for obj, name in cases:
+        cost = bench_attr(obj, name, args.iterations)
+        print(f"{type(obj).__name__[10:-5] + '.' + name:<32}{cost:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+// char[ANY]输出类型映射的微基准：对比旧的codecvt + wstring_convert实现与ctp_native::gb18030_to_pystr
+// 运行方式：meson test -C build --benchmark gb18030
+#include <Python.h>
+
+#include <chrono>
+#include <codecvt>
+#include <cstdio>
+#include <cstring>
+#include <locale>
+#include <memory>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include "ctp_encoding.h"
+
+using namespace std;
+
+namespace {
+
+constexpr int kIterations = 1000000;
+
+// 旧版类型映射中的转换逻辑（每次读取构造std::string、wchar_t缓冲区和wstring_convert）
+PyObject *legacy_to_pystr(const locale &loc, const char *field)
+{
+    const std::string &gb2312(field);
+    std::vector<wchar_t> wstr(gb2312.size());
+    wchar_t *wstrEnd = nullptr;
+    const char *gbEnd = nullptr;
+    mbstate_t state = {};
+    int res = use_facet<codecvt<wchar_t, char, mbstate_t>>(loc).in(
+        state, gb2312.data(), gb2312.data() + gb2312.size(), gbEnd,
+        wstr.data(), wstr.data() + wstr.size(), wstrEnd);
+    std::string result;
+    if (codecvt_base::ok == res)
+    {
+        wstring_convert<codecvt_utf8<wchar_t>> cutf8;
+        result = cutf8.to_bytes(wstring(wstr.data(), wstrEnd));
+    }
+    return PyUnicode_DecodeUTF8(result.c_str(), static_cast<Py_ssize_t>(result.size()), "strict");
+}
+
+template <typename Fn>
+double ns_per_call(Fn &&fn)
+{
+    auto start = chrono::steady_clock::now();
+    for (int i = 0; i < kIterations; ++i)
+    {
+        PyObject *obj = fn();
+        Py_XDECREF(obj);
+    }
+    auto elapsed = chrono::steady_clock::now() - start;
+    return chrono::duration<double, nano>(elapsed).count() / kIterations;
+}
+
+unique_ptr<locale> make_legacy_locale()
+{
+    try
+    {
+#ifdef _MSC_VER
+        return make_unique<locale>("zh-CN");
+#else
+        return make_unique<locale>("zh_CN.GB18030");
+#endif
+    }
+    catch (const runtime_error &)
+    {
+        return nullptr;
+    }
+}
+
+}  // namespace
+
+int main()
+{
+    Py_Initialize();
+
+    struct Sample
+    {
+        const char *name;
+        char field[81];
+    };
+    vector<Sample> samples = {
+        {"InstrumentID", "rb2510"},
+        {"UpdateTime", "21:00:01"},
+        {"OrderSysID", "      123456"},
+        {"ErrorMsg", ""},
+    };
+    // "CTP:无此权限"的GB18030编码
+    const char gb_msg[] = "CTP:\xce\xde\xb4\xcb\xc8\xa8\xcf\xde";
+    memcpy(samples.back().field, gb_msg, sizeof(gb_msg));
+
+    auto legacy_loc = make_legacy_locale();
+    if (!legacy_loc)
+        printf("未找到GB18030区域设置，跳过旧实现的测试\n");
+
+    printf("%-14s %14s %14s\n", "字段", "旧实现 ns/次", "新实现 ns/次");
+    for (const Sample &sample : samples)
+    {
+        double fast = ns_per_call([&] { return ctp_native::gb18030_to_pystr(sample.field, sizeof(sample.field)); });
+        if (legacy_loc)
+        {
+            double legacy = ns_per_call([&] { return legacy_to_pystr(*legacy_loc, sample.field); });
+            printf("%-14s %14.1f %14.1f\n", sample.name, legacy, fast);
+        }
+        else
+        {
+            printf("%-14s %14s %14.1f\n", sample.name, "-", fast);
+        }
+    }
+
+    Py_Finalize();
+    return 0;
+}
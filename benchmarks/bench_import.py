@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_import.py
+@Description: 导入时间和结构体字段访问基准，对比默认构建（Python代理类）和-builtin构建
+              每次导入都在新进程中进行（预先导入NumPy，不计入），字段访问为单次读写的平均耗时
+              两种构建不能同时安装在ctp_api中，先把一种构建的ctp_api复制到别处再传入其所在目录：
+              python build.py && mkdir -p /tmp/proxy && cp -r ctp_api /tmp/proxy/
+              python build.py --builtin && python benchmarks/bench_import.py /tmp/proxy
+              不需要连接前置
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+IMPORT_CODE = """
+import time
+import numpy
+start = time.perf_counter()
+import ctp_api.{module}
+print(time.perf_counter() - start)
+"""
+
+ACCESS_CASES = [
+    ("读double字段", "tick.LastPrice"),
+    ("读字符串字段", "tick.InstrumentID"),
+    ("写double字段", "tick.LastPrice = 3000.0"),
+    ("写字符串字段", "tick.InstrumentID = 'rb2601'"),
+    ("构造结构体", "mdapi.CThostFtdcDepthMarketDataField()"),
+    ("to_tuple()", "tick.to_tuple()"),
+    ("as_array()", "tick.as_array()"),
+]
+
+
+def worker(iterations: int) -> dict:
+    """在当前解释器中测量字段访问，返回 {用例: 纳秒}"""
+    import timeit
+
+    import ctp_api.thostmduserapi as mdapi
+
+    tick = mdapi.CThostFtdcDepthMarketDataField()
+    tick.InstrumentID = "rb2601"
+    namespace = {"mdapi": mdapi, "tick": tick}
+    result = {"mode": "builtin" if not isinstance(vars(type(tick))["LastPrice"], property) else "proxy"}
+    for name, statement in ACCESS_CASES:
+        number = iterations // 10 if "()" in statement else iterations
+        result[name] = min(timeit.repeat(statement, globals=namespace, number=number, repeat=3)) / number * 1e9
+    return result
+
+
+def measure_import(root: Path, module: str, repeat: int) -> float:
+    """在新进程中导入模块，返回耗时中位数（毫秒）；第一次导入生成.pyc，不计入"""
+    env = dict(os.environ, PYTHONPATH=str(root))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    samples = []
+    for _ in range(repeat + 1):
+        # 以root为工作目录，python -c会把工作目录放在sys.path最前面
+        out = subprocess.run([sys.executable, "-c", IMPORT_CODE.format(module=module)],
+                             cwd=root, env=env, capture_output=True, text=True, check=True).stdout
+        samples.append(float(out) * 1000)
+    return statistics.median(samples[1:])
+
+
+def measure(root: Path, iterations: int, repeat: int) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(root))
+    out = subprocess.run([sys.executable, __file__, "--worker", "-n", str(iterations)],
+                         env=env, capture_output=True, text=True, check=True).stdout
+    result = json.loads(out)
+    for module in ("thostmduserapi", "thosttraderapi"):
+        try:
+            result[f"导入{module}(ms)"] = measure_import(root, module, repeat)
+        except subprocess.CalledProcessError:
+            result[f"导入{module}(ms)"] = None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入时间和字段访问基准")
+    parser.add_argument("roots", nargs="*", help="其他构建的ctp_api所在目录，默认只测本项目的ctp_api")
+    parser.add_argument("-n", "--iterations", type=int, default=1_000_000, help="每个字段访问用例的次数")
+    parser.add_argument("--repeat", type=int, default=5, help="导入次数（取中位数）")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.iterations)))
+        return
+
+    roots = [Path(__file__).resolve().parent.parent] + [Path(root).resolve() for root in args.roots]
+    results = [measure(root, args.iterations, args.repeat) for root in roots]
+    names = [key for key in results[0] if key != "mode"]
+    print(f"{'':<28}" + "".join(f"{result['mode']:>14}" for result in results))
+    for name in names:
+        cells = []
+        for result in results:
+            value = result.get(name)
+            cells.append(f"{'-':>14}" if value is None else f"{value:>14.1f}")
+        unit = "" if name.endswith("(ms)") else "(ns)"
+        print(f"{name + unit:<28}" + "".join(cells))
+    if len(results) > 1:
+        print("\n" + "  ".join(f"{result['mode']}: {root}" for result, root in zip(results, roots)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_md_shards.py
+@Description: 多会话分片行情基准：
+              1. 合并去重：多个会话收到同一路行情（分批、批次错开），测合并吞吐，检查重复全部丢弃、输出按时间排序
+              2. 再平衡规划：行情速率倾斜的合约分配，对比迁移前后各会话的负载
+              3. 连接前置：thread和process两种模式下分片订阅，合并后的吞吐、乱序条数和各会话指标
+              第3部分需要用模拟前置构建（python build.py --fake-ctp），真实前置请用 --front 指定地址和账号
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ctp_api.md_shards import MODES, ShardedMdClient, TickMerger, plan_rebalance, session_ms
+from ctp_api.thostmduserapi import DepthMarketData_dtype
+
+
+def make_ticks(total: int, instruments: int) -> np.ndarray:
+    """按时间递增的合成行情，每毫秒一条，轮流分配给各合约"""
+    ticks = np.zeros(total, dtype=DepthMarketData_dtype)
+    ids = np.array([f"rb{2601 + i}".encode() for i in range(instruments)])
+    ms = 9 * 3600 * 1000 + np.arange(total)
+    seconds = ms // 1000
+    ticks['InstrumentID'] = ids[np.arange(total) % instruments]
+    ticks['UpdateTime'] = [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}".encode() for s in seconds.tolist()]
+    ticks['UpdateMillisec'] = ms % 1000
+    ticks['Volume'] = np.arange(total) // instruments
+    ticks['LastPrice'] = 3000.0
+    return ticks
+
+
+def bench_merger(total: int, instruments: int, sources: int, batch: int) -> None:
+    ticks = make_ticks(total, instruments)
+    merger = TickMerger(sources, window=0.0)
+    out = []
+    start = time.perf_counter()
+    for offset in range(0, total, batch):
+        for source in range(sources):
+            # 各会话的批次错开半批，模拟到达时间不同
+            lo = max(offset - source * batch // 2, 0)
+            merger.push(source, ticks[lo:offset + batch], 0.0)
+        out.append(merger.pop(0.0))
+    out.append(merger.pop(0.0, flush=True))
+    elapsed = time.perf_counter() - start
+    merged = np.concatenate(out)
+    received = sum(merger.received)
+    unordered = int((np.diff(session_ms(merged)) < 0).sum())
+    print(f"{sources}个会话 x {total}条: 收到{received}条，输出{len(merged)}条（应为{total}），"
+          f"重复{sum(merger.duplicates)}条，乱序{unordered}条，"
+          f"{received / elapsed / 1e6:.2f}M条/秒（按收到条数）")
+
+
+def bench_rebalance(instruments: int, shards: int, tolerance: float) -> None:
+    rng = np.random.default_rng(0)
+    names = [f"rb{2601 + i}" for i in range(instruments)]
+    # 少数主力合约占大部分行情
+    rates = dict(zip(names, (rng.pareto(1.2, instruments) * 5 + 0.1).tolist()))
+    assignment = {name: i % shards for i, name in enumerate(names)}
+
+    def loads(assign):
+        load = [0.0] * shards
+        for name, shard in assign.items():
+            load[shard] += rates[name]
+        return load
+
+    before = loads(assignment)
+    start = time.perf_counter()
+    moves = plan_rebalance(assignment, rates, shards, tolerance)
+    elapsed = time.perf_counter() - start
+    for name, _, target in moves:
+        assignment[name] = target
+    after = loads(assignment)
+    mean = sum(before) / shards
+    print(f"{instruments}个合约/{shards}个会话，迁移{len(moves)}个，规划耗时{elapsed * 1000:.2f}ms")
+    print(f"  迁移前 最大/平均 {max(before) / mean:.2f}  " + " ".join(f"{x:.0f}" for x in before))
+    print(f"  迁移后 最大/平均 {max(after) / mean:.2f}  " + " ".join(f"{x:.0f}" for x in after))
+
+
+def bench_client(args, mode: str) -> None:
+    ids = [f"rb{2601 + i}" for i in range(args.instruments)]
+    client = ShardedMdClient(args.front, args.broker, args.user, args.password, shards=args.shards, mode=mode,
+                             flow_dir=f"con/bench_md_shards_{mode}")
+    with client:
+        client.start()
+        if not client.wait_ready(10):
+            print(f"{mode}: 会话未全部就绪 {[s.state for s in client.stats()]}")
+            return
+        client.subscribe(ids)
+        total = unordered = 0
+        last = -1
+        start = time.monotonic()
+        for ticks in client.ticks(timeout=2.0):
+            keys = session_ms(ticks)
+            unordered += int((np.diff(keys) < 0).sum()) + int(keys[0] < last)
+            last = int(keys[-1])
+            total += len(ticks)
+            if time.monotonic() - start > args.seconds:
+                break
+        elapsed = time.monotonic() - start
+        print(f"{mode}: {args.shards}个会话，合并输出{total}条，{total / elapsed:.0f}条/秒，乱序{unordered}条")
+        print(f"  {'前置':<24}{'状态':<10}{'合约':>6}{'收到':>10}{'重复':>8}{'条/秒':>10}"
+              f"{'延迟ms':>10}{'落后ms':>8}{'积压':>6}{'丢弃':>6}")
+        for s in client.stats():
+            print(f"  {s.front:<24}{s.state:<10}{s.instruments:>6}{s.received:>10}{s.duplicates:>8}{s.rate:>10.0f}"
+                  f"{s.lag_ms:>10.1f}{s.behind_ms:>8}{s.backlog:>6}{s.lost:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话分片行情基准")
+    parser.add_argument("-n", "--ticks", type=int, default=200000, help="合并基准的行情条数")
+    parser.add_argument("--instruments", type=int, default=200, help="合约数")
+    parser.add_argument("--shards", type=int, default=4, help="会话数")
+    parser.add_argument("--batch", type=int, default=1024, help="合并基准每批条数")
+    parser.add_argument("--seconds", type=float, default=5.0, help="连接前置的运行秒数，0表示跳过")
+    parser.add_argument("--mode", choices=MODES, nargs="*", default=list(MODES), help="连接前置时测试的模式")
+    parser.add_argument("--front", nargs="*", default=["tcp://127.0.0.1:10211", "tcp://127.0.0.1:10212"],
+                        help="前置地址，默认为模拟前置")
+    parser.add_argument("--broker", default="9999")
+    parser.add_argument("--user", default="000000")
+    parser.add_argument("--password", default="")
+    args = parser.parse_args()
+
+    print("--- 合并去重 ---")
+    for sources in (1, 2, args.shards):
+        bench_merger(args.ticks, args.instruments, sources, args.batch)
+    print("--- 再平衡规划 ---")
+    bench_rebalance(args.instruments, args.shards, 0.2)
+    if args.seconds > 0:
+        print("--- 连接前置 ---")
+        for mode in args.mode:
+            bench_client(args, mode)
+
+
+if __name__ == '__main__':
+    main()
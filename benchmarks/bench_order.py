@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_order.py
+@Description: 报单调用开销基准：逐字段构造CThostFtdcInputOrderField后ReqOrderInsert，与按模板insert_order对比
+              需要以 python build.py --fake-ctp 构建，模拟前置的请求在后台线程中应答，不影响测量
+"""
+import argparse
+import time
+
+import ctp_api.thosttraderapi as traderapi
+
+
+def order_by_fields(api, price: float, order_ref: int, request_id: int) -> int:
+    field = traderapi.CThostFtdcInputOrderField()
+    field.BrokerID = "9999"
+    field.InvestorID = "000001"
+    field.UserID = "000001"
+    field.InstrumentID = "rb2601"
+    field.ExchangeID = "SHFE"
+    field.OrderRef = str(order_ref)
+    field.OrderPriceType = traderapi.THOST_FTDC_OPT_LimitPrice
+    field.Direction = traderapi.THOST_FTDC_D_Buy
+    field.CombOffsetFlag = traderapi.THOST_FTDC_OF_Open
+    field.CombHedgeFlag = traderapi.THOST_FTDC_HF_Speculation
+    field.LimitPrice = price
+    field.VolumeTotalOriginal = 1
+    field.TimeCondition = traderapi.THOST_FTDC_TC_GFD
+    field.VolumeCondition = traderapi.THOST_FTDC_VC_AV
+    field.MinVolume = 1
+    field.ContingentCondition = traderapi.THOST_FTDC_CC_Immediately
+    field.ForceCloseReason = traderapi.THOST_FTDC_FCC_NotForceClose
+    return api.ReqOrderInsert(field, request_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="报单调用开销基准（模拟前置）")
+    parser.add_argument("-n", "--iterations", type=int, default=20000, help="每项报单次数")
+    args = parser.parse_args()
+
+    api = traderapi.CThostFtdcTraderApi.CreateFtdcTraderApi("")
+    if traderapi.CThostFtdcTraderApi.GetApiVersion() != "FakeCTP":
+        raise SystemExit("需要链接模拟前置：python build.py --fake-ctp")
+    pool = traderapi.OrderTemplatePool()
+    tmpl = pool.create("9999", "000001", "rb2601", "SHFE")
+    buy, open_ = traderapi.THOST_FTDC_D_Buy, traderapi.THOST_FTDC_OF_Open
+
+    results = []
+    start = time.perf_counter_ns()
+    for i in range(args.iterations):
+        order_by_fields(api, 3000.0 + i % 10, i + 1, i)
+    results.append(("ReqOrderInsert（逐字段构造）", time.perf_counter_ns() - start))
+
+    start = time.perf_counter_ns()
+    for i in range(args.iterations):
+        api.insert_order(tmpl, 3000.0 + i % 10, 1, buy, open_, i)
+    results.append(("insert_order（模板）", time.perf_counter_ns() - start))
+
+    start = time.perf_counter_ns()
+    for i in range(args.iterations):
+        api.cancel_order(tmpl, i + 1, nRequestID=i)
+    results.append(("cancel_order（模板）", time.perf_counter_ns() - start))
+
+    for name, elapsed in results:
+        print(f"{name:<30}{elapsed / args.iterations / 1000:>10.2f} us/次")
+    api.Release()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_subscribe.py
+@Description: 订阅调用开销基准：SubscribeMarketData（char *[]类型映射）与subscribe_market_data（分批）
+              只测量Python到CTP接口调用的转换开销，不需要连接前置
+"""
+import argparse
+import time
+
+import numpy as np
+
+import ctp_api.thostmduserapi as mdapi
+
+
+def bench(call, ids, iterations: int) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        call(ids)
+    return (time.perf_counter_ns() - start) / iterations / 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="订阅调用开销基准")
+    parser.add_argument("-n", "--iterations", type=int, default=2000, help="每项调用次数")
+    args = parser.parse_args()
+
+    api = mdapi.CThostFtdcMdApi.CreateFtdcMdApi("")
+    print(f"{'方式':<36}{'合约数':>8}{'us/次':>12}")
+    for size in (1, 100, 1000):
+        ids = [f"rb{2500 + i % 100:04d}{i // 100}" for i in range(size)]
+        cases = [
+            ("SubscribeMarketData(list[str])", api.SubscribeMarketData, ids),
+            ("subscribe_market_data(list[str])", api.subscribe_market_data, ids),
+            ("subscribe_market_data(tuple[bytes])", api.subscribe_market_data, tuple(i.encode() for i in ids)),
+            ("subscribe_market_data(ndarray[S])", api.subscribe_market_data, np.array(ids, dtype="S31")),
+        ]
+        for name, call, value in cases:
+            print(f"{name:<36}{size:>8}{bench(call, value, args.iterations):>12.2f}")
+    api.Release()
+
+
+if __name__ == '__main__':
+    main()
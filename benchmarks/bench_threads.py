@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bench_threads.py
+@Description: 多线程扩展性基准：每个线程对自己的行情结构体反复读字段、to_tuple()和批量写入，统计总吞吐随线程数的变化
+              普通构建受GIL限制，吞吐基本不随线程数增加；自由线程构建（python build.py --free-threaded）下应接近线性
+              不需要连接前置
+"""
+import argparse
+import sys
+import threading
+import time
+
+import ctp_api.thostmduserapi as mdapi
+
+
+def worker(iterations: int, barrier: threading.Barrier) -> None:
+    tick = mdapi.CThostFtdcDepthMarketDataField()
+    tick.InstrumentID = "rb2601"
+    barrier.wait()
+    for i in range(iterations):
+        tick.update(LastPrice=3000.0 + i % 10, Volume=i)
+        total = tick.LastPrice * tick.Volume
+        values = tick.to_tuple()
+        if total < 0 or not values:
+            raise AssertionError
+
+
+def run(threads: int, iterations: int) -> float:
+    barrier = threading.Barrier(threads + 1)
+    pool = [threading.Thread(target=worker, args=(iterations, barrier)) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多线程扩展性基准")
+    parser.add_argument("-n", "--iterations", type=int, default=100000, help="每个线程的循环次数")
+    args = parser.parse_args()
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"GIL: {'启用' if gil else '禁用（自由线程）'}")
+    print(f"{'线程数':>6}{'耗时(s)':>10}{'次/秒':>14}{'加速比':>8}")
+    base = None
+    for threads in (1, 2, 4, 8):
+        elapsed = run(threads, args.iterations)
+        rate = threads * args.iterations / elapsed
+        base = base or rate
+        print(f"{threads:>6}{elapsed:>10.3f}{rate:>14,.0f}{rate / base:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
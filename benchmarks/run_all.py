@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : run_all.py
+@Description: 依次运行全部Python基准，修改.i文件前后各运行一次即可对比
+              python build.py --fake-ctp && python benchmarks/run_all.py
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+BENCHMARKS = [
+    ["bench_dispatch.py"],
+    ["bench_field_read.py"],
+    ["bench_order.py"],
+    ["bench_subscribe.py"],
+    ["bench_bus.py"],
+    ["bench_shard.py"],
+    ["bench_threads.py"],
+    ["bench_bars.py"],
+    ["bench_md_shards.py"],
+    ["bench_import.py"],
+]
+
+
+def main():
+    here = Path(__file__).parent
+    failed = []
+    for bench in BENCHMARKS:
+        print(f"\n=== {bench[0]} ===", flush=True)
+        result = subprocess.run([sys.executable, str(here / bench[0]), *bench[1:], *sys.argv[1:2]],
+                                cwd=here.parent)
+        if result.returncode != 0:
+            failed.append(bench[0])
+    if failed:
+        print(f"\n失败: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,15 +5,49 @@ CTP SWIG构建脚本
 """
 
 import argparse
+import hashlib
+import json
+import os
 import platform
+import re
+import shlex
 import shutil
+import statistics
 import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # CTP C++ API目录
 ctp_source_dir = "ctp_source"
 
+# 增量构建状态，保存在构建目录中
+build_state_file = "ctp_build_state.json"
+
+# 影响SWIG生成代码和编译结果的文件
+fingerprint_patterns = [
+    '*.i',
+    'ctp_codegen.py',
+    'ctp_split.py',
+    'meson.build',
+    'meson.options',
+    f'{ctp_source_dir}/*.h',
+    f'{ctp_source_dir}/*.lib',
+    f'{ctp_source_dir}/*.dll',
+    f'{ctp_source_dir}/*.so',
+    f'{ctp_source_dir}/*.a',
+    'ctp_native/*.h',
+    'fake_ctp/*',
+]
+
+# 各绑定配置的扩展模块大小和导入时间记录，构建目录重建时保留，用于对比不同绑定配置
+profile_stats_file = "ctp_profile_stats.json"
+
+# 只在meson setup时读取的编译器环境变量，变化后需要重新配置
+compiler_env_vars = ['CC', 'CXX', 'CFLAGS', 'CXXFLAGS', 'CPPFLAGS', 'LDFLAGS']
+
 def get_platform_config():
     """获取平台特定配置"""
     system = platform.system().lower()
@@ -78,8 +112,105 @@ def check_dependencies():
     except (subprocess.CalledProcessError, FileNotFoundError):
         raise RuntimeError("❌ Meson未找到，请使用 'pip install meson' 安装")
     
+def detect_compiler_cache():
+    """meson会自动使用PATH中的sccache或ccache（优先sccache），完整重建时可复用之前的目标文件"""
+    for name in ('sccache', 'ccache'):
+        if shutil.which(name):
+            return name
+    return None
+
+def hash_files(patterns):
+    """按相对路径排序后计算文件内容的SHA-256"""
+    project_root = Path.cwd()
+    digest = hashlib.sha256()
+    paths = sorted({p for pattern in patterns for p in project_root.glob(pattern) if p.is_file()})
+    for path in paths:
+        digest.update(path.relative_to(project_root).as_posix().encode())
+        digest.update(b'\0')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def swig_version():
+    result = subprocess.run(['swig', '-version'], capture_output=True, text=True)
+    return ' '.join(result.stdout.split())
+
+def profile_argument(profile):
+    """绑定配置为允许列表文件时转换为绝对路径（meson在构建目录中调用ctp_codegen.py）"""
+    path = Path(profile)
+    return str(path.resolve()) if path.is_file() else profile
+
+def expected_modules(profile):
+    """绑定配置要构建的模块"""
+    from ctp_codegen import profile_modules
+    return profile_modules(profile_argument(profile))
+
+def build_fingerprint(python, fake_ctp=False, probes=False, wrap_units=None, builtin=False, profile='full'):
+    """
+    构建指纹：源文件内容、SWIG版本、编译配置（meson选项、目标解释器、编译器环境变量）
+    源文件变化时交给ninja增量编译，SWIG版本或编译配置变化时重新配置并完整编译
+    """
+    interpreter = subprocess.run(
+        [python, '-c', "import sys, sysconfig; print(sys.version); print(sysconfig.get_config_var('EXT_SUFFIX'))"],
+        capture_output=True, text=True).stdout
+    config = {
+        'python': python,
+        'interpreter': interpreter.split(),
+        'fake_ctp': fake_ctp,
+        'probes': probes,
+        'wrap_units': wrap_units,
+        'builtin': builtin,
+        'profile': profile,
+        # 允许列表文件的内容变化时重新配置（要构建的模块可能变化）
+        'profile_file': hashlib.sha256(Path(profile).read_bytes()).hexdigest() if Path(profile).is_file() else None,
+        'env': {name: os.environ.get(name, '') for name in compiler_env_vars},
+        'platform': platform.platform(),
+    }
+    return {
+        'sources': hash_files(fingerprint_patterns),
+        'swig': swig_version(),
+        'config': hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest(),
+    }
+
+def load_build_state(build_dir):
+    path = Path(build_dir) / build_state_file
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+def save_build_state(build_dir, state):
+    path = Path(build_dir) / build_state_file
+    path.write_text(json.dumps(state, indent=2, sort_keys=True), encoding='utf-8')
+
+def installed_modules():
+    """ctp_api中已安装的扩展模块及其内容哈希"""
+    so_suffix = get_platform_config()['so_suffix']
+    ctp_dir = Path.cwd() / 'ctp_api'
+    result = {}
+    for module in ['thostmduserapi', 'thosttraderapi']:
+        files = sorted(ctp_dir.glob(f"_{module}.*{so_suffix}"))
+        if files and (ctp_dir / f"{module}.py").exists():
+            result[module] = hashlib.sha256(files[0].read_bytes()).hexdigest()
+    return result
+
+def can_reuse_build(build_dir, state, fingerprint):
+    """SWIG版本和编译配置都未变化、且构建目录已配置时，复用其中的包装代码和目标文件"""
+    return (state is not None
+            and state.get('swig') == fingerprint['swig']
+            and state.get('config') == fingerprint['config']
+            and (Path(build_dir) / 'build.ninja').exists())
+
+def stubs_up_to_date(state, modules, expected):
+    """扩展模块内容未变化且存根文件存在时，不必重新生成存根"""
+    ctp_dir = Path.cwd() / 'ctp_api'
+    return (state is not None and state.get('stubs')
+            and state.get('modules') == modules and sorted(modules) == sorted(expected)
+            and all((ctp_dir / f"{module}.pyi").exists() for module in modules))
+
 def setup_build_directory(build_dir="build"):
-    """设置构建目录"""
+    """清理并重新创建构建目录"""
     build_path = Path(build_dir)
     
     if build_path.exists():
@@ -96,12 +227,49 @@ def setup_build_directory(build_dir="build"):
     
     return build_path
 
-def configure_meson(build_dir):
+def is_free_threaded(python):
+    """解释器是否为自由线程（no-GIL）构建"""
+    result = subprocess.run([python, '-c', "import sysconfig; print(sysconfig.get_config_var('Py_GIL_DISABLED'))"],
+                            capture_output=True, text=True)
+    return result.returncode == 0 and result.stdout.strip() == '1'
+
+def find_python(python=None, free_threaded=False):
+    """确定目标解释器：指定的路径，或自由线程构建时查找python3.13t"""
+    if python is None:
+        python = sys.executable
+        if free_threaded and not is_free_threaded(python):
+            python = shutil.which('python3.13t') or shutil.which('python3t')
+            if python is None:
+                raise RuntimeError("❌ 未找到自由线程解释器python3.13t，请安装后重试或用--python指定")
+    if free_threaded and not is_free_threaded(python):
+        raise RuntimeError(f"❌ {python} 不是自由线程（no-GIL）解释器")
+    return python
+
+def configure_meson(build_dir, fake_ctp=False, probes=False, python=None, wrap_units=None, builtin=False,
+                    profile='full'):
     """配置Meson构建"""
     print("配置Meson构建...")
     
     platform_config = get_platform_config()
     cmd = ['meson', 'setup', build_dir, '--backend=ninja']
+    if python:
+        # 扩展模块的ABI（如cp313t）由目标解释器决定
+        cmd.append(f'-Dpython={python}')
+    if fake_ctp:
+        # 链接本地模拟前置，代替CTP官方动态库
+        cmd.append('-Dfake_ctp=true')
+    if probes:
+        # 回调延迟探针
+        cmd.append('-Dprobes=true')
+    if wrap_units is not None:
+        # 包装代码拆分的编译单元数
+        cmd.append(f'-Dwrap_units={wrap_units}')
+    if builtin:
+        # SWIG -builtin：内置类型代替Python代理类
+        cmd.append('-Dbuiltin=true')
+    if profile != 'full':
+        # 绑定配置：只绑定选中的结构体、回调和常量
+        cmd.append(f'-Dprofile={profile_argument(profile)}')
     
     # 平台特定配置
     if platform_config['is_windows']:
@@ -117,6 +285,7 @@ def build_project(build_dir):
     """编译项目"""
     print("编译项目...")
     print("注意：编译过程中可能出现大量字符编码警告，这是正常现象。")
+    print("      增量构建时只重新生成和编译发生变化的部分，下面的说明针对首次或完整构建。")
     print("      由于CTP接口文件非常大，编译过程中CPU使用率会飙升到很高（可能达到100%），")
     print("      这是正常现象，因为SWIG需要处理大量的C++代码生成Python绑定。")
     print("      编译时间可能需要一分钟，请耐心等待。")
@@ -133,7 +302,88 @@ def build_project(build_dir):
         print("3. 检查Python开发环境是否完整")
         raise
 
-def install_project(build_dir):
+def wrapper_unit_commands(build_dir):
+    """compile_commands.json中SWIG包装代码各编译单元的编译命令"""
+    path = Path(build_dir) / 'compile_commands.json'
+    if not path.exists():
+        raise RuntimeError(f"❌ 未找到 {path}，请先完成构建")
+    entries = json.loads(path.read_text(encoding='utf-8'))
+    return [entry for entry in entries if '_wrap' in Path(entry['file']).name]
+
+def redirect_outputs(command, output_dir):
+    """把编译命令的目标文件和依赖文件改写到output_dir，测量时不覆盖构建目录中的产物"""
+    is_windows = get_platform_config()['is_windows']
+    args = command if is_windows else shlex.split(command)
+    if is_windows:
+        # MSVC：/Fo<目标文件>，依赖信息由/showIncludes输出到标准输出
+        return re.sub(r'/Fo\S+', lambda m: f'/Fo{output_dir / "unit.obj"}', args)
+    result = list(args)
+    for flag, name in (('-o', 'unit.o'), ('-MF', 'unit.d')):
+        if flag in result:
+            result[result.index(flag) + 1] = str(output_dir / name)
+    return result
+
+def peak_memory_windows(process):
+    """进程的峰值工作集（字节），需在进程句柄关闭前调用"""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(
+        wintypes.HANDLE(int(process._handle)), ctypes.byref(counters), counters.cb)
+    return counters.PeakWorkingSetSize
+
+def compile_unit(entry, output_dir):
+    """重新编译一个单元，返回 (耗时秒数, 峰值内存字节数, 返回码)"""
+    command = redirect_outputs(entry['command'], output_dir)
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=entry['directory'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if hasattr(os, 'wait4'):
+        # Linux下ru_maxrss单位为KB
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        peak = usage.ru_maxrss * 1024
+    else:
+        process.wait()
+        peak = peak_memory_windows(process)
+    return time.perf_counter() - start, peak, process.returncode
+
+def report_unit_stats(build_dir, jobs=None):
+    """按构建目录中的编译命令重新并行编译SWIG包装代码的各个单元，报告每个单元的耗时和峰值内存"""
+    entries = wrapper_unit_commands(build_dir)
+    if not entries:
+        raise RuntimeError("❌ compile_commands.json中没有SWIG包装代码的编译单元")
+    jobs = jobs or os.cpu_count() or 1
+    print(f"重新编译 {len(entries)} 个包装代码单元（{jobs} 个并行）...")
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs = [Path(tmp) / str(i) for i in range(len(entries))]
+        for path in dirs:
+            path.mkdir()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(jobs) as executor:
+            results = list(executor.map(compile_unit, entries, dirs))
+        wall = time.perf_counter() - start
+
+    print(f"\n{'编译单元':<44}{'耗时(s)':>10}{'峰值内存(MB)':>14}")
+    for entry, (elapsed, peak, returncode) in zip(entries, results):
+        status = '' if returncode == 0 else f'  ❌ 返回码 {returncode}'
+        print(f"{Path(entry['file']).name:<44}{elapsed:>10.1f}{peak / 2 ** 20:>14.0f}{status}")
+    total = sum(elapsed for elapsed, _, _ in results)
+    peak = max(peak for _, peak, _ in results)
+    print(f"{'合计（串行）':<44}{total:>10.1f}")
+    print(f"{'墙钟时间（并行）':<44}{wall:>10.1f}{peak / 2 ** 20:>14.0f}")
+    if any(returncode for _, _, returncode in results):
+        raise RuntimeError("❌ 部分编译单元编译失败")
+
+def install_project(build_dir, fake_ctp=False):
     """安装项目"""
     print("安装项目...")
     
@@ -146,11 +396,82 @@ def install_project(build_dir):
     # 重命名pyd文件，在文件名前加下划线，这样做的目的是让SWIG生成的Python模块能够正确导入带下划线的底层C扩展模块。
     rename_pyd_files()
     
-    # 复制运行时依赖的DLL文件
-    copy_runtime_dlls()
+    # 复制运行时依赖的DLL文件（模拟前置的动态库已由meson install安装）
+    if not fake_ctp:
+        copy_runtime_dlls()
     
     print("✓ 项目安装完成")
 
+def remove_unbuilt_modules(modules):
+    """删除绑定配置不再构建的模块（如从full切换到md-only后的交易模块），避免导入旧版本"""
+    so_suffix = get_platform_config()['so_suffix']
+    ctp_dir = Path.cwd() / 'ctp_api'
+    for module in ['thostmduserapi', 'thosttraderapi']:
+        if module in modules:
+            continue
+        for path in [*ctp_dir.glob(f"_{module}.*{so_suffix}"), ctp_dir / f"{module}.py", ctp_dir / f"{module}.pyi"]:
+            if path.exists():
+                path.unlink()
+                print(f"✓ 删除绑定配置未包含的模块文件: {path.name}")
+
+def measure_import_time(python, module, repeat=5):
+    """在新进程中导入ctp_api中的模块，返回耗时中位数（毫秒），导入失败时返回None"""
+    code = f"import time, numpy\nstart = time.perf_counter()\nimport ctp_api.{module}\nprint(time.perf_counter() - start)"
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    samples = []
+    # 第一次导入生成.pyc，不计入
+    for _ in range(repeat + 1):
+        result = subprocess.run([python, '-c', code], cwd=Path.cwd(), env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        samples.append(float(result.stdout) * 1000)
+    return statistics.median(samples[1:])
+
+def record_profile_stats(python, profile, builtin, modules):
+    """记录本次构建的绑定配置下各模块的大小（扩展模块+.py）和导入时间"""
+    so_suffix = get_platform_config()['so_suffix']
+    ctp_dir = Path.cwd() / 'ctp_api'
+    path = Path.cwd() / profile_stats_file
+    try:
+        stats = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        stats = {}
+    entry = {}
+    for module in modules:
+        files = [*ctp_dir.glob(f"_{module}.*{so_suffix}"), ctp_dir / f"{module}.py"]
+        entry[module] = {
+            'size': sum(f.stat().st_size for f in files if f.exists()),
+            'import_ms': measure_import_time(python, module),
+        }
+    key = Path(profile).name + (' (builtin)' if builtin else '')
+    stats[key] = {'profile': profile_argument(profile), 'builtin': builtin, 'modules': entry}
+    path.write_text(json.dumps(stats, indent=2, ensure_ascii=False), encoding='utf-8')
+    return stats
+
+def report_profile_stats(stats):
+    """对比各绑定配置绑定的结构体/方法/常量数量、模块大小和导入时间，括号内为相对full（同一构建模式）的变化"""
+    from ctp_codegen import profile_summary
+
+    def change(value, base):
+        return f" ({(value - base) / base:+.0%})" if base else ""
+
+    print("\n=== 绑定配置对比 ===")
+    print(f"{'配置':<24}{'模块':<18}{'结构体':>10}{'方法':>10}{'常量':>12}{'大小(KB)':>20}{'导入(ms)':>20}")
+    for key, record in stats.items():
+        try:
+            summary = profile_summary(ctp_source_dir, record['profile'])
+        except (OSError, ValueError):
+            summary = {}
+        full = stats.get('full' + (' (builtin)' if record['builtin'] else ''), {}).get('modules', {})
+        for module, values in record['modules'].items():
+            counts = [f"{bound}/{total}" for bound, total in summary.get(module, ())] or ['-'] * 3
+            base = full.get(module, {})
+            size = f"{values['size'] / 1024:.0f}" + change(values['size'], base.get('size'))
+            import_ms = values['import_ms']
+            import_text = '-' if import_ms is None else f"{import_ms:.1f}" + change(import_ms, base.get('import_ms'))
+            print(f"{key:<24}{module:<18}{counts[0]:>10}{counts[1]:>10}{counts[2]:>12}{size:>20}{import_text:>20}")
+
 def copy_swig_python_files(build_dir):
     """复制SWIG生成的Python文件到ctp_api目录"""
     print("复制SWIG生成的Python文件到ctp_api目录...")
@@ -411,11 +732,27 @@ def main():
     parser.add_argument('--build-dir', default='build', 
                        help='构建目录 (默认: build)')
     parser.add_argument('--clean', action='store_true',
-                       help='清理构建目录')
+                       help='清理构建目录后完整重新构建（默认增量构建，复用未变化的包装代码、目标文件和存根）')
     parser.add_argument('--no-stubs', action='store_true',
                        help='跳过生成存根文件')
     parser.add_argument('--configure-only', action='store_true',
                        help='仅配置，不编译')
+    parser.add_argument('--fake-ctp', action='store_true',
+                       help='链接本地模拟前置（fake_ctp）代替CTP官方动态库，用于离线测试和基准')
+    parser.add_argument('--probes', action='store_true',
+                       help='启用回调延迟探针（GIL等待、处理耗时直方图），见ctp_api/probes.py')
+    parser.add_argument('--free-threaded', action='store_true',
+                       help='为自由线程（no-GIL）解释器构建cp313t扩展，默认查找python3.13t')
+    parser.add_argument('--python',
+                       help='目标Python解释器路径（默认为运行本脚本的解释器）')
+    parser.add_argument('--builtin', action='store_true',
+                       help='使用SWIG -builtin生成内置类型代替Python代理类，缩短导入时间和字段访问开销（包装代码不拆分）')
+    parser.add_argument('--wrap-units', type=int,
+                       help='每个SWIG包装代码拆分成的包装函数编译单元数，1为不拆分（默认: meson.options中的4）')
+    parser.add_argument('--profile', default='full',
+                       help='绑定配置: full、md-only、trading-core或允许列表文件，只绑定选中的结构体、回调和常量（见ctp_codegen.py）')
+    parser.add_argument('--unit-stats', action='store_true',
+                       help='构建后重新并行编译包装代码的各个单元，报告每个单元的耗时和峰值内存')
     
     args = parser.parse_args()
     
@@ -424,15 +761,43 @@ def main():
         
         # 检查依赖项
         check_dependencies()
+        python = find_python(args.python, args.free_threaded)
+        if python != sys.executable:
+            print(f"目标解释器: {python}")
         
-        # 设置构建目录
-        build_dir = setup_build_directory(args.build_dir)
+        cache = detect_compiler_cache()
+        print(f"✓ 编译缓存: {cache}" if cache else "⚠ 未找到sccache/ccache，完整重建时无法复用之前的目标文件")
         
-        # 复制DLL文件
-        copy_dlls_to_build(build_dir)
+        # 比较构建指纹，决定跳过、增量还是完整构建
+        fingerprint = build_fingerprint(python, args.fake_ctp, args.probes, args.wrap_units, args.builtin,
+                                        args.profile)
+        expected = expected_modules(args.profile)
+        state = None if args.clean else load_build_state(args.build_dir)
+        modules = installed_modules()
+        if (not args.configure_only and state is not None and sorted(modules) == sorted(expected)
+                and all(state.get(key) == value for key, value in fingerprint.items())
+                and state.get('modules') == modules and (args.no_stubs or state.get('stubs'))):
+            print("✓ 源文件、SWIG版本和编译配置均未变化，跳过构建（使用--clean强制完整重建）")
+            if args.unit_stats:
+                report_unit_stats(args.build_dir)
+            return
         
-        # 配置Meson
-        configure_meson(str(build_dir))
+        if can_reuse_build(args.build_dir, state, fingerprint):
+            print("增量构建：复用构建目录中已生成的包装代码和目标文件")
+            build_dir = Path(args.build_dir)
+            copy_dlls_to_build(build_dir)
+        else:
+            if state is not None and not args.clean:
+                print("SWIG版本或编译配置已变化，完整重新构建")
+            # 设置构建目录
+            build_dir = setup_build_directory(args.build_dir)
+            
+            # 复制DLL文件
+            copy_dlls_to_build(build_dir)
+            
+            # 配置Meson
+            configure_meson(str(build_dir), args.fake_ctp, args.probes, python, args.wrap_units, args.builtin,
+                            args.profile)
         
         if args.configure_only:
             print("✓ 仅配置模式，构建配置完成")
@@ -442,15 +807,29 @@ def main():
         build_project(str(build_dir))
         
         # 安装项目
-        install_project(str(build_dir))
+        install_project(str(build_dir), args.fake_ctp)
+        remove_unbuilt_modules(expected)
+        modules = installed_modules()
         
         # 生成存根文件
         stub_success = False
+        if python != sys.executable and not args.no_stubs:
+            # stubgen需要在当前解释器中导入扩展模块，目标解释器不同时无法生成
+            print(f"⚠ 目标解释器不是当前解释器，跳过存根文件生成，可用 {python} -m mypy.stubgen 手动生成")
+            args.no_stubs = True
         if not args.no_stubs:
-            stub_success = generate_stubs()
+            if stubs_up_to_date(state, modules, expected):
+                print("✓ 扩展模块未变化，复用已有的存根文件")
+                stub_success = True
+            else:
+                stub_success = generate_stubs()
+        
+        save_build_state(build_dir, {**fingerprint, 'modules': modules, 'stubs': stub_success})
         
         print("\n=== 构建完成 ===")
         print("模块已生成在ctp_api目录中")
+        if args.profile != 'full':
+            print(f"绑定配置 {args.profile}：只构建了 {', '.join(expected)}，未选中的结构体、回调和常量不绑定")
         print("可以使用以下方式导入CTP模块:")
         print("  import ctp_api.thostmduserapi")
         print("  import ctp_api.thosttraderapi")
@@ -469,6 +848,12 @@ def main():
                 print("  ctp_api/thosttraderapi.pyi - 类型存根文件 ❌")
         else:
             print("  类型存根文件生成已跳过")
+
+        if args.unit_stats:
+            report_unit_stats(build_dir)
+
+        # 记录并对比各绑定配置的模块大小和导入时间
+        report_profile_stats(record_profile_stats(python, args.profile, args.builtin, expected))
         
     except Exception as e:
         print(f"\n❌ 构建失败: {e}")
@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : aio.py
+@Date       : 2025/11/28 10:05
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: CTP行情/交易API的asyncio封装
+    CTP线程中的回调先进入批量缓冲区，每批只调用一次call_soon_threadsafe唤醒事件循环；
+    深度行情由原生队列接收，事件循环按批读取；Req*请求按nRequestID匹配应答，收到bIsLast后完成。
+    多个会话可以共用一个事件循环，无需为每个API阻塞一个线程调用Join()。
+"""
+import asyncio
+import functools
+import threading
+from collections.abc import AsyncIterator, Callable
+
+import numpy as np
+
+
+class CtpError(Exception):
+    """CTP应答中的错误（pRspInfo.ErrorID != 0）"""
+
+    def __init__(self, error_id: int, error_msg: str):
+        super().__init__(f"[{error_id}] {error_msg}")
+        self.error_id = error_id
+        self.error_msg = error_msg
+
+
+class CtpRequestError(CtpError):
+    """Req*调用的返回码不为0：-1网络连接失败，-2未处理请求超过许可数，-3每秒发送请求数超过许可数"""
+
+    def __init__(self, method: str, ret: int):
+        super().__init__(ret, f"{method} 返回 {ret}")
+        self.method = method
+
+
+class CtpDisconnectedError(ConnectionError):
+    """前置断开，未完成的请求不会再收到应答"""
+
+    def __init__(self, reason: int):
+        super().__init__(f"CTP前置断开，原因代码 0x{reason:x}")
+        self.reason = reason
+
+
+def _retain(arg):
+    """回调参数中的结构体只在回调期间有效，需要跨线程保留时复制一份"""
+    if arg is not None and hasattr(type(arg), 'dtype'):
+        return arg.copy()
+    return arg
+
+
+def _make_callback(name: str):
+    def callback(self, *args):
+        self._client._post(name, tuple(_retain(arg) for arg in args))
+    callback.__name__ = name
+    return callback
+
+
+def _spi_class(base: type, skip: tuple[str, ...] = ()) -> type:
+    """生成把全部On*回调转发到批量缓冲区的Spi子类"""
+    namespace = {
+        name: _make_callback(name)
+        for name in dir(base)
+        if name.startswith('On') and name not in skip
+    }
+    return type(f'_Async{base.__name__}', (base,), namespace)
+
+
+class _PendingRequest:
+    __slots__ = ('future', 'results', 'error')
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.results = []
+        self.error = None
+
+
+class _AsyncClient:
+    """行情/交易客户端共用的回调批量投递与请求应答匹配"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._lock = threading.Lock()
+        self._events: list[tuple[str, tuple]] = []
+        self._scheduled = False
+        self._pending: dict[int, _PendingRequest] = {}
+        self._handlers: dict[str, list[Callable]] = {}
+        self._request_id = 0
+        self._connected = self._loop.create_future()
+        self._closed = False
+        self.api = None
+        self.scheduler = None  # 可选的RequestScheduler，设置后请求经过流控调度发送
+
+    # ---------- CTP线程 ----------
+
+    def _post(self, name: str, args: tuple) -> None:
+        """CTP线程中调用：缓冲回调，只有批次中的第一个事件会唤醒事件循环"""
+        with self._lock:
+            self._events.append((name, args))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._flush)
+
+    # ---------- 事件循环线程 ----------
+
+    def _flush(self) -> None:
+        with self._lock:
+            events, self._events = self._events, []
+            self._scheduled = False
+        for name, args in events:
+            self._dispatch(name, args)
+
+    def _dispatch(self, name: str, args: tuple) -> None:
+        if name == 'OnFrontConnected':
+            if not self._connected.done():
+                self._connected.set_result(None)
+        elif name == 'OnFrontDisconnected':
+            self._fail_pending(CtpDisconnectedError(args[0]))
+        elif name == 'OnRspError':
+            self._resolve(None, *args)
+        elif name.startswith('OnRsp') and len(args) == 4:
+            self._resolve(*args)
+
+        for handler in self._handlers.get(name, ()):
+            try:
+                handler(*args)
+            except Exception as e:
+                self._loop.call_exception_handler({
+                    'message': f'CTP回调处理函数 {name} 出错',
+                    'exception': e,
+                })
+
+    def _resolve(self, field, rsp_info, request_id: int, is_last: bool) -> None:
+        pending = self._pending.get(request_id)
+        if pending is None:
+            return
+        if rsp_info is not None and rsp_info.ErrorID != 0 and pending.error is None:
+            pending.error = CtpError(rsp_info.ErrorID, rsp_info.ErrorMsg)
+        if field is not None:
+            pending.results.append(field)
+        if not is_last:
+            return
+        del self._pending[request_id]
+        if pending.future.done():
+            return
+        if pending.error is not None:
+            pending.future.set_exception(pending.error)
+        else:
+            pending.future.set_result(pending.results)
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        pending, self._pending = self._pending, {}
+        for request in pending.values():
+            if not request.future.done():
+                request.future.set_exception(exc)
+
+    def on(self, name: str, handler: Callable) -> None:
+        """
+        注册回调处理函数，在事件循环线程中以原回调参数调用，结构体参数已复制，可以保留
+        :param name: 回调名称，如 OnRtnOrder
+        :param handler: 处理函数
+        """
+        self._handlers.setdefault(name, []).append(handler)
+
+    def next_request_id(self) -> int:
+        if self.scheduler is not None:
+            return self.scheduler.next_request_id()
+        self._request_id += 1
+        return self._request_id
+
+    async def _call(self, method: str, field, request_id: int) -> None:
+        if self.scheduler is not None:
+            await asyncio.wrap_future(self.scheduler.submit(method, field, request_id=request_id))
+            return
+        ret = getattr(self.api, method)(field, request_id)
+        if ret != 0:
+            raise CtpRequestError(method, ret)
+
+    async def send(self, method: str, field=None) -> int:
+        """
+        发送请求但不等待应答（如成功时只有OnRtnOrder回报的ReqOrderInsert），返回请求编号
+        """
+        request_id = self.next_request_id()
+        await self._call(method, field, request_id)
+        return request_id
+
+    async def request(self, method: str, field=None, *, timeout: float | None = None) -> list:
+        """
+        发送Req*请求并等待应答，收到bIsLast后返回应答结构体列表（已复制）
+        :param method: 请求方法名，如 ReqQryInstrument
+        :param field: 请求结构体
+        :param timeout: 超时秒数，None表示一直等待
+        :return: 应答结构体列表，查询无结果时为空列表
+        """
+        request_id = self.next_request_id()
+        future = self._loop.create_future()
+        self._pending[request_id] = _PendingRequest(future)
+        future.add_done_callback(lambda _: self._pending.pop(request_id, None))
+        try:
+            await self._call(method, field, request_id)
+        except BaseException:
+            future.cancel()
+            raise
+        return await asyncio.wait_for(future, timeout)
+
+    def __getattr__(self, name: str):
+        # client.ReqXxx(field) 等同于 client.request('ReqXxx', field)
+        api = self.__dict__.get('api')
+        if name.startswith('Req') and api is not None and hasattr(api, name):
+            return functools.partial(self.request, name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    async def _start(self, front_address: str, timeout: float | None) -> None:
+        self.api.RegisterFront(front_address)
+        self.api.Init()
+        await asyncio.wait_for(asyncio.shield(self._connected), timeout)
+
+    async def close(self) -> None:
+        """释放API，未完成的请求全部取消"""
+        if self._closed:
+            return
+        self._closed = True
+        for request in self._pending.values():
+            request.future.cancel()
+        self._pending.clear()
+        if self.scheduler is not None:
+            self.scheduler.close()
+        if self.api is not None:
+            self.api.RegisterSpi(None)
+            # Release会等待CTP线程退出，放到线程池中避免阻塞事件循环
+            await self._loop.run_in_executor(None, self.api.Release)
+            self.api = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AsyncMdClient(_AsyncClient):
+    """
+    asyncio行情客户端
+    用法：
+        async with AsyncMdClient() as md:
+            await md.connect("tcp://182.254.243.31:30011")
+            await md.login("9999", "160219", "password")
+            md.subscribe(["SA601", "FG601"])
+            async for ticks in md.ticks():
+                ...
+    """
+
+    def __init__(self, flow_path: str = "", *, queue_capacity: int = 65536, batch_size: int = 1024,
+                 loop: asyncio.AbstractEventLoop | None = None):
+        from . import thostmduserapi as mdapi
+
+        super().__init__(loop)
+        self.mdapi = mdapi
+        self.batch_size = batch_size
+        self._tick_ready = asyncio.Event()
+        spi_cls = _spi_class(mdapi.MdTickQueueSpi, skip=('OnRtnDepthMarketData',))
+        self._spi = spi_cls(queue_capacity)
+        self._spi._client = self
+        # 深度行情不经过批量缓冲区：原生队列在每批行情的第一条到达时调用一次通知
+        self._spi.set_notify(self._wake_ticks)
+        self.api = mdapi.CThostFtdcMdApi.CreateFtdcMdApi(flow_path)
+        self.api.RegisterSpi(self._spi)
+
+    def _wake_ticks(self) -> None:
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._tick_ready.set)
+
+    async def connect(self, front_address: str, timeout: float | None = None) -> None:
+        """注册前置地址并初始化，等待OnFrontConnected"""
+        await self._start(front_address, timeout)
+
+    async def login(self, broker_id: str, user_id: str, password: str, timeout: float | None = None):
+        """登录行情服务器，返回CThostFtdcRspUserLoginField"""
+        field = self.mdapi.CThostFtdcReqUserLoginField.from_dict({
+            'BrokerID': broker_id, 'UserID': user_id, 'Password': password,
+        })
+        results = await self.request('ReqUserLogin', field, timeout=timeout)
+        return results[0] if results else None
+
+    def subscribe(self, instrument_ids) -> None:
+        """订阅行情，订阅应答通过 on('OnRspSubMarketData', ...) 获取"""
+        for ret in self.api.subscribe_market_data(instrument_ids):
+            if ret != 0:
+                raise CtpRequestError('SubscribeMarketData', ret)
+
+    def unsubscribe(self, instrument_ids) -> None:
+        """退订行情"""
+        for ret in self.api.unsubscribe_market_data(instrument_ids):
+            if ret != 0:
+                raise CtpRequestError('UnSubscribeMarketData', ret)
+
+    async def ticks(self) -> AsyncIterator[np.ndarray]:
+        """
+        异步迭代深度行情，每次返回一批DepthMarketData_dtype结构化数组（最多batch_size条）
+        同一客户端只能有一个迭代者；消费慢于行情到达时行情暂存在原生队列中，队列满后丢弃并计入dropped()
+        """
+        spi = self._spi
+        while not self._closed:
+            batch = spi.drain(self.batch_size)
+            if len(batch):
+                yield batch
+                continue
+            self._tick_ready.clear()
+            spi.arm_notify()
+            # 读空和启用通知之间到达的行情不会触发通知，需要再检查一次
+            if spi.pending():
+                continue
+            await self._tick_ready.wait()
+
+    @property
+    def dropped(self) -> int:
+        """原生队列已满而丢弃的行情条数"""
+        return self._spi.dropped()
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._spi.set_notify(None)
+        self._tick_ready.set()
+        await super().close()
+
+
+class AsyncTraderClient(_AsyncClient):
+    """
+    asyncio交易客户端
+    用法：
+        async with AsyncTraderClient() as td:
+            await td.connect("tcp://182.254.243.31:30001")
+            await td.authenticate("9999", "160219", "simnow_client_test", "0000000000000000")
+            await td.login("9999", "160219", "password")
+            td.on("OnRtnOrder", on_order)
+            instruments = await td.ReqQryInstrument(td.traderapi.CThostFtdcQryInstrumentField())
+    """
+
+    def __init__(self, flow_path: str = "", *, resume_type: int | None = None,
+                 query_rate: float | None = None, order_rate: float | None = None,
+                 loop: asyncio.AbstractEventLoop | None = None):
+        """
+        :param flow_path: 流文件目录
+        :param resume_type: 私有流和公共流的重传方式，默认THOST_TERT_QUICK
+        :param query_rate: 每秒查询次数，设置query_rate或order_rate时请求经过RequestScheduler流控发送
+        :param order_rate: 每秒报单和撤单次数
+        """
+        from . import thosttraderapi as traderapi
+
+        super().__init__(loop)
+        self.traderapi = traderapi
+        spi_cls = _spi_class(traderapi.CThostFtdcTraderSpi)
+        self._spi = spi_cls()
+        self._spi._client = self
+        self.api = traderapi.CThostFtdcTraderApi.CreateFtdcTraderApi(flow_path)
+        self.api.RegisterSpi(self._spi)
+        if resume_type is None:
+            resume_type = traderapi.THOST_TERT_QUICK
+        self.api.SubscribePrivateTopic(resume_type)
+        self.api.SubscribePublicTopic(resume_type)
+        if query_rate is not None or order_rate is not None:
+            from .scheduler import RequestScheduler
+            self.scheduler = RequestScheduler(self.api, query_rate=query_rate, order_rate=order_rate)
+
+    async def connect(self, front_address: str, timeout: float | None = None) -> None:
+        """注册前置地址并初始化，等待OnFrontConnected"""
+        await self._start(front_address, timeout)
+
+    async def authenticate(self, broker_id: str, user_id: str, app_id: str, auth_code: str,
+                           timeout: float | None = None):
+        """客户端认证，返回CThostFtdcRspAuthenticateField"""
+        field = self.traderapi.CThostFtdcReqAuthenticateField.from_dict({
+            'BrokerID': broker_id, 'UserID': user_id, 'AppID': app_id, 'AuthCode': auth_code,
+        })
+        results = await self.request('ReqAuthenticate', field, timeout=timeout)
+        return results[0] if results else None
+
+    async def login(self, broker_id: str, user_id: str, password: str, timeout: float | None = None):
+        """登录交易服务器，返回CThostFtdcRspUserLoginField"""
+        field = self.traderapi.CThostFtdcReqUserLoginField.from_dict({
+            'BrokerID': broker_id, 'UserID': user_id, 'Password': password,
+        })
+        results = await self.request('ReqUserLogin', field, timeout=timeout)
+        return results[0] if results else None
@@ -0,0 +1,419 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bars.py
+@Date       : 2025/12/05 16:20
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 批量行情合成K线
+    输入为DepthMarketData_dtype数组（MdTickQueueSpi.drain()、TickBusSubscriber.read()['tick']、完整格式的录制文件）
+    或精简格式的录制记录，一次处理多个合约、多个周期，输出OHLCV、成交额、持仓量K线。
+    CTP行情的几个特殊之处：
+      - 夜盘跨午夜：K线按（交易日, 交易日内时间）归属，交易日从前一天18:00开始，21:00-次日02:30与日盘属于同一交易日；
+      - ActionDay不可靠（大商所夜盘为交易日，郑商所夜盘TradingDay为自然日），K线的自然时间由交易日推算：
+        夜盘属于交易日的前一个工作日，午夜后再加一天；郑商所等TradingDay不可靠时请显式传入trading_day；
+      - Volume/Turnover为当日累计值：按合约记录上一笔累计值求增量，交易日切换时从0开始，累计值变小（前置重启等）时
+        以新值为基准且不计入负增量；首次见到的合约以第一笔为基准，成交量从下一笔开始计入。
+    同一合约的行情须按到达顺序送入，晚到的行情并入当前K线。BarEngine不是线程安全的，每个消费线程使用自己的实例。
+用法：
+    engine = BarEngine(intervals=(1, 60))
+    bars = engine.update(spi.drain(), trading_day=api.GetTradingDay())    # {60: K线数组, 1: K线数组}
+    segment = TickSegment("ticks", "20251128")
+    bars = engine.update_segment(segment)
+"""
+import numpy as np
+
+from .recorder import PACKED_TICK_DTYPE
+from .thostmduserapi import DepthMarketData_dtype
+
+BAR_DTYPE = np.dtype([
+    ('instrument_id', 'S31'),
+    ('interval', '<i4'),           # 周期（秒）
+    ('trading_day', '<i4'),        # YYYYMMDD
+    ('start', '<i4'),              # K线开始的日内毫秒
+    ('datetime', 'datetime64[ms]'),  # K线开始的自然时间
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<i8'),
+    ('turnover', '<f8'),
+    ('open_interest', '<f8'),
+    ('ticks', '<i4'),
+])
+
+DAY_MS = 86_400_000
+# 交易日内时间的起点（前一天18:00），K线以此为基准对齐
+SESSION_START_MS = 18 * 3_600_000
+# 交易日内时间小于该值的为夜盘（18:00-次日06:00）
+NIGHT_END_MS = 12 * 3_600_000
+
+_INVALID_PRICE = 1e300  # CTP以DBL_MAX表示无效价格
+
+
+def parse_digits(values: np.ndarray, positions) -> np.ndarray:
+    """定长字节串数组中指定位置的十进制数字组成的整数，如 'YYYYMMDD' -> 20251204"""
+    raw = np.frombuffer(np.ascontiguousarray(values).tobytes(), dtype=np.uint8).reshape(len(values), -1)
+    result = np.zeros(len(values), dtype=np.int64)
+    for i in positions:
+        result = result * 10 + (raw[:, i].astype(np.int64) - 48)
+    return result
+
+
+def group_instruments(ids: np.ndarray) -> tuple[list[bytes], np.ndarray]:
+    """
+    InstrumentID列 -> (不重复的合约代码, 每条行情对应的序号)
+    合约代码都不超过8字节（期货合约的常见情况）时按uint64比较，比直接对定长字节串排序快得多
+    """
+    n = len(ids)
+    raw = np.frombuffer(np.ascontiguousarray(ids).tobytes(), dtype=np.uint8).reshape(n, -1)
+    if n and raw.shape[1] > 8 and not raw[:, 8].any():
+        words = np.ascontiguousarray(raw[:, :8]).view('<u8').reshape(n)
+        unique, inverse = np.unique(words, return_inverse=True)
+        return [name.rstrip(b'\0') for name in unique.view('S8').tolist()], inverse
+    unique, inverse = np.unique(ids, return_inverse=True)
+    return unique.tolist(), inverse
+
+
+def time_of_day_ms(update_time: np.ndarray, millisec: np.ndarray) -> np.ndarray:
+    """UpdateTime（'HH:MM:SS'）+ UpdateMillisec -> 日内毫秒"""
+    raw = np.frombuffer(np.ascontiguousarray(update_time).tobytes(), dtype=np.uint8).reshape(len(update_time), -1)
+    d = raw[:, :8].astype(np.int64) - 48
+    return ((d[:, 0] * 10 + d[:, 1]) * 60 + d[:, 3] * 10 + d[:, 4]) * 60_000 + \
+        (d[:, 6] * 10 + d[:, 7]) * 1000 + millisec
+
+
+def day_to_date(day: np.ndarray) -> np.ndarray:
+    """YYYYMMDD整数 -> datetime64[D]"""
+    day = np.asarray(day, dtype=np.int64)
+    months = (day // 10000 - 1970) * 12 + day // 100 % 100 - 1
+    return months.astype('datetime64[M]').astype('datetime64[D]') + (day % 100 - 1)
+
+
+def natural_datetime(trading_day, session_ms: np.ndarray) -> np.ndarray:
+    """由交易日和交易日内时间推算自然时间：夜盘属于前一个工作日，午夜之后再加一天"""
+    days, inverse = np.unique(trading_day, return_inverse=True)
+    trading = day_to_date(days)
+    previous = np.busday_offset(trading, -1, roll='forward')
+    inverse = np.broadcast_to(inverse.reshape(-1), session_ms.shape)
+    night = session_ms < NIGHT_END_MS
+    date = np.where(night, previous[inverse], trading[inverse])
+    offset = np.where(night, session_ms + SESSION_START_MS, session_ms - (DAY_MS - SESSION_START_MS))
+    return date.astype('datetime64[ms]') + offset.astype('timedelta64[ms]')
+
+
+class _OpenBars:
+    """某个周期下各合约尚未结束的K线，按合约序号索引；key为-1表示没有"""
+
+    def __init__(self):
+        self.key = np.full(0, -1, dtype=np.int64)
+        self.open = np.zeros(0)
+        self.high = np.zeros(0)
+        self.low = np.zeros(0)
+        self.close = np.zeros(0)
+        self.volume = np.zeros(0, dtype=np.int64)
+        self.turnover = np.zeros(0)
+        self.open_interest = np.zeros(0)
+        self.ticks = np.zeros(0, dtype=np.int64)
+
+    def grow(self, n: int) -> None:
+        for name, value in vars(self).items():
+            extra = np.full(n - len(value), -1 if name == 'key' else 0, dtype=value.dtype)
+            setattr(self, name, np.concatenate((value, extra)))
+
+
+class BarEngine:
+    """多合约、多周期K线合成，update()返回本批次中已经结束的K线"""
+
+    def __init__(self, intervals=(60,)):
+        """
+        :param intervals: K线周期（秒），须能整除6小时，使K线与整点对齐
+        """
+        for interval in intervals:
+            if interval <= 0 or 21600 % interval:
+                raise ValueError(f"周期{interval}秒不能整除6小时")
+        self.intervals = tuple(intervals)
+        self.instruments: list[str] = []
+        self._ids: dict[bytes, int] = {}
+        self._names = np.zeros(0, dtype='S31')
+        self._cum_volume = np.zeros(0, dtype=np.int64)
+        self._cum_turnover = np.zeros(0)
+        self._day = np.zeros(0, dtype=np.int64)  # 上一笔的交易日，0表示尚未见到
+        self._open = {interval: _OpenBars() for interval in self.intervals}
+        self._slot_cache = None
+        self.ticks = 0
+        self.invalid = 0
+        self.resets = 0
+
+    # ---------------- 输入 ----------------
+
+    def update(self, ticks: np.ndarray, trading_day=None, instruments=None) -> dict[int, np.ndarray]:
+        """
+        处理一批行情，返回 {周期: 已结束的K线（BAR_DTYPE，按合约分组、组内按时间排列）}
+        :param ticks: DepthMarketData_dtype数组，或PACKED_TICK_DTYPE数组（须同时给出instruments和trading_day）
+        :param trading_day: 交易日（'YYYYMMDD'或整数），None时使用行情中的TradingDay
+        :param instruments: 精简记录的合约序号对应的合约代码列表（TickSegment.instruments）
+        """
+        if ticks.dtype == PACKED_TICK_DTYPE:
+            if instruments is None or trading_day is None:
+                raise ValueError("精简格式的行情需要同时给出instruments和trading_day")
+            inst = self._slot_mapping(instruments)[ticks['instrument']]
+            tod = ticks['time_ms']
+            day = int(trading_day)
+            price = ticks['last_price']
+            volume = ticks['volume']
+            turnover = ticks['turnover']
+            open_interest = ticks['open_interest']
+        elif ticks.dtype == DepthMarketData_dtype:
+            names, inverse = group_instruments(ticks['InstrumentID'])
+            mapping = np.array([self._id(name) for name in names], dtype=np.int64)
+            inst = mapping.astype(self._id_dtype())[inverse]
+            tod = time_of_day_ms(ticks['UpdateTime'], ticks['UpdateMillisec'].astype(np.int64))
+            if trading_day is None:
+                day = parse_digits(ticks['TradingDay'], range(8))
+            else:
+                day = int(trading_day)
+            price = ticks['LastPrice']
+            volume = ticks['Volume']
+            turnover = ticks['Turnover']
+            open_interest = ticks['OpenInterest']
+        else:
+            raise TypeError("ticks的dtype必须是DepthMarketData_dtype或PACKED_TICK_DTYPE")
+        return self._update(inst, day, tod, price, volume, turnover, open_interest)
+
+    def update_segment(self, segment, chunk: int = 1 << 16) -> dict[int, np.ndarray]:
+        """按块处理一个录制分段（recorder.TickSegment）的全部行情，返回已结束的K线；分段结束后可调用flush()"""
+        results = {interval: [] for interval in self.intervals}
+        packed = segment.dtype == PACKED_TICK_DTYPE
+        for start in range(0, len(segment), chunk):
+            records = np.asarray(segment.records[start:start + chunk])
+            bars = self.update(records, segment.trading_day, segment.instruments if packed else None)
+            for interval, value in bars.items():
+                results[interval].append(value)
+        return {interval: np.concatenate(parts) if parts else np.empty(0, dtype=BAR_DTYPE)
+                for interval, parts in results.items()}
+
+    def flush(self, trading_day=None, time=None) -> dict[int, np.ndarray]:
+        """
+        结束尚未完成的K线：不给参数时结束全部（收盘、文件结束）；
+        给出交易日和日内时间（'HH:MM:SS'或日内毫秒）时，只结束在该时刻之前已经到期的K线（用于定时器）
+        """
+        cut = None
+        if trading_day is not None:
+            if isinstance(time, str):
+                h, m, s = (int(part) for part in time.split(':'))
+                time = ((h * 60 + m) * 60 + s) * 1000
+            session = (int(time) - SESSION_START_MS) % DAY_MS
+            cut = int(trading_day), session
+        result = {}
+        for interval, bars in self._open.items():
+            ivms = interval * 1000
+            mask = bars.key >= 0
+            if cut is not None:
+                mask &= bars.key < cut[0] * (DAY_MS // ivms) + cut[1] // ivms
+            ids = np.flatnonzero(mask)
+            result[interval] = self._emit(interval, ids, bars.key[ids], bars.open[ids], bars.high[ids],
+                                          bars.low[ids], bars.close[ids], bars.volume[ids], bars.turnover[ids],
+                                          bars.open_interest[ids], bars.ticks[ids])
+            bars.key[ids] = -1
+        return result
+
+    def open_bars(self, interval: int) -> np.ndarray:
+        """某个周期下各合约尚未结束的K线（只读快照）"""
+        bars = self._open[interval]
+        ids = np.flatnonzero(bars.key >= 0)
+        return self._emit(interval, ids, bars.key[ids], bars.open[ids], bars.high[ids], bars.low[ids],
+                          bars.close[ids], bars.volume[ids], bars.turnover[ids], bars.open_interest[ids],
+                          bars.ticks[ids])
+
+    # ---------------- 内部 ----------------
+
+    def _slot_mapping(self, instruments) -> np.ndarray:
+        """录制分段的合约序号 -> 本引擎的合约序号；分段的合约列表只会追加，按对象和长度缓存"""
+        cached = self._slot_cache
+        if cached is not None and cached[0] is instruments and cached[1] == len(instruments):
+            return cached[2]
+        ids = [self._id(name.encode() if isinstance(name, str) else name) for name in instruments]
+        mapping = np.array(ids, dtype=np.int64).astype(self._id_dtype())
+        self._slot_cache = (instruments, len(instruments), mapping)
+        return mapping
+
+    def _id_dtype(self):
+        return np.uint16 if len(self.instruments) <= 0x10000 else np.int64
+
+    def _id(self, name: bytes) -> int:
+        instrument = self._ids.get(name)
+        if instrument is None:
+            instrument = self._ids[name] = len(self.instruments)
+            self.instruments.append(name.decode('ascii', 'replace'))
+            n = len(self.instruments)
+            if n > len(self._names):
+                size = max(n, 2 * len(self._names), 64)
+                self._names = np.concatenate((self._names, np.zeros(size - len(self._names), dtype='S31')))
+                self._cum_volume = np.concatenate((self._cum_volume, np.zeros(size - len(self._cum_volume), np.int64)))
+                self._cum_turnover = np.concatenate((self._cum_turnover, np.zeros(size - len(self._cum_turnover))))
+                self._day = np.concatenate((self._day, np.zeros(size - len(self._day), np.int64)))
+                for bars in self._open.values():
+                    bars.grow(size)
+            self._names[instrument] = name[:31]
+        return instrument
+
+    def _update(self, inst, day, tod, price, volume, turnover, open_interest) -> dict[int, np.ndarray]:
+        """day为整数（整批同一交易日）或数组"""
+        columns = [inst, tod, price, volume, turnover, open_interest]
+        if np.ndim(day):
+            columns.append(day)
+        valid = (price > 0) & (price < _INVALID_PRICE) & (tod >= 0) & (tod < DAY_MS)
+        n = int(np.count_nonzero(valid))
+        self.invalid += len(valid) - n
+        self.ticks += n
+        if n == 0:
+            return {interval: np.empty(0, dtype=BAR_DTYPE) for interval in self.intervals}
+        if n < len(valid):
+            columns = [a[valid] for a in columns]
+
+        # 按合约分组，组内保持到达顺序；合约序号为uint16时numpy使用基数排序，
+        # 先转为连续数组再按序取值，比直接从记录中跨步取值快
+        inst = columns[0]
+        if n > 1 and (inst != inst[0]).any():
+            order = np.argsort(inst, kind='stable')
+            columns = [np.take(np.ascontiguousarray(a), order) for a in columns]
+        else:
+            columns = [np.ascontiguousarray(a) for a in columns]
+        inst, tod, price, volume, turnover, open_interest = columns[:6]
+        day = columns[6].astype(np.int64) if np.ndim(day) else np.int64(day)
+        first = np.ones(n, dtype=bool)
+        first[1:] = inst[1:] != inst[:-1]
+        last = np.ones(n, dtype=bool)
+        last[:-1] = first[1:]
+
+        # 累计成交量、成交额 -> 增量
+        if np.ndim(day):
+            previous_day = np.empty(n, dtype=np.int64)
+            previous_day[1:] = day[:-1]
+        else:
+            previous_day = np.full(n, day, dtype=np.int64)
+        previous_day[first] = self._day[inst[first]]
+        delta_volume = self._delta(volume.astype(np.int64), self._cum_volume, inst, first, previous_day, day, True)
+        delta_turnover = self._delta(turnover, self._cum_turnover, inst, first, previous_day, day, False)
+        self._cum_volume[inst[last]] = volume[last]
+        self._cum_turnover[inst[last]] = turnover[last]
+        self._day[inst[last]] = day[last] if np.ndim(day) else day
+
+        tod = tod.astype(np.int64)
+        session = np.where(tod >= SESSION_START_MS, tod - SESSION_START_MS, tod + (DAY_MS - SESSION_START_MS))
+        return {interval: self._aggregate(interval, inst, first, day, session, price, delta_volume,
+                                          delta_turnover, open_interest)
+                for interval in self.intervals}
+
+    def _delta(self, cumulative, state, inst, first, previous_day, day, count_resets):
+        previous = np.empty_like(cumulative)
+        previous[1:] = cumulative[:-1]
+        previous[first] = state[inst[first]]
+        delta = cumulative - previous
+        # 交易日切换时累计值从0开始；首次见到的合约以第一笔为基准
+        new_day = previous_day != day
+        if new_day.any():
+            delta[new_day] = cumulative[new_day]
+            delta[previous_day == 0] = 0
+        reset = delta < 0
+        if reset.any():
+            if count_resets:
+                self.resets += int(np.count_nonzero(reset))
+            delta[reset] = 0
+        return delta
+
+    def _aggregate(self, interval, inst, first, day, session, price, volume, turnover, open_interest):
+        ivms = interval * 1000
+        bars = self._open[interval]
+        key = day * (DAY_MS // ivms) + session // ivms
+        # 晚到的行情并入当前K线：与未结束的K线及组内之前的行情取最大值
+        key = np.maximum(key, bars.key[inst])
+        disorder = key[1:] < key[:-1]
+        disorder &= ~first[1:]
+        if disorder.any():
+            group = np.cumsum(first) - 1
+            span = int(key.max()) + 1
+            key = np.maximum.accumulate(key + group * span) - group * span
+
+        boundary = first.copy()
+        boundary[1:] |= key[1:] != key[:-1]
+        starts = np.flatnonzero(boundary)
+        ends = np.append(starts[1:], len(key)) - 1
+        run_inst = inst[starts]
+        run_key = key[starts]
+        run_open = price[starts]
+        run_high = np.maximum.reduceat(price, starts)
+        run_low = np.minimum.reduceat(price, starts)
+        run_close = price[ends]
+        run_volume = np.add.reduceat(volume, starts)
+        run_turnover = np.add.reduceat(turnover, starts)
+        run_oi = open_interest[ends]
+        run_ticks = np.diff(np.append(starts, len(key)))
+
+        # 每个合约的第一段与未结束的K线相同时合并，否则未结束的K线到此结束
+        group_first = first[starts]
+        state_key = bars.key[run_inst]
+        merge = group_first & (state_key == run_key)
+        m_inst = run_inst[merge]
+        run_open[merge] = bars.open[m_inst]
+        run_high[merge] = np.maximum(run_high[merge], bars.high[m_inst])
+        run_low[merge] = np.minimum(run_low[merge], bars.low[m_inst])
+        run_volume[merge] += bars.volume[m_inst]
+        run_turnover[merge] += bars.turnover[m_inst]
+        run_ticks[merge] += bars.ticks[m_inst]
+        closed = group_first & ~merge & (state_key >= 0)
+        c_inst = run_inst[closed]
+        closed_bars = self._emit(interval, c_inst, bars.key[c_inst], bars.open[c_inst], bars.high[c_inst],
+                                 bars.low[c_inst], bars.close[c_inst], bars.volume[c_inst], bars.turnover[c_inst],
+                                 bars.open_interest[c_inst], bars.ticks[c_inst])
+
+        # 每个合约的最后一段成为新的未结束K线，其余各段已经结束
+        group_last = np.append(group_first[1:], True)
+        o_inst = run_inst[group_last]
+        bars.key[o_inst] = run_key[group_last]
+        bars.open[o_inst] = run_open[group_last]
+        bars.high[o_inst] = run_high[group_last]
+        bars.low[o_inst] = run_low[group_last]
+        bars.close[o_inst] = run_close[group_last]
+        bars.volume[o_inst] = run_volume[group_last]
+        bars.turnover[o_inst] = run_turnover[group_last]
+        bars.open_interest[o_inst] = run_oi[group_last]
+        bars.ticks[o_inst] = run_ticks[group_last]
+        done = ~group_last
+        run_bars = self._emit(interval, run_inst[done], run_key[done], run_open[done], run_high[done],
+                              run_low[done], run_close[done], run_volume[done], run_turnover[done],
+                              run_oi[done], run_ticks[done])
+        if not len(closed_bars):
+            return run_bars
+        if not len(run_bars):
+            return closed_bars
+        # 已结束的K线排在本批同一合约的K线之前
+        merged = np.concatenate((closed_bars, run_bars))
+        order = np.argsort(np.concatenate((c_inst, run_inst[done])), kind='stable')
+        return merged[order]
+
+    def _emit(self, interval, inst, key, open_, high, low, close, volume, turnover, open_interest, ticks):
+        ivms = interval * 1000
+        per_day = DAY_MS // ivms
+        out = np.empty(len(inst), dtype=BAR_DTYPE)
+        if not len(inst):
+            return out
+        day = key // per_day
+        session = key % per_day * ivms
+        out['instrument_id'] = self._names[inst]
+        out['interval'] = interval
+        out['trading_day'] = day
+        out['start'] = (session + SESSION_START_MS) % DAY_MS
+        out['datetime'] = natural_datetime(day, session)
+        out['open'] = open_
+        out['high'] = high
+        out['low'] = low
+        out['close'] = close
+        out['volume'] = volume
+        out['turnover'] = turnover
+        out['open_interest'] = open_interest
+        out['ticks'] = ticks
+        return out
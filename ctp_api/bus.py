@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : bus.py
+@Date       : 2025/12/04 15:10
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 共享内存行情总线
+    一个进程登录行情前置并订阅全部合约，TickBusPublisher（原生实现）作为行情旁路在CTP回调线程中写入
+    共享内存环形缓冲区；各策略进程以TickBusSubscriber读取，按合约过滤，不再各自建立行情会话。
+    读取时一次复制一批记录到预分配的数组，不经过Python对象、序列化或套接字。
+    每条记录带全局序号和合约内序号：订阅者读取不及时被覆盖的记录计入lost()，
+    按合约过滤后可用GapDetector检查每个合约的行情是否连续。
+用法：
+    # 行情进程
+    publisher = attach_publisher(spi, "md")          # spi为MdTickQueueSpi
+    # 策略进程
+    subscriber = TickBusSubscriber(bus_path("md"))
+    subscriber.subscribe(["rb2601", "SA601"])
+    for records in stream(subscriber):
+        ticks = records['tick']
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .thostmduserapi import TickBusPublisher, TickBusRecord_dtype, TickBusSubscriber
+
+
+def bus_path(name: str) -> str:
+    """总线文件路径：Linux下位于/dev/shm（不落盘），其他系统位于临时目录"""
+    shm = Path('/dev/shm')
+    directory = shm if sys.platform.startswith('linux') and shm.is_dir() else Path(tempfile.gettempdir())
+    return str(directory / f"ctp_bus_{name}")
+
+
+def attach_publisher(spi, name: str, capacity: int = 1 << 16, max_instruments: int = 8192) -> TickBusPublisher:
+    """
+    创建总线并挂接到MdTickQueueSpi，之后收到的深度行情都会发布到总线
+    只需要总线时可以把spi的队列容量设为0，行情不再进入本进程的队列
+    """
+    publisher = TickBusPublisher(bus_path(name), capacity, max_instruments)
+    spi.add_sink(publisher)
+    return publisher
+
+
+def stream(subscriber: TickBusSubscriber, max_n: int = 1024, idle: float = 0.0005, timeout: float | None = None):
+    """
+    持续读取总线，每次产出一批非空的TickBusRecord_dtype数组
+    产出的数组在下一批读取时被复用，需要保留时请copy()；发布者关闭且已读完时结束
+    :param idle: 没有新行情时的休眠秒数
+    :param timeout: 连续无行情超过该秒数时结束，None表示一直等待
+    """
+    out = np.empty(max_n, dtype=TickBusRecord_dtype)
+    last = time.monotonic()
+    while True:
+        records = subscriber.read(max_n, out)
+        if len(records):
+            last = time.monotonic()
+            yield records
+            continue
+        if subscriber.closed() and not subscriber.pending():
+            return
+        if timeout is not None and time.monotonic() - last > timeout:
+            return
+        time.sleep(idle)
+
+
+class GapDetector:
+    """按合约序号检查行情是否连续；每个合约从第一次看到的记录开始计算"""
+
+    def __init__(self):
+        self.expected = np.full(0, -1, dtype=np.int64)
+        self.missing = 0
+
+    def update(self, records: np.ndarray) -> int:
+        """检查一批记录，返回本批发现的缺失条数"""
+        if not len(records):
+            return 0
+        instrument = records['instrument'].astype(np.int64)
+        seq = records['instrument_seq'].astype(np.int64)
+        if instrument.max() >= len(self.expected):
+            grown = np.full(int(instrument.max()) + 1, -1, dtype=np.int64)
+            grown[:len(self.expected)] = self.expected
+            self.expected = grown
+        order = np.argsort(instrument, kind='stable')
+        instrument, seq = instrument[order], seq[order]
+        first = np.ones(len(seq), dtype=bool)
+        first[1:] = instrument[1:] != instrument[:-1]
+        previous = np.empty_like(seq)
+        previous[1:] = seq[:-1] + 1
+        previous[first] = self.expected[instrument[first]]
+        # 第一次看到的合约（expected为-1）不计缺失
+        gaps = np.where(previous < 0, 0, np.maximum(seq - previous, 0))
+        last = np.append(first[1:], True)
+        self.expected[instrument[last]] = seq[last] + 1
+        found = int(gaps.sum())
+        self.missing += found
+        return found
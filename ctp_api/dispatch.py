@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : dispatch.py
+@Date       : 2025/12/05 09:40
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 按合约分片的多线程回调分发
+    行情由原生的ShardedTickQueue在CTP回调线程中按InstrumentID哈希放入分片，每个分片由一个工作线程批量取出处理；
+    交易回报等其他回调通过post()/forward()按同样的哈希放入同一工作线程的事件队列。
+    同一合约的事件始终由同一线程按到达顺序处理，不同合约的处理在自由线程构建（python3.13t）下可以真正并行，
+    普通构建下等待行情时释放GIL，处理函数中调用NumPy等释放GIL的代码时也能重叠执行。
+用法：
+    def on_ticks(shard, ticks):          # ticks为DepthMarketData_dtype数组，下一批时复用
+        ...
+    dispatcher = ShardedDispatcher(on_ticks, workers=4, policy='block')
+    dispatcher.attach(spi)               # spi为MdTickQueueSpi，可把其队列容量设为0
+    on_order = dispatcher.forward(strategy.on_order)
+    # CThostFtdcTraderSpi.OnRtnOrder中调用 on_order(pOrder)
+"""
+import threading
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from .thostmduserapi import DepthMarketData_dtype, ShardedTickQueue
+
+POLICIES = {
+    'drop_newest': ShardedTickQueue.kDropNewest,
+    'drop_oldest': ShardedTickQueue.kDropOldest,
+    'block': ShardedTickQueue.kBlock,
+}
+
+
+@dataclass
+class ShardStats:
+    """单个分片的统计；行情与事件队列分别计数，blocked为生产者因队列满而等待的次数"""
+    depth: int = 0
+    max_depth: int = 0
+    pushed: int = 0
+    dropped: int = 0
+    blocked: int = 0
+    events: int = 0
+    events_dropped: int = 0
+    batches: int = 0
+    errors: int = 0
+
+
+class _EventQueue:
+    """分片的Python事件队列，满时的处理方式与行情队列相同"""
+
+    def __init__(self, capacity: int, policy: int, block_timeout: float):
+        self.items: deque = deque()
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.space = threading.Condition(threading.Lock())
+        self.dropped = 0
+        self.blocked = 0
+
+    def put(self, item) -> bool:
+        with self.space:
+            if len(self.items) >= self.capacity:
+                if self.policy == ShardedTickQueue.kBlock:
+                    self.blocked += 1
+                    self.space.wait_for(lambda: len(self.items) < self.capacity, self.block_timeout)
+                elif self.policy == ShardedTickQueue.kDropOldest:
+                    self.items.popleft()
+                    self.dropped += 1
+                if len(self.items) >= self.capacity:
+                    self.dropped += 1
+                    return False
+            self.items.append(item)
+            return True
+
+    def take(self, max_n: int) -> list:
+        with self.space:
+            n = min(max_n, len(self.items))
+            batch = [self.items.popleft() for _ in range(n)]
+            if n:
+                self.space.notify_all()
+            return batch
+
+
+class ShardedDispatcher:
+    """按合约分片的工作线程池，同一合约的行情和事件按到达顺序处理"""
+
+    def __init__(self, on_ticks: Callable | None = None, workers: int = 4, *, capacity: int = 16384,
+                 policy: str = 'drop_newest', block_timeout: float = 0.1, max_batch: int = 256,
+                 event_capacity: int = 16384, on_error: Callable | None = None, name: str = 'ctp-shard'):
+        """
+        :param on_ticks: 行情批处理函数 on_ticks(shard, ticks)，ticks在下一批时被复用，需要保留时请copy()
+        :param workers: 工作线程（分片）数
+        :param capacity: 每个分片的行情队列容量
+        :param policy: 队列满时的处理方式：'drop_newest'、'drop_oldest'、'block'（生产者最多等待block_timeout秒）
+        :param max_batch: 每批最多处理的行情或事件数
+        :param event_capacity: 每个分片的事件队列容量
+        :param on_error: 处理函数抛出异常时调用 on_error(exc)，默认打印堆栈
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"policy必须是{', '.join(POLICIES)}之一")
+        self.on_ticks = on_ticks
+        self.on_error = on_error
+        self.max_batch = max_batch
+        self.queue = ShardedTickQueue(workers, capacity, POLICIES[policy], int(block_timeout * 1000))
+        self._events = [_EventQueue(event_capacity, POLICIES[policy], block_timeout) for _ in range(workers)]
+        self._batches = [0] * workers
+        self._errors = [0] * workers
+        self._closing = False
+        self._threads = [threading.Thread(target=self._run, args=(shard,), name=f'{name}-{shard}', daemon=True)
+                         for shard in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def workers(self) -> int:
+        return len(self._threads)
+
+    def attach(self, spi) -> None:
+        """挂接到MdTickQueueSpi，深度行情在CTP线程中直接按合约分片"""
+        spi.add_sink(self.queue)
+
+    def detach(self, spi) -> None:
+        spi.remove_sink(self.queue)
+
+    def shard_of(self, instrument_id: str) -> int:
+        return self.queue.shard_of(instrument_id)
+
+    def post(self, instrument_id: str, fn: Callable, *args) -> bool:
+        """把 fn(*args) 放入合约所在分片的工作线程执行，队列满被丢弃时返回False"""
+        if self._closing:
+            return False
+        shard = self.queue.shard_of(instrument_id)
+        if not self._events[shard].put((fn, args)):
+            return False
+        self.queue.wake(shard)
+        return True
+
+    def forward(self, handler: Callable, key: str = 'InstrumentID') -> Callable:
+        """
+        返回可在CTP回调中直接调用的函数：复制结构体参数后按其key字段分片，在工作线程中调用 handler(field, *args)
+        回调中收到的结构体只在回调期间有效，因此这里总是先copy()
+        """
+        def forward_event(field, *args) -> bool:
+            if field is None:
+                return False
+            field = field.copy()
+            return self.post(getattr(field, key), handler, field, *args)
+        return forward_event
+
+    def stats(self) -> list[ShardStats]:
+        """各分片统计的快照"""
+        result = []
+        for shard, events in enumerate(self._events):
+            q = self.queue
+            result.append(ShardStats(q.depth(shard), q.max_depth(shard), q.pushed(shard), q.dropped(shard),
+                                     q.blocked(shard) + events.blocked, len(events.items), events.dropped,
+                                     self._batches[shard], self._errors[shard]))
+        return result
+
+    def close(self, wait: bool = True) -> None:
+        """停止接收新的行情和事件，工作线程处理完已入队的部分后退出"""
+        self._closing = True
+        self.queue.close()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _report(self, shard: int, exc: BaseException) -> None:
+        self._errors[shard] += 1
+        if self.on_error is not None:
+            self.on_error(exc)
+        else:
+            traceback.print_exception(exc)
+
+    def _run(self, shard: int) -> None:
+        out = np.empty(self.max_batch, dtype=DepthMarketData_dtype)
+        events = self._events[shard]
+        queue = self.queue
+        while True:
+            batch = events.take(self.max_batch) if events.items else None
+            for fn, args in batch or ():
+                try:
+                    fn(*args)
+                except Exception as e:
+                    self._report(shard, e)
+            n = queue.drain_into(shard, out)
+            if n:
+                self._batches[shard] += 1
+                if self.on_ticks is not None:
+                    try:
+                        self.on_ticks(shard, out[:n])
+                    except Exception as e:
+                        self._report(shard, e)
+            if n or batch:
+                continue
+            if self._closing:
+                # 看到关闭标志后再检查一次，关闭前刚放入的事件也要处理完
+                if events.items or queue.depth(shard):
+                    continue
+                return
+            queue.wait(shard, 100)
@@ -0,0 +1,777 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : md_shards.py
+@Date       : 2025/12/08 10:30
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 多会话分片行情客户端
+    单个CThostFtdcMdApi会话订阅全市场时，全部合约挤在一个回调线程和一条TCP连接上。ShardedMdClient把订阅的合约
+    分散到N个行情会话（轮流使用多个前置地址），会话可以在本进程中（每个会话自己的CTP线程写入原生队列），
+    也可以在工作进程中（行情经共享内存总线TickBus传回，不经过序列化），消费者看到的是合并后的一路行情：
+      - 去重：同一合约按（交易日内时间, 累计成交量）只接受更新的行情，两者都相同时再比较价格、盘口和持仓量
+        （郑商所UpdateMillisec恒为0，只有盘口变化时成交量也不变），迁移合约时新旧会话重叠期间、
+        断线重连后前置重发的快照都会被丢弃；
+      - 排序：按交易日内时间（UpdateTime + UpdateMillisec）合并，水位为各活跃会话最新行情时间的最小值，
+        水位之前的行情按时间顺序输出；较慢的会话最多让行情在缓冲中等待window秒；
+      - 再平衡：按测得的各合约行情速率定期迁移合约，使各会话负载不超过平均值的(1 + tolerance)倍，
+        迁移时先在新会话订阅、handover秒后再在旧会话退订，不丢行情；
+      - 指标：每个会话的行情速率、重复条数、延迟（本机收到时间 - 行情时间，含两端时钟偏差）、落后于最新会话的时间、
+        队列积压和丢弃条数。
+    时间只取UpdateTime：交易日切换时（某合约的行情时间比上一笔早一小时以上）该合约的去重状态重新开始。
+    process模式的工作进程以spawn方式启动，主程序需放在 if __name__ == '__main__': 之下。
+用法：
+    client = ShardedMdClient(["tcp://180.168.146.187:10211", "tcp://180.168.146.187:10212"],
+                             "9999", "160219", "password", shards=4, mode='process')
+    client.start()
+    client.wait_ready()
+    client.subscribe(instrument_ids)
+    for ticks in client.ticks():         # DepthMarketData_dtype数组，按时间排序
+        ...
+    print(client.stats())
+    client.close()
+"""
+import multiprocessing
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .bars import DAY_MS, SESSION_START_MS, group_instruments, time_of_day_ms
+from .bus import attach_publisher, bus_path
+from .thostmduserapi import (
+    CThostFtdcMdApi,
+    CThostFtdcReqUserLoginField,
+    DepthMarketData_dtype,
+    MdTickQueueSpi,
+    TickBusRecord_dtype,
+    TickBusSubscriber,
+)
+
+# 同一合约的行情时间比上一笔早这么多时，视为进入新的交易日
+ROLLOVER_MS = 3_600_000
+
+MODES = ('thread', 'process')
+
+# 区分同一时间、同一成交量的不同行情快照的字段（只有盘口变化时时间和成交量都可能不变）
+CONTENT_FIELDS = ('LastPrice', 'Turnover', 'OpenInterest') + tuple(
+    f"{side}{kind}{level}" for level in range(1, 6) for side in ('Bid', 'Ask') for kind in ('Price', 'Volume'))
+
+_FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+_FNV_PRIME = np.uint64(0x100000001b3)
+
+
+def session_ms(ticks: np.ndarray) -> np.ndarray:
+    """行情的交易日内时间（毫秒，从前一天18:00起算），夜盘跨午夜时仍然递增"""
+    tod = time_of_day_ms(ticks['UpdateTime'], ticks['UpdateMillisec'].astype(np.int64))
+    return np.where(tod >= SESSION_START_MS, tod - SESSION_START_MS, tod + (DAY_MS - SESSION_START_MS))
+
+
+def content_hash(ticks: np.ndarray) -> np.ndarray:
+    """按CONTENT_FIELDS计算每条行情的64位内容哈希（int64），用于识别多个会话收到的同一快照"""
+    h = np.full(len(ticks), _FNV_OFFSET, dtype=np.uint64)
+    for name in CONTENT_FIELDS:
+        values = ticks[name]
+        bits = values.astype(np.float64).view(np.uint64) if values.dtype.kind == 'f' else values.astype(np.uint64)
+        h ^= bits
+        h *= _FNV_PRIME
+    return h.view(np.int64)
+
+
+def local_session_ms(now: float | None = None) -> int:
+    """本机时间对应的交易日内时间（毫秒）"""
+    now = time.time() if now is None else now
+    t = time.localtime(now)
+    tod = ((t.tm_hour * 60 + t.tm_min) * 60 + t.tm_sec) * 1000 + int(now % 1 * 1000)
+    return tod - SESSION_START_MS if tod >= SESSION_START_MS else tod + (DAY_MS - SESSION_START_MS)
+
+
+class TickMerger:
+    """把多个会话的行情合并为一路：按合约去重，按交易日内时间排序输出"""
+
+    def __init__(self, sources: int, window: float = 0.05, idle: float = 1.0):
+        """
+        :param sources: 会话数
+        :param window: 行情在缓冲中最多等待的秒数（等待较慢的会话）
+        :param idle: 会话超过该秒数没有行情时不参与水位计算，避免冷门合约所在的会话拖住其他会话
+        """
+        self.window = window
+        self.idle = idle
+        self.received = [0] * sources
+        self.duplicates = [0] * sources
+        self.lag_ms = [0.0] * sources
+        self.newest = np.full(sources, -1, dtype=np.int64)    # 各会话收到的最新行情时间（交易日切换时重置）
+        self.seen = np.full(sources, -np.inf)                 # 各会话最近一次收到行情的单调时间
+        self._ids: dict[bytes, int] = {}
+        self._last = np.full(0, -1, dtype=np.int64)           # 各合约已接受行情的 (时间 << 32 | 成交量)
+        self._last_hash = np.zeros(0, dtype=np.int64)         # 对应行情的内容哈希
+        self._extra: dict[int, set[int]] = {}                 # 同一 (时间, 成交量) 已接受多条不同快照时的全部哈希
+        self._pending: list[tuple[np.ndarray, np.ndarray, float]] = []
+
+    def _index(self, names: list[bytes]) -> np.ndarray:
+        ids = self._ids
+        index = np.fromiter((ids.setdefault(name, len(ids)) for name in names), dtype=np.int64, count=len(names))
+        if len(ids) > len(self._last):
+            grown = np.full(max(len(ids), 2 * len(self._last)), -1, dtype=np.int64)
+            grown[:len(self._last)] = self._last
+            self._last = grown
+            self._last_hash = np.resize(self._last_hash, len(grown))
+        return index
+
+    def push(self, source: int, ticks: np.ndarray, now: float | None = None) -> int:
+        """
+        放入某个会话读到的一批行情（会复制，ticks可以是复用的缓冲区），返回去重后接受的条数
+        :param now: 单调时间（time.monotonic()），默认为当前时间
+        """
+        n = len(ticks)
+        if n == 0:
+            return 0
+        now = time.monotonic() if now is None else now
+        keys = session_ms(ticks)
+        self.received[source] += n
+        newest = int(keys.max())
+        if self.newest[source] - newest <= ROLLOVER_MS:
+            newest = max(newest, int(self.newest[source]))
+        self.newest[source] = newest
+        self.seen[source] = now
+        lag = local_session_ms() - float(keys.mean())
+        self.lag_ms[source] = lag if self.lag_ms[source] == 0 else 0.8 * self.lag_ms[source] + 0.2 * lag
+
+        names, inverse = group_instruments(ticks['InstrumentID'])
+        instrument = self._index(names)[inverse]
+        composite = (keys << 32) | (ticks['Volume'].astype(np.int64) & 0xffffffff)
+        order = np.lexsort((composite, instrument))
+        inst, comp = instrument[order], composite[order]
+        digest = content_hash(ticks)[order]
+        first = np.ones(n, dtype=bool)
+        first[1:] = inst[1:] != inst[:-1]
+        base = self._last[inst]
+        # 本批最早一笔比已接受的早一小时以上：新的交易日，该合约不再与之前的行情比较
+        starts = np.flatnonzero(first)
+        rolled = (base[starts] >= 0) & ((base[starts] >> 32) - (comp[starts] >> 32) > ROLLOVER_MS)
+        base[np.repeat(rolled, np.diff(np.append(starts, n)))] = -1
+        accepted = comp > base
+        # 与已接受的行情或批内相邻行情的 (时间, 成交量) 相同时，再按内容区分是重复还是新的快照
+        same = np.zeros(n, dtype=bool)
+        same[1:] = (comp[1:] == comp[:-1]) & ~first[1:]
+        ties = same | np.append(same[1:], False) | (comp == base)
+        resolved = self._resolve_ties(np.flatnonzero(ties), inst, comp, base, digest, accepted) if ties.any() else {}
+
+        last = np.append(first[1:], True)
+        group_inst, group_max = inst[last], comp[last]
+        advanced = rolled | (group_max > self._last[group_inst])
+        self._last[group_inst] = np.where(rolled, group_max, np.maximum(self._last[group_inst], group_max))
+        moved = group_inst[advanced]
+        self._last_hash[moved] = digest[last][advanced]
+        if self._extra:
+            for index in moved.tolist():
+                self._extra.pop(index, None)
+        for index, (value, hashes) in resolved.items():
+            if value == self._last[index]:
+                self._last_hash[index] = next(iter(hashes))
+                if len(hashes) > 1:
+                    self._extra[index] = hashes
+                else:
+                    self._extra.pop(index, None)
+
+        keep = np.empty(n, dtype=bool)
+        keep[order] = accepted
+        kept = int(keep.sum())
+        self.duplicates[source] += n - kept
+        if kept:
+            self._pending.append((ticks[keep], keys[keep], now))
+        return kept
+
+    def _resolve_ties(self, ties: np.ndarray, inst: np.ndarray, comp: np.ndarray, base: np.ndarray,
+                      digest: np.ndarray, accepted: np.ndarray) -> dict[int, tuple[int, set[int]]]:
+        """逐条处理 (时间, 成交量) 相同的行情：内容未出现过的接受，返回 {合约: (时间 << 32 | 成交量, 哈希集合)}"""
+        resolved = {}
+        current = None
+        hashes: set[int] = set()
+        for j, index, value, floor, h in zip(ties.tolist(), inst[ties].tolist(), comp[ties].tolist(),
+                                             base[ties].tolist(), digest[ties].tolist()):
+            if (index, value) != current:
+                current = (index, value)
+                hashes = set()
+                if value == floor:
+                    hashes.add(int(self._last_hash[index]))
+                    hashes.update(self._extra.get(index, ()))
+                resolved[index] = (value, hashes)
+            accepted[j] = value >= floor and h not in hashes
+            hashes.add(h)
+        return resolved
+
+    def watermark(self, now: float | None = None) -> int:
+        """活跃会话最新行情时间的最小值，没有活跃会话时为-1"""
+        now = time.monotonic() if now is None else now
+        active = (now - self.seen <= self.idle) & (self.newest >= 0)
+        return int(self.newest[active].min()) if active.any() else -1
+
+    def pop(self, now: float | None = None, flush: bool = False) -> np.ndarray:
+        """
+        取出可以输出的行情：时间不晚于水位，或在缓冲中已等待超过window秒；flush为True时取出全部
+        :return: 按交易日内时间排序的DepthMarketData_dtype数组
+        """
+        if not self._pending:
+            return np.empty(0, dtype=DepthMarketData_dtype)
+        now = time.monotonic() if now is None else now
+        if len(self._pending) == 1:
+            ticks, keys, arrived = self._pending[0]
+            arrived = np.full(len(ticks), arrived)
+        else:
+            ticks = np.concatenate([item[0] for item in self._pending])
+            keys = np.concatenate([item[1] for item in self._pending])
+            arrived = np.concatenate([np.full(len(item[0]), item[2]) for item in self._pending])
+        if flush:
+            ready = np.ones(len(ticks), dtype=bool)
+        else:
+            ready = (keys <= self.watermark(now)) | (arrived <= now - self.window)
+        self._pending = []
+        if not ready.all():
+            rest = ~ready
+            self._pending.append((ticks[rest], keys[rest], float(arrived[rest].min())))
+            ticks, keys = ticks[ready], keys[ready]
+        return ticks[np.argsort(keys, kind='stable')]
+
+    def pending(self) -> int:
+        return sum(len(item[0]) for item in self._pending)
+
+
+def plan_rebalance(assignment: dict[str, int], rates: dict[str, float], shards: int, tolerance: float = 0.2,
+                   max_moves: int | None = None) -> list[tuple[str, int, int]]:
+    """
+    按合约行情速率规划迁移，使各会话负载不超过平均值的(1 + tolerance)倍，迁移次数尽量少
+    每一步把最重会话中速率最接近两者差值一半的合约移到最轻的会话
+    :param assignment: {合约: 会话序号}
+    :param rates: {合约: 每秒行情条数}，没有的按0计
+    :return: [(合约, 原会话, 新会话), ...]
+    """
+    load = [0.0] * shards
+    members: list[list[str]] = [[] for _ in range(shards)]
+    for instrument, shard in assignment.items():
+        load[shard] += rates.get(instrument, 0.0)
+        members[shard].append(instrument)
+    mean = sum(load) / shards
+    moves = []
+    limit = len(assignment) if max_moves is None else max_moves
+    while len(moves) < limit and mean > 0:
+        heavy = max(range(shards), key=load.__getitem__)
+        light = min(range(shards), key=load.__getitem__)
+        if load[heavy] <= mean * (1 + tolerance):
+            break
+        gap = load[heavy] - load[light]
+        # 只有速率小于差值的合约移过去后才能缩小差距
+        candidates = [name for name in members[heavy] if 0 < rates.get(name, 0.0) < gap]
+        if not candidates:
+            break
+        instrument = min(candidates, key=lambda name: abs(rates[name] - gap / 2))
+        members[heavy].remove(instrument)
+        members[light].append(instrument)
+        load[heavy] -= rates[instrument]
+        load[light] += rates[instrument]
+        moves.append((instrument, heavy, light))
+    return moves
+
+
+@dataclass
+class ShardMetrics:
+    """单个会话的指标；rate为最近一个统计周期的行情速率，lag_ms为本机收到时间 - 行情时间（含时钟偏差）"""
+    front: str
+    state: str
+    instruments: int = 0
+    received: int = 0
+    duplicates: int = 0
+    rate: float = 0.0
+    lag_ms: float = 0.0
+    behind_ms: float = 0.0
+    backlog: int = 0
+    lost: int = 0
+    disconnects: int = 0
+    error: str = ''
+
+
+class _SessionSpi(MdTickQueueSpi):
+    """深度行情由原生代码写入队列或总线，其余回调交给_MdSession"""
+
+    def __init__(self, session, queue_capacity: int):
+        super().__init__(queue_capacity)
+        self.session = session
+
+    def OnFrontConnected(self):
+        self.session.on_connected()
+
+    def OnFrontDisconnected(self, nReason):
+        self.session.on_disconnected(nReason)
+
+    def OnRspUserLogin(self, pRspUserLogin, pRspInfo, nRequestID, bIsLast):
+        self.session.on_login(pRspUserLogin, pRspInfo)
+
+    def OnRspSubMarketData(self, pSpecificInstrument, pRspInfo, nRequestID, bIsLast):
+        if pRspInfo is not None and pRspInfo.ErrorID != 0:
+            instrument = pSpecificInstrument.InstrumentID if pSpecificInstrument is not None else ''
+            self.session.error = f"订阅 {instrument} 失败: [{pRspInfo.ErrorID}] {pRspInfo.ErrorMsg}"
+
+
+class _MdSession:
+    """一个行情会话：连接后自动登录，断线重连并重新登录后恢复订阅"""
+
+    def __init__(self, front: str, broker_id: str, user_id: str, password: str, flow_path: str,
+                 queue_capacity: int):
+        self.front = front
+        self.login_fields = {'BrokerID': broker_id, 'UserID': user_id, 'Password': password}
+        self.state = 'created'
+        self.error = ''
+        self.trading_day = ''
+        self.disconnects = 0
+        self._instruments: set[str] = set()
+        self._lock = threading.Lock()
+        self._request_id = 0
+        Path(flow_path).mkdir(parents=True, exist_ok=True)
+        self.spi = _SessionSpi(self, queue_capacity)
+        self.api = CThostFtdcMdApi.CreateFtdcMdApi(os.path.join(flow_path, ''))
+        self.api.RegisterSpi(self.spi)
+        self.api.RegisterFront(front)
+
+    def start(self) -> None:
+        self.state = 'connecting'
+        self.api.Init()
+
+    def on_connected(self) -> None:
+        self.state = 'login'
+        self._request_id += 1
+        ret = self.api.ReqUserLogin(CThostFtdcReqUserLoginField.from_dict(self.login_fields), self._request_id)
+        if ret != 0:
+            self.state = 'error'
+            self.error = f"ReqUserLogin 返回 {ret}"
+
+    def on_disconnected(self, reason: int) -> None:
+        self.state = 'disconnected'
+        self.disconnects += 1
+        self.error = f"前置断开，原因代码 0x{reason:x}"
+
+    def on_login(self, rsp, rsp_info) -> None:
+        if rsp_info is not None and rsp_info.ErrorID != 0:
+            self.state = 'error'
+            self.error = f"登录失败: [{rsp_info.ErrorID}] {rsp_info.ErrorMsg}"
+            return
+        self.trading_day = rsp.TradingDay if rsp is not None else ''
+        with self._lock:
+            self.state = 'ready'
+            instruments = sorted(self._instruments)
+        if instruments:
+            self._call(self.api.subscribe_market_data, instruments)
+
+    def _call(self, method, instruments) -> None:
+        for ret in method(instruments):
+            if ret != 0:
+                self.error = f"{method.__name__} 返回 {ret}"
+
+    def subscribe(self, instruments) -> None:
+        with self._lock:
+            self._instruments.update(instruments)
+            ready = self.state == 'ready'
+        # 未登录时只记录，登录后在on_login中统一订阅
+        if ready:
+            self._call(self.api.subscribe_market_data, list(instruments))
+
+    def unsubscribe(self, instruments) -> None:
+        with self._lock:
+            self._instruments.difference_update(instruments)
+            ready = self.state == 'ready'
+        if ready:
+            self._call(self.api.unsubscribe_market_data, list(instruments))
+
+    def status(self) -> dict:
+        return {'state': self.state, 'error': self.error, 'trading_day': self.trading_day,
+                'disconnects': self.disconnects, 'dropped': self.spi.dropped()}
+
+    def close(self) -> None:
+        self.api.RegisterSpi(None)
+        self.api.Release()
+
+
+class _ThreadShard:
+    """本进程中的会话：CTP线程把行情写入原生队列，消费者直接读取"""
+
+    def __init__(self, index: int, front: str, login: tuple, flow_path: str, options: dict):
+        self.front = front
+        self.session = _MdSession(front, *login, flow_path, options['queue_capacity'])
+
+    def start(self) -> None:
+        self.session.start()
+
+    def poll(self) -> None:
+        pass
+
+    def status(self) -> dict:
+        return self.session.status()
+
+    def subscribe(self, instruments) -> None:
+        self.session.subscribe(instruments)
+
+    def unsubscribe(self, instruments) -> None:
+        self.session.unsubscribe(instruments)
+
+    def read(self, out: np.ndarray) -> np.ndarray:
+        return self.session.spi.drain(len(out), out)
+
+    def backlog(self) -> int:
+        return self.session.spi.pending()
+
+    def lost(self) -> int:
+        return self.session.spi.dropped()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def _shard_worker(front: str, login: tuple, flow_path: str, bus_name: str, options: dict, conn) -> None:
+    """工作进程：登录行情前置，行情经共享内存总线发布给主进程，订阅命令和会话状态经管道收发"""
+    session = _MdSession(front, *login, flow_path, 0)
+    publisher = attach_publisher(session.spi, bus_name, options['bus_capacity'], options['max_instruments'])
+    session.start()
+    conn.send(('ready', session.status()))
+    last = None
+    try:
+        while True:
+            if conn.poll(0.1):
+                command, instruments = conn.recv()
+                if command == 'subscribe':
+                    session.subscribe(instruments)
+                elif command == 'unsubscribe':
+                    session.unsubscribe(instruments)
+                else:
+                    break
+            status = session.status()
+            if status != last:
+                conn.send(('status', status))
+                last = status
+    except (EOFError, OSError):
+        pass
+    finally:
+        session.close()
+        session.spi.remove_sink(publisher)
+        publisher.close()
+
+
+class _ProcessShard:
+    """工作进程中的会话：行情经共享内存总线传回，订阅命令经管道发送"""
+
+    def __init__(self, index: int, front: str, login: tuple, flow_path: str, options: dict):
+        self.front = front
+        self.bus_name = f"md_shards_{os.getpid()}_{index}"
+        self.subscriber = None
+        self._status = {'state': 'starting', 'error': '', 'trading_day': '', 'disconnects': 0, 'dropped': 0}
+        self._buffer = None
+        context = multiprocessing.get_context('spawn')
+        self._conn, child = context.Pipe()
+        self.process = context.Process(target=_shard_worker, name=f'ctp-md-shard-{index}', daemon=True,
+                                       args=(front, login, flow_path, self.bus_name, options, child))
+
+    def start(self) -> None:
+        self.process.start()
+
+    def poll(self) -> None:
+        while self._conn.poll():
+            try:
+                kind, status = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == 'ready' and self.subscriber is None:
+                self.subscriber = TickBusSubscriber(bus_path(self.bus_name))
+                self.subscriber.subscribe_all()
+            self._status = status
+        if not self.process.is_alive() and self._status['state'] != 'exited':
+            self._status = {**self._status, 'state': 'exited',
+                            'error': self._status['error'] or f"工作进程退出，返回码 {self.process.exitcode}"}
+
+    def status(self) -> dict:
+        return self._status
+
+    def _send(self, command: str, instruments) -> None:
+        # 工作进程已退出时忽略，状态由poll()报告
+        try:
+            self._conn.send((command, instruments))
+        except (BrokenPipeError, OSError):
+            pass
+
+    def subscribe(self, instruments) -> None:
+        self._send('subscribe', list(instruments))
+
+    def unsubscribe(self, instruments) -> None:
+        self._send('unsubscribe', list(instruments))
+
+    def read(self, out: np.ndarray) -> np.ndarray:
+        if self.subscriber is None:
+            return out[:0]
+        if self._buffer is None or len(self._buffer) != len(out):
+            self._buffer = np.empty(len(out), dtype=TickBusRecord_dtype)
+        return self.subscriber.read(len(out), self._buffer)['tick']
+
+    def backlog(self) -> int:
+        return self.subscriber.pending() if self.subscriber is not None else 0
+
+    def lost(self) -> int:
+        return (self.subscriber.lost() if self.subscriber is not None else 0) + self._status['dropped']
+
+    def close(self) -> None:
+        if self.process.pid is not None:
+            self._send('stop', None)
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        self.subscriber = None
+        try:
+            Path(bus_path(self.bus_name)).unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+class ShardedMdClient:
+    """把订阅分散到多个行情会话，输出合并、去重、按时间排序的一路行情；不是线程安全的，只在一个消费线程中使用"""
+
+    def __init__(self, fronts, broker_id: str, user_id: str, password: str, *, shards: int | None = None,
+                 mode: str = 'thread', flow_dir: str = 'con/md_shards', queue_capacity: int = 65536,
+                 bus_capacity: int = 1 << 16, max_instruments: int = 8192, batch_size: int = 4096,
+                 window: float = 0.05, idle: float = 1.0, rebalance_interval: float | None = 60.0,
+                 tolerance: float = 0.2, max_moves: int = 16, handover: float = 1.0):
+        """
+        :param fronts: 前置地址（单个或序列），会话轮流使用
+        :param shards: 会话数，默认与前置地址数相同
+        :param mode: 'thread'（会话在本进程中）或 'process'（每个会话一个工作进程，行情经共享内存总线传回）
+        :param flow_dir: 各会话的流文件目录（每个会话一个子目录）
+        :param queue_capacity: thread模式下每个会话的原生队列容量
+        :param bus_capacity: process模式下每个会话的总线容量（条，2的幂）
+        :param batch_size: 每次从每个会话最多读取的条数
+        :param window: 行情在合并缓冲中最多等待的秒数
+        :param idle: 会话超过该秒数没有行情时不参与合并水位
+        :param rebalance_interval: 按行情速率再平衡的间隔（秒），None表示不自动再平衡
+        :param tolerance: 会话负载超过平均值的(1 + tolerance)倍时迁移合约
+        :param max_moves: 每次再平衡最多迁移的合约数
+        :param handover: 迁移时新会话订阅后，旧会话继续保留订阅的秒数
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode必须是{', '.join(MODES)}之一")
+        fronts = [fronts] if isinstance(fronts, str) else list(fronts)
+        if not fronts:
+            raise ValueError("至少需要一个前置地址")
+        shards = len(fronts) if shards is None else shards
+        if shards < 1:
+            raise ValueError("shards必须大于0")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.rebalance_interval = rebalance_interval
+        self.tolerance = tolerance
+        self.max_moves = max_moves
+        self.handover = handover
+        options = {'queue_capacity': queue_capacity, 'bus_capacity': bus_capacity,
+                   'max_instruments': max_instruments}
+        shard_cls = _ThreadShard if mode == 'thread' else _ProcessShard
+        login = (broker_id, user_id, password)
+        self._shards = [shard_cls(i, fronts[i % len(fronts)], login, str(Path(flow_dir) / f"shard{i}"), options)
+                        for i in range(shards)]
+        self.merger = TickMerger(shards, window, idle)
+        self.assignment: dict[str, int] = {}
+        self.rates: dict[str, float] = {}
+        self.moves = 0
+        self._counts: dict[bytes, int] = {}
+        self._handovers: list[tuple[float, int, str]] = []
+        self._out = np.empty(batch_size, dtype=DepthMarketData_dtype)
+        self._shard_rates = [0.0] * shards
+        self._rate_base = [0] * shards
+        now = time.monotonic()
+        self._rate_time = now
+        self._rebalance_time = now
+        self._closed = False
+
+    @property
+    def shards(self) -> int:
+        return len(self._shards)
+
+    def start(self) -> None:
+        """启动全部会话，连接后自动登录"""
+        for shard in self._shards:
+            shard.start()
+
+    def wait_ready(self, timeout: float = 10.0) -> bool:
+        """等待全部会话登录成功，超时返回False（可从stats()查看各会话的状态和错误）"""
+        deadline = time.monotonic() + timeout
+        while True:
+            for shard in self._shards:
+                shard.poll()
+            if all(shard.status()['state'] == 'ready' for shard in self._shards):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def shard_of(self, instrument_id: str) -> int | None:
+        return self.assignment.get(instrument_id)
+
+    def _loads(self) -> list[float]:
+        # 还没有速率的合约按已知合约的平均速率估计，全部未知时按合约数分配
+        default = sum(self.rates.values()) / len(self.rates) if self.rates else 1.0
+        load = [0.0] * len(self._shards)
+        for instrument, shard in self.assignment.items():
+            load[shard] += self.rates.get(instrument, default)
+        return load
+
+    def subscribe(self, instrument_ids) -> None:
+        """订阅合约，新合约分配给当前负载最轻的会话"""
+        ids = [instrument_ids] if isinstance(instrument_ids, str) else list(instrument_ids)
+        load = self._loads()
+        default = sum(self.rates.values()) / len(self.rates) if self.rates else 1.0
+        added: list[list[str]] = [[] for _ in self._shards]
+        for instrument in ids:
+            if instrument in self.assignment:
+                continue
+            shard = min(range(len(load)), key=load.__getitem__)
+            load[shard] += default
+            self.assignment[instrument] = shard
+            added[shard].append(instrument)
+        for shard, instruments in zip(self._shards, added):
+            if instruments:
+                shard.subscribe(instruments)
+
+    def unsubscribe(self, instrument_ids) -> None:
+        """退订合约"""
+        ids = [instrument_ids] if isinstance(instrument_ids, str) else list(instrument_ids)
+        removed: list[list[str]] = [[] for _ in self._shards]
+        for instrument in ids:
+            shard = self.assignment.pop(instrument, None)
+            if shard is not None:
+                removed[shard].append(instrument)
+                self.rates.pop(instrument, None)
+        for shard, instruments in zip(self._shards, removed):
+            if instruments:
+                shard.unsubscribe(instruments)
+
+    def poll(self, flush: bool = False) -> np.ndarray:
+        """
+        读取各会话的新行情并合并，返回可以输出的行情（DepthMarketData_dtype数组，按时间排序，可能为空）
+        同时完成到期的迁移交接、统计速率和按间隔再平衡
+        """
+        now = time.monotonic()
+        for index, shard in enumerate(self._shards):
+            shard.poll()
+            while True:
+                ticks = shard.read(self._out)
+                self.merger.push(index, ticks, now)
+                if len(ticks) < len(self._out):
+                    break
+        merged = self.merger.pop(now, flush)
+        self._count(merged)
+        self._finish_handovers(now)
+        if now - self._rate_time >= 1.0:
+            self._update_rates(now)
+        if self.rebalance_interval is not None and now - self._rebalance_time >= self.rebalance_interval:
+            self.rebalance()
+        return merged
+
+    def ticks(self, idle: float = 0.0005, timeout: float | None = None):
+        """
+        持续产出合并后的非空行情批（DepthMarketData_dtype数组，按时间排序）
+        :param idle: 没有可输出的行情时的休眠秒数
+        :param timeout: 连续无行情超过该秒数时结束，None表示一直等待（直到close()）
+        """
+        last = time.monotonic()
+        while not self._closed:
+            merged = self.poll()
+            if len(merged):
+                last = time.monotonic()
+                yield merged
+                continue
+            if timeout is not None and time.monotonic() - last > timeout:
+                return
+            time.sleep(idle)
+
+    def _count(self, merged: np.ndarray) -> None:
+        if not len(merged):
+            return
+        names, inverse = group_instruments(merged['InstrumentID'])
+        counts = self._counts
+        for name, count in zip(names, np.bincount(inverse, minlength=len(names)).tolist()):
+            counts[name] = counts.get(name, 0) + count
+
+    def _update_rates(self, now: float) -> None:
+        elapsed = now - self._rate_time
+        for name, count in self._counts.items():
+            instrument = name.decode('ascii', 'replace')
+            if instrument not in self.assignment:
+                continue
+            rate = count / elapsed
+            previous = self.rates.get(instrument)
+            self.rates[instrument] = rate if previous is None else 0.5 * previous + 0.5 * rate
+        # 本周期没有行情的合约速率逐步衰减
+        for instrument in self.rates:
+            if instrument.encode() not in self._counts:
+                self.rates[instrument] *= 0.5
+        self._counts = {}
+        for index in range(len(self._shards)):
+            received = self.merger.received[index]
+            self._shard_rates[index] = (received - self._rate_base[index]) / elapsed
+            self._rate_base[index] = received
+        self._rate_time = now
+
+    def rebalance(self) -> list[tuple[str, int, int]]:
+        """按测得的行情速率迁移合约，返回 [(合约, 原会话, 新会话), ...]"""
+        now = time.monotonic()
+        self._rebalance_time = now
+        pending = {instrument for _, _, instrument in self._handovers}
+        # 交接尚未完成的合约本次不迁移
+        assignment = {k: v for k, v in self.assignment.items() if k not in pending}
+        moves = plan_rebalance(assignment, self.rates, len(self._shards), self.tolerance, self.max_moves)
+        for instrument, source, target in moves:
+            # 先在新会话订阅，handover秒后再退订旧会话，重叠期间的重复行情由合并去重
+            self._shards[target].subscribe([instrument])
+            self.assignment[instrument] = target
+            self._handovers.append((now + self.handover, source, instrument))
+        self.moves += len(moves)
+        return moves
+
+    def _finish_handovers(self, now: float) -> None:
+        if not self._handovers or self._handovers[0][0] > now:
+            return
+        due = [item for item in self._handovers if item[0] <= now]
+        self._handovers = [item for item in self._handovers if item[0] > now]
+        for _, source, instrument in due:
+            if self.assignment.get(instrument) != source:
+                self._shards[source].unsubscribe([instrument])
+
+    def stats(self) -> list[ShardMetrics]:
+        """各会话指标的快照"""
+        merger = self.merger
+        counts = [0] * len(self._shards)
+        for shard in self.assignment.values():
+            counts[shard] += 1
+        newest = int(merger.newest.max())
+        result = []
+        for index, shard in enumerate(self._shards):
+            shard.poll()
+            status = shard.status()
+            behind = newest - int(merger.newest[index]) if merger.newest[index] >= 0 else 0
+            result.append(ShardMetrics(shard.front, status['state'], counts[index], merger.received[index],
+                                       merger.duplicates[index], self._shard_rates[index], merger.lag_ms[index],
+                                       behind, shard.backlog(), shard.lost(), status['disconnects'],
+                                       status['error']))
+        return result
+
+    def close(self) -> None:
+        """关闭全部会话（process模式下结束工作进程）"""
+        if self._closed:
+            return
+        self._closed = True
+        for shard in self._shards:
+            shard.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
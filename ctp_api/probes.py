@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : probes.py
+@Date       : 2025/12/02 10:40
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 回调延迟探针查询
+    以 python build.py --probes 构建后，director回调在CTP线程进入时、取得GIL后、Python方法返回后各取一次单调时钟，
+    按回调名称累计三组直方图：gil（等待GIL）、handler（Python处理）、total（总耗时）。
+    回调参数对象带有recv_ns属性，即CTP线程进入回调的时刻，与time.perf_counter_ns()为同一时钟；
+    处理函数中也可调用模块的probe_receive_ns()获取。未启用探针时各函数返回空结果。
+用法：
+    from ctp_api import thostmduserapi, probes
+    print(probes.report(thostmduserapi))
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+KINDS = ('gil', 'handler', 'total')
+
+
+@dataclass
+class LatencySummary:
+    """单个直方图的统计，时间单位为纳秒；分位数取所在桶的上界，相对误差约6%"""
+    count: int = 0
+    p50: int = 0
+    p90: int = 0
+    p99: int = 0
+    p999: int = 0
+    max: int = 0
+
+
+def bucket_bounds(module) -> np.ndarray:
+    """各桶的下界（纳秒）"""
+    bounds = np.empty(module.probe_bucket_count(), dtype=np.uint64)
+    module.probe_bounds_into(bounds)
+    return bounds
+
+
+def histograms(module) -> dict[str, dict[str, np.ndarray]]:
+    """{回调名: {'gil'|'handler'|'total': 各桶计数}}"""
+    result = {}
+    for slot in range(module.probe_count()):
+        counts = {}
+        for kind, name in enumerate(KINDS):
+            out = np.zeros(module.probe_bucket_count(), dtype=np.uint64)
+            module.probe_histogram_into(slot, kind, out)
+            counts[name] = out
+        result[module.probe_name(slot)] = counts
+    return result
+
+
+def summarize(counts: np.ndarray, bounds: np.ndarray, maximum: int) -> LatencySummary:
+    """由直方图计算分位数"""
+    total = int(counts.sum())
+    if total == 0:
+        return LatencySummary()
+    upper = np.append(bounds[1:], np.uint64(maximum + 1)) - np.uint64(1)
+    cumulative = np.cumsum(counts)
+    values = []
+    for q in (0.5, 0.9, 0.99, 0.999):
+        i = int(np.searchsorted(cumulative, np.ceil(q * total), side='left'))
+        values.append(min(int(upper[i]), maximum))
+    return LatencySummary(total, *values, maximum)
+
+
+def snapshot(module) -> dict[str, dict[str, LatencySummary]]:
+    """{回调名: {'gil'|'handler'|'total': LatencySummary}}，没有调用过的回调不列出"""
+    bounds = bucket_bounds(module)
+    result = {}
+    for slot, (name, counts) in enumerate(histograms(module).items()):
+        summary = {kind: summarize(counts[kind], bounds, module.probe_max(slot, k))
+                   for k, kind in enumerate(KINDS)}
+        if summary['total'].count:
+            result[name] = summary
+    return result
+
+
+def reset(module) -> None:
+    """清空直方图"""
+    module.probe_reset()
+
+
+def report(module) -> str:
+    """按回调列出各直方图的分位数（微秒）"""
+    if not module.probe_enabled():
+        return "未启用回调延迟探针，请以 python build.py --probes 构建"
+    lines = [f"{'回调':<36}{'类型':<9}{'次数':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'p99.9':>10}{'max':>10}"]
+    for name, summary in sorted(snapshot(module).items()):
+        for kind in KINDS:
+            s = summary[kind]
+            lines.append(f"{name:<36}{kind:<9}{s.count:>10}" +
+                         ''.join(f"{v / 1000:>10.1f}" for v in (s.p50, s.p90, s.p99, s.p999, s.max)))
+    return '\n'.join(lines)
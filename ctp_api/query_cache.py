@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : query_cache.py
+@Date       : 2025/12/04 10:20
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 合约、手续费率、保证金率查询结果的本地缓存
+    查询结果按原始结构体内存布局（Instrument_dtype等）保存为.npy文件，目录为 根目录/经纪商/投资者/交易日/，
+    启动时以内存映射方式读取，几万个合约也只需毫秒级；按合约查询的费率可以只补查缓存中没有的合约。
+    失效规则：缓存只对其所在的交易日有效，以登录后api.GetTradingDay()打开缓存，交易日变化即视为未命中，
+    prune()删除其他交易日的目录。结构体布局随CTP版本变化时（保存的dtype与当前不一致）同样视为未命中。
+用法：
+    cache = QueryCache("cache", broker_id, investor_id, api.GetTradingDay())
+    instruments = await cache.fetch(client, 'instrument')                 # AsyncTraderClient
+    rates = await cache.fetch(client, 'margin', CThostFtdcQryInstrumentMarginRateField.from_dict({
+        'BrokerID': broker_id, 'InvestorID': investor_id, 'InstrumentID': 'rb2601', 'HedgeFlag': '1'}))
+    # 回调方式：spi.OnRspQryInstrument = cache.handler('instrument')
+"""
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .thosttraderapi import (
+    CThostFtdcInstrumentCommissionRateField, CThostFtdcInstrumentField, CThostFtdcInstrumentMarginRateField,
+    CThostFtdcQryInstrumentCommissionRateField, CThostFtdcQryInstrumentField, CThostFtdcQryInstrumentMarginRateField,
+    InstrumentCommissionRate_dtype, Instrument_dtype, InstrumentMarginRate_dtype,
+)
+
+# 表名: (记录dtype, 主键字段, 结构体类型, 查询结构体类型, 查询方法)
+TABLES = {
+    'instrument': (Instrument_dtype, ('InstrumentID',), CThostFtdcInstrumentField,
+                   CThostFtdcQryInstrumentField, 'ReqQryInstrument'),
+    'commission': (InstrumentCommissionRate_dtype, ('InstrumentID',), CThostFtdcInstrumentCommissionRateField,
+                   CThostFtdcQryInstrumentCommissionRateField, 'ReqQryInstrumentCommissionRate'),
+    'margin': (InstrumentMarginRate_dtype, ('InstrumentID', 'HedgeFlag'), CThostFtdcInstrumentMarginRateField,
+               CThostFtdcQryInstrumentMarginRateField, 'ReqQryInstrumentMarginRate'),
+}
+
+
+def _keys(records: np.ndarray, key_fields: tuple[str, ...]) -> np.ndarray:
+    """主键字段拼接为一个字节串数组；除第一个字段外均为单字符标志，拼接结果不会混淆"""
+    keys = records[key_fields[0]]
+    for name in key_fields[1:]:
+        keys = np.char.add(keys, records[name])
+    return keys
+
+
+def _key(values) -> bytes:
+    return b''.join(v.encode() if isinstance(v, str) else v for v in values)
+
+
+class QueryCache:
+    """某个投资者在某个交易日的查询缓存；读取返回只读的结构化数组，写入时整表原子替换"""
+
+    def __init__(self, root, broker_id: str, investor_id: str, trading_day: str):
+        self.root = Path(root)
+        self.account_dir = self.root / broker_id / investor_id
+        self.trading_day = trading_day
+        self.directory = self.account_dir / trading_day
+        self._tables: dict[str, np.ndarray | None] = {}
+        self._index: dict[str, dict[bytes, int]] = {}
+        self._pending: dict[str, dict[int, list[bytes]]] = {}
+
+    def path(self, table: str) -> Path:
+        return self.directory / f"{table}.npy"
+
+    # ---------------- 读取 ----------------
+
+    def load(self, table: str) -> np.ndarray | None:
+        """以内存映射方式读取整表，未缓存或记录布局不一致时返回None"""
+        if table in self._tables:
+            return self._tables[table]
+        dtype = TABLES[table][0]
+        try:
+            raw = np.load(self.path(table), mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            raw = None
+        # .npy保存了完整的结构体描述，字段名、类型或偏移任何不同（CTP版本升级）都视为未命中
+        records = raw if raw is not None and raw.ndim == 1 and raw.dtype == dtype else None
+        self._tables[table] = records
+        return records
+
+    def __contains__(self, table: str) -> bool:
+        return self.load(table) is not None
+
+    def find(self, table: str, *key):
+        """按主键查找单条记录（numpy.void），如 find('margin', 'rb2601', '1')，没有时返回None"""
+        records = self.load(table)
+        if records is None:
+            return None
+        index = self._index.get(table)
+        if index is None:
+            index = self._index[table] = {k: i for i, k in enumerate(_keys(records, TABLES[table][1]).tolist())}
+        i = index.get(_key(key))
+        return records[i] if i is not None else None
+
+    def field(self, table: str, *key):
+        """按主键查找并转换为CTP结构体，没有时返回None"""
+        record = self.find(table, *key)
+        return self.to_field(table, record) if record is not None else None
+
+    @staticmethod
+    def to_field(table: str, record):
+        """记录 -> CTP结构体（按原始内存布局整体复制）"""
+        obj = TABLES[table][2]()
+        obj._raw_view()[:] = record.tobytes()
+        return obj
+
+    def missing(self, table: str, keys) -> list:
+        """keys中缓存里没有的主键，用于只补查缺少的合约；单字段主键可直接传合约代码"""
+        result = []
+        for key in keys:
+            values = (key,) if isinstance(key, (str, bytes)) else key
+            if self.find(table, *values) is None:
+                result.append(key)
+        return result
+
+    # ---------------- 写入 ----------------
+
+    def store(self, table: str, records) -> np.ndarray:
+        """整表替换：records为结构化数组或CTP结构体列表"""
+        records = self._to_records(table, records)
+        self._write(table, records)
+        return self.load(table)
+
+    def upsert(self, table: str, records) -> np.ndarray:
+        """增量更新：主键相同的记录以新记录为准，其余保留"""
+        records = self._to_records(table, records)
+        existing = self.load(table)
+        if existing is not None and len(existing):
+            key_fields = TABLES[table][1]
+            keep = ~np.isin(_keys(existing, key_fields), _keys(records, key_fields))
+            records = np.concatenate((existing[keep], records))
+        # 合并结果已是副本，写入前释放对内存映射的引用，否则Windows下无法替换文件
+        del existing
+        self._write(table, records)
+        return self.load(table)
+
+    def handler(self, table: str, *, incremental: bool = False):
+        """返回OnRspQry*回调的处理函数，收到is_last后写入（默认整表替换），查询出错时丢弃本次结果"""
+        def on_response(field, rsp_info=None, request_id: int = 0, is_last: bool = True) -> None:
+            pending = self._pending.setdefault(table, {}).setdefault(request_id, [])
+            if field is not None:
+                pending.append(bytes(field._raw_view()))
+            if not is_last:
+                return
+            del self._pending[table][request_id]
+            if rsp_info is not None and rsp_info.ErrorID != 0:
+                return
+            (self.upsert if incremental else self.store)(table, pending)
+        return on_response
+
+    async def fetch(self, client, table: str, field=None, *, refresh: bool = False) -> np.ndarray:
+        """
+        先查缓存，未命中时通过AsyncTraderClient查询并写入缓存
+        合约表整表缓存；费率表按查询的合约增量缓存，柜台返回品种级费率（InstrumentID为品种代码）时，
+        另以查询的合约代码保存一份，之后按合约查找即可命中
+        :param client: AsyncTraderClient
+        :param table: 'instrument' / 'commission' / 'margin'
+        :param field: 查询结构体，None时使用空查询条件
+        :param refresh: 忽略缓存重新查询
+        :return: 合约表返回整表；费率表返回本次查询合约对应的记录
+        """
+        dtype, key_fields, _, query_type, method = TABLES[table]
+        if field is None:
+            field = query_type()
+        if table == 'instrument':
+            if not refresh and table in self:
+                return self.load(table)
+            return self.store(table, await client.request(method, field))
+        key = tuple(getattr(field, name) for name in key_fields if name in dtype.names)
+        if not refresh and key[0]:
+            cached = self.find(table, *key) if len(key) == len(key_fields) else None
+            if cached is not None:
+                return np.array([cached], dtype=dtype)
+        records = self._to_records(table, await client.request(method, field))
+        if key[0] and len(records):
+            alias = records.copy()
+            alias['InstrumentID'] = key[0].encode()
+            records = np.concatenate((records, alias[records['InstrumentID'] != alias['InstrumentID']]))
+        self.upsert(table, records)
+        return records
+
+    # ---------------- 失效 ----------------
+
+    def invalidate(self, table: str | None = None) -> None:
+        """删除当前交易日的某张表（None为全部）"""
+        for name in (TABLES if table is None else (table,)):
+            self._drop(name)
+            self.path(name).unlink(missing_ok=True)
+
+    def prune(self) -> list[str]:
+        """删除该投资者其他交易日的缓存目录，返回删除的交易日"""
+        removed = []
+        if self.account_dir.is_dir():
+            for path in self.account_dir.iterdir():
+                if path.is_dir() and path.name != self.trading_day:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed.append(path.name)
+        return sorted(removed)
+
+    def close(self) -> None:
+        """释放内存映射"""
+        for name in list(self._tables):
+            self._drop(name)
+
+    # ---------------- 内部 ----------------
+
+    @staticmethod
+    def _to_records(table: str, records) -> np.ndarray:
+        dtype = TABLES[table][0]
+        if isinstance(records, np.ndarray):
+            return np.ascontiguousarray(records).view(dtype)
+        return np.frombuffer(b''.join(r if isinstance(r, bytes) else bytes(r._raw_view()) for r in records),
+                             dtype=dtype)
+
+    def _drop(self, table: str) -> None:
+        # Windows下被映射的文件不能替换或删除，写入前先释放本对象持有的映射
+        self._tables.pop(table, None)
+        self._index.pop(table, None)
+
+    def _write(self, table: str, records: np.ndarray) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(table)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            np.save(f, records, allow_pickle=False)
+        self._drop(table)
+        os.replace(tmp, path)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : recorder.py
+@Date       : 2025/11/30 16:40
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 深度行情录制与读取
+    TickRecorder（原生实现）在CTP回调线程中把行情写入按交易日分段的内存映射文件；
+    TickSegment以只读方式映射某个交易日的文件，先扫描紧凑的索引，再按位置切出单个合约的行情。
+用法：
+    recorder = TickRecorder("ticks", TickRecorder.kFormatFull)
+    spi.add_sink(recorder)
+    ...
+    segment = TickSegment("ticks", "20251128")
+    ticks = segment.ticks("SA601", start="09:00:00", end="10:15:00")
+"""
+from pathlib import Path
+
+import numpy as np
+
+from .thostmduserapi import DepthMarketData_dtype, TickRecorder
+
+# 与ctp_recorder.h中的结构体一一对应
+SEGMENT_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('format', '<u4'),
+    ('record_size', '<u4'),
+    ('header_size', '<u4'),
+    ('count', '<u8'),
+    ('trading_day', 'S9'),
+    ('reserved', 'V23'),
+])
+
+INDEX_DTYPE = np.dtype([
+    ('instrument', '<i4'),
+    ('time_ms', '<i4'),
+])
+
+PACKED_TICK_DTYPE = np.dtype([
+    ('instrument', '<i4'),
+    ('action_day', '<i4'),
+    ('time_ms', '<i4'),
+    ('volume', '<i4'),
+    ('last_price', '<f8'),
+    ('turnover', '<f8'),
+    ('open_interest', '<f8'),
+    ('average_price', '<f8'),
+    ('bid_price1', '<f8'),
+    ('ask_price1', '<f8'),
+    ('bid_volume1', '<i4'),
+    ('ask_volume1', '<i4'),
+], align=True)
+
+RECORD_DTYPES = {
+    TickRecorder.kFormatFull: DepthMarketData_dtype,
+    TickRecorder.kFormatPacked: PACKED_TICK_DTYPE,
+}
+
+for _format, _dtype in RECORD_DTYPES.items():
+    if _dtype.itemsize != TickRecorder.record_size(_format):
+        raise ImportError("录制记录的dtype与原生结构体大小不一致，请重新构建")
+
+
+def time_to_ms(value) -> int:
+    """'HH:MM:SS' 或 'HH:MM:SS.mmm' -> 日内毫秒，整数原样返回"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    hms, _, millis = value.partition('.')
+    h, m, s = (int(part) for part in hms.split(':'))
+    return ((h * 60 + m) * 60 + s) * 1000 + (int(millis.ljust(3, '0')) if millis else 0)
+
+
+def list_segments(directory) -> list[str]:
+    """目录中已录制的交易日，升序"""
+    return sorted(path.stem for path in Path(directory).glob('*.ticks'))
+
+
+def _read_header(path: Path, magic: bytes):
+    header = np.fromfile(path, dtype=SEGMENT_HEADER_DTYPE, count=1)
+    if not len(header) or header['magic'][0] != magic:
+        raise ValueError(f"{path} 不是有效的录制文件")
+    return header[0]
+
+
+def _map_records(path: Path, header, dtype: np.dtype) -> np.ndarray:
+    count = int(header['count'])
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=int(header['header_size']), shape=(count,))
+
+
+class TickSegment:
+    """一个交易日的录制数据，只读映射，写入仍在进行时只能看到打开时已提交的记录"""
+
+    def __init__(self, directory, trading_day: str):
+        base = Path(directory) / trading_day
+        header = _read_header(base.with_suffix('.ticks'), b'CTPTICK')
+        index_header = _read_header(base.with_suffix('.idx'), b'CTPTIDX')
+        symbol_header = _read_header(base.with_suffix('.sym'), b'CTPTSYM')
+        self.trading_day = trading_day
+        self.format = int(header['format'])
+        self.dtype = RECORD_DTYPES[self.format]
+        # 写入时先提交索引再提交记录，两者数量不同时以较小者为准
+        records = _map_records(base.with_suffix('.ticks'), header, self.dtype)
+        index = _map_records(base.with_suffix('.idx'), index_header, INDEX_DTYPE)
+        count = min(len(records), len(index))
+        self.records = records[:count]
+        self.index = index[:count]
+        width = int(symbol_header['record_size'])
+        symbols = _map_records(base.with_suffix('.sym'), symbol_header, np.dtype(f'S{width}'))
+        self.instruments = [item.decode('ascii') for item in symbols]
+        self._slots = {name: slot for slot, name in enumerate(self.instruments)}
+
+    def __len__(self):
+        return len(self.records)
+
+    def positions(self, instrument: str, start=None, end=None) -> np.ndarray:
+        """
+        某个合约在本分段中的记录位置，只扫描索引
+        :param instrument: 合约代码
+        :param start: 起始时间（含），'HH:MM:SS[.mmm]'或日内毫秒
+        :param end: 结束时间（不含）
+        """
+        slot = self._slots.get(instrument)
+        if slot is None:
+            return np.empty(0, dtype=np.intp)
+        mask = self.index['instrument'] == slot
+        if start is not None:
+            mask &= self.index['time_ms'] >= time_to_ms(start)
+        if end is not None:
+            mask &= self.index['time_ms'] < time_to_ms(end)
+        return np.flatnonzero(mask)
+
+    def ticks(self, instrument: str, start=None, end=None) -> np.ndarray:
+        """某个合约的行情记录（复制到内存的结构化数组），时间条件同positions"""
+        return self.records[self.positions(instrument, start, end)]
+
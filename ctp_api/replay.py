@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : replay.py
+@Date       : 2025/12/01 20:15
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 录制行情回放
+    读取TickRecorder录制的分段文件，按交易所时间合并多个交易日：自然时间由分段的交易日和UpdateTime + UpdateMillisec
+    推算（见bars.natural_datetime），不使用ActionDay（大商所夜盘的ActionDay为交易日），
+    通过原生循环调用任意CThostFtdcMdSpi（包括未修改的Python子类）的OnRtnDepthMarketData。
+    数据按批填充到复用的缓冲区，单个完整格式分段直接从映射文件回放，不产生额外复制。
+用法：
+    replayer = TickReplayer("ticks", instruments=["SA601"])
+    replayer.run(spi)             # 尽可能快
+    replayer.run(spi, speed=1)    # 按原始时间间隔
+    replayer.run(spi, speed=10)   # 10倍速
+"""
+import time
+
+import numpy as np
+
+from .bars import DAY_MS, SESSION_START_MS, natural_datetime
+from .recorder import TickRecorder, TickSegment, list_segments
+from .thostmduserapi import DepthMarketData_dtype, replay_ticks
+
+
+def _format_times(time_ms: np.ndarray) -> np.ndarray:
+    """日内毫秒 -> b'HH:MM:SS'"""
+    secs = np.maximum(time_ms, 0) // 1000
+    chars = np.zeros((len(secs), 9), dtype=np.uint8)
+    for col, value in ((0, secs // 3600), (3, secs // 60 % 60), (6, secs % 60)):
+        chars[:, col] = ord('0') + value // 10
+        chars[:, col + 1] = ord('0') + value % 10
+    chars[:, 2] = chars[:, 5] = ord(':')
+    return chars.view('S9').ravel()
+
+
+def segment_timestamps(segment: TickSegment) -> np.ndarray:
+    """分段中每条记录的交易所时间（Unix毫秒）：夜盘属于交易日的前一个工作日，午夜之后再加一天"""
+    tod = segment.index['time_ms'].astype(np.int64)
+    session = np.where(tod >= SESSION_START_MS, tod - SESSION_START_MS, tod + (DAY_MS - SESSION_START_MS))
+    return natural_datetime(np.full(len(tod), int(segment.trading_day)), session).astype(np.int64)
+
+
+def expand_packed(segment: TickSegment, positions: np.ndarray) -> np.ndarray:
+    """把精简记录还原为DepthMarketData_dtype，未录制的字段为0"""
+    packed = segment.records[positions]
+    full = np.zeros(len(packed), dtype=DepthMarketData_dtype)
+    symbols = np.array(segment.instruments, dtype='S')
+    if len(symbols):
+        full['InstrumentID'] = symbols[packed['instrument']]
+    full['TradingDay'] = segment.trading_day.encode()
+    full['ActionDay'] = packed['action_day'].astype('S8')
+    full['UpdateTime'] = _format_times(packed['time_ms'])
+    full['UpdateMillisec'] = np.maximum(packed['time_ms'], 0) % 1000
+    for src, dst in (('volume', 'Volume'), ('last_price', 'LastPrice'), ('turnover', 'Turnover'),
+                     ('open_interest', 'OpenInterest'), ('average_price', 'AveragePrice'),
+                     ('bid_price1', 'BidPrice1'), ('ask_price1', 'AskPrice1'),
+                     ('bid_volume1', 'BidVolume1'), ('ask_volume1', 'AskVolume1')):
+        full[dst] = packed[src]
+    return full
+
+
+class TickReplayer:
+    """按交易所时间顺序回放一个或多个交易日的录制行情"""
+
+    def __init__(self, directory, trading_days=None, instruments=None, chunk_size: int = 4096):
+        """
+        :param directory: 录制目录
+        :param trading_days: 要回放的交易日列表，默认为目录中的全部交易日
+        :param instruments: 只回放这些合约，默认全部
+        :param chunk_size: 每批回放的行情条数
+        """
+        days = list(trading_days) if trading_days is not None else list_segments(directory)
+        self.segments = [TickSegment(directory, day) for day in days]
+        self.chunk_size = chunk_size
+
+        stamps, segment_ids, positions = [], [], []
+        for k, segment in enumerate(self.segments):
+            if instruments is None:
+                pos = np.arange(len(segment))
+            else:
+                slots = [segment.instruments.index(i) for i in instruments if i in segment.instruments]
+                pos = np.flatnonzero(np.isin(segment.index['instrument'], slots))
+            stamps.append(segment_timestamps(segment)[pos])
+            segment_ids.append(np.full(len(pos), k, dtype=np.int32))
+            positions.append(pos)
+        stamps = np.concatenate(stamps) if stamps else np.empty(0, dtype=np.int64)
+        order = np.argsort(stamps, kind='stable')
+        self.timestamps = stamps[order]
+        self._segment_ids = np.concatenate(segment_ids)[order] if segment_ids else np.empty(0, dtype=np.int32)
+        self._positions = np.concatenate(positions)[order] if positions else np.empty(0, dtype=np.intp)
+        # 单个完整格式分段且顺序未变时，直接从映射文件按切片回放
+        self._direct = (len(self.segments) == 1 and instruments is None
+                        and self.segments[0].format == TickRecorder.kFormatFull
+                        and bool(np.all(order[:-1] < order[1:])))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _gather(self, segment_ids: np.ndarray, positions: np.ndarray, out: np.ndarray) -> np.ndarray:
+        for k in np.unique(segment_ids):
+            mask = segment_ids == k
+            segment = self.segments[k]
+            if segment.format == TickRecorder.kFormatPacked:
+                out[mask] = expand_packed(segment, positions[mask])
+            else:
+                out[mask] = segment.records[positions[mask]]
+        return out
+
+    def batches(self):
+        """按顺序产生DepthMarketData_dtype批次；除直接回放外，各批次复用同一个缓冲区"""
+        buffer = None if self._direct else np.empty(self.chunk_size, dtype=DepthMarketData_dtype)
+        for start in range(0, len(self), self.chunk_size):
+            stop = min(start + self.chunk_size, len(self))
+            if self._direct:
+                yield self.segments[0].records[start:stop]
+            else:
+                yield self._gather(self._segment_ids[start:stop], self._positions[start:stop],
+                                   buffer[:stop - start])
+
+    def run(self, spi, speed: float | None = None) -> int:
+        """
+        回放全部行情
+        :param spi: CThostFtdcMdSpi实例（Python子类或MdTickQueueSpi等原生实现）
+        :param speed: None表示尽可能快，1表示按原始时间间隔，大于1时按倍数加速
+        :return: 回调次数
+        """
+        if speed is None:
+            return sum(replay_ticks(spi, batch) for batch in self.batches())
+        if speed <= 0:
+            raise ValueError("speed必须大于0")
+
+        total = 0
+        origin = self.timestamps[0] if len(self) else 0
+        wall_start = time.perf_counter()
+        for batch in self.batches():
+            stamps = self.timestamps[total:total + len(batch)]
+            i = 0
+            while i < len(batch):
+                now = origin + (time.perf_counter() - wall_start) * 1000.0 * speed
+                j = int(np.searchsorted(stamps, now, side='right'))
+                if j > i:
+                    replay_ticks(spi, batch[i:j])
+                    i = j
+                else:
+                    time.sleep((stamps[i] - now) / 1000.0 / speed)
+            total += len(batch)
+        return total
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : scheduler.py
+@Date       : 2025/11/29 14:20
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: CThostFtdcTraderApi请求流控调度
+    查询和报单分别使用令牌桶限速，撤单优先于报单、报单优先于查询；
+    返回码为-2/-3（超过许可数）时等待retry_delay秒后重新排队，超过max_retries次后以CtpRequestError失败；
+    统一分配nRequestID，并统计各通道的排队深度和等待时间。
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from .aio import CtpRequestError
+
+# 优先级通道，数值越小越优先
+LANE_CONTROL = 0  # 认证、登录、结算确认等，不限速
+LANE_CANCEL = 1   # 撤单类 Req*Action
+LANE_ORDER = 2    # 报单类 Req*Insert
+LANE_QUERY = 3    # 查询类 ReqQry*
+
+LANE_NAMES = {
+    LANE_CONTROL: 'control',
+    LANE_CANCEL: 'cancel',
+    LANE_ORDER: 'order',
+    LANE_QUERY: 'query',
+}
+
+# 超过许可数的返回码：-2未处理请求超过许可数，-3每秒发送请求数超过许可数
+RETRY_CODES = (-2, -3)
+
+
+def classify(method: str) -> int:
+    """按请求方法名确定优先级通道"""
+    if method.startswith(('ReqQry', 'ReqQuery')):
+        return LANE_QUERY
+    if method.endswith('Action'):
+        return LANE_CANCEL
+    if method.endswith('Insert'):
+        return LANE_ORDER
+    return LANE_CONTROL
+
+
+class TokenBucket:
+    """令牌桶：每秒补充rate个令牌，最多积累burst个；rate为None表示不限速（被拒绝后仍等待retry_delay秒）"""
+
+    def __init__(self, rate: float | None, burst: int = 1, retry_delay: float = 0.2):
+        self.rate = rate
+        self.burst = burst
+        self.retry_delay = retry_delay
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def delay(self, now: float) -> float:
+        """距离下一个令牌可用的秒数，0表示可以立即发送"""
+        blocked = max(self._blocked_until - now, 0.0)
+        if self.rate is None:
+            return blocked
+        self._refill(now)
+        return max(blocked, 0.0 if self._tokens >= 1.0 else (1.0 - self._tokens) / self.rate)
+
+    def consume(self, now: float) -> None:
+        if self.rate is not None:
+            self._refill(now)
+            self._tokens -= 1.0
+
+    def penalize(self, now: float) -> None:
+        """被柜台拒绝后清空令牌，下一次发送至少等待retry_delay秒和一个补充周期"""
+        self._blocked_until = now + self.retry_delay
+        if self.rate is not None:
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+
+
+@dataclass
+class LaneStats:
+    """单个通道的统计，等待时间为提交到成功发送的秒数"""
+    submitted: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    depth: int = 0
+    max_depth: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.sent if self.sent else 0.0
+
+
+class _Request:
+    __slots__ = ('method', 'field', 'request_id', 'future', 'submitted', 'started', 'retries')
+
+    def __init__(self, method, field, request_id, submitted):
+        self.method = method
+        self.field = field
+        self.request_id = request_id
+        self.future = Future()
+        self.submitted = submitted
+        self.started = False  # Future已进入运行状态，重试时不再检查取消
+        self.retries = 0
+
+    def start(self) -> bool:
+        if not self.started:
+            if not self.future.set_running_or_notify_cancel():
+                return False
+            self.started = True
+        return True
+
+
+class RequestScheduler:
+    """
+    交易API请求调度器，在独立线程中按优先级和限速发送请求
+    用法：
+        scheduler = RequestScheduler(trader_api, query_rate=1, order_rate=5)
+        future = scheduler.submit("ReqQryInstrument", field)
+        request_id = future.result()  # 请求已被柜台接受
+    """
+
+    def __init__(self, api, *, query_rate: float | None = 1.0, query_burst: int = 1,
+                 order_rate: float | None = None, order_burst: int = 1, start_request_id: int = 0,
+                 retry_delay: float = 0.2, max_retries: int = 20):
+        """
+        :param api: CThostFtdcTraderApi实例
+        :param query_rate: 每秒查询次数，CTP默认每秒1次
+        :param order_rate: 每秒报单和撤单次数，None表示不限速
+        :param start_request_id: 起始请求编号，分配的编号从start_request_id + 1开始
+        :param retry_delay: 返回-2/-3后该通道暂停发送的秒数，不限速的通道同样适用
+        :param max_retries: 同一请求最多重试次数，超过后Future以CtpRequestError失败
+        """
+        self.api = api
+        self.max_retries = max_retries
+        self._query_bucket = TokenBucket(query_rate, query_burst, retry_delay)
+        self._order_bucket = TokenBucket(order_rate, order_burst, retry_delay)
+        self._buckets = {
+            LANE_CONTROL: TokenBucket(None, retry_delay=retry_delay),
+            LANE_CANCEL: self._order_bucket,
+            LANE_ORDER: self._order_bucket,
+            LANE_QUERY: self._query_bucket,
+        }
+        self._lanes: dict[int, deque[_Request]] = {lane: deque() for lane in LANE_NAMES}
+        self._stats = {lane: LaneStats() for lane in LANE_NAMES}
+        self._cond = threading.Condition()
+        self._id_lock = threading.Lock()
+        self._request_id = start_request_id
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='ctp-request-scheduler', daemon=True)
+        self._thread.start()
+
+    def next_request_id(self) -> int:
+        """分配请求编号，可在多个线程中调用"""
+        with self._id_lock:
+            self._request_id += 1
+            return self._request_id
+
+    def submit(self, method: str, field=None, *, request_id: int | None = None,
+               lane: int | None = None) -> Future:
+        """
+        提交请求，返回的Future在柜台接受请求（返回码为0）后得到请求编号
+        :param method: 请求方法名，如 ReqQryInvestorPosition
+        :param field: 请求结构体，调度器持有引用直到发送完成
+        :param request_id: 指定请求编号，默认自动分配
+        :param lane: 指定优先级通道，默认按方法名分类
+        """
+        if not self._running:
+            raise RuntimeError("调度器已关闭")
+        if request_id is None:
+            request_id = self.next_request_id()
+        if lane is None:
+            lane = classify(method)
+        request = _Request(method, field, request_id, time.monotonic())
+        with self._cond:
+            queue = self._lanes[lane]
+            queue.append(request)
+            stats = self._stats[lane]
+            stats.submitted += 1
+            stats.depth = len(queue)
+            stats.max_depth = max(stats.max_depth, stats.depth)
+            self._cond.notify()
+        return request.future
+
+    def stats(self) -> dict[str, LaneStats]:
+        """各通道统计的快照，用于评估账户的流控参数"""
+        with self._cond:
+            return {LANE_NAMES[lane]: LaneStats(**vars(stats)) for lane, stats in self._stats.items()}
+
+    def close(self, wait: bool = True) -> None:
+        """停止调度线程，尚未发送的请求全部取消"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if wait:
+            self._thread.join()
+
+    def _next_ready(self, now: float) -> tuple[int | None, float | None]:
+        """返回可立即发送的通道，或者最近的可发送时间间隔"""
+        min_delay = None
+        for lane, queue in self._lanes.items():
+            if not queue:
+                continue
+            delay = self._buckets[lane].delay(now)
+            if delay == 0.0:
+                return lane, None
+            min_delay = delay if min_delay is None else min(min_delay, delay)
+        return None, min_delay
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if not self._running:
+                        self._cancel_all()
+                        return
+                    now = time.monotonic()
+                    lane, delay = self._next_ready(now)
+                    if lane is not None:
+                        break
+                    self._cond.wait(delay)
+                queue = self._lanes[lane]
+                request = queue.popleft()
+                self._stats[lane].depth = len(queue)
+                # 已被调用方取消的请求直接丢弃，不消耗令牌
+                if not request.start():
+                    continue
+                self._buckets[lane].consume(now)
+
+            try:
+                ret = getattr(self.api, request.method)(request.field, request.request_id)
+            except Exception as e:
+                self._finish(lane, request, error=e)
+                continue
+
+            if ret in RETRY_CODES and request.retries >= self.max_retries:
+                self._finish(lane, request, error=CtpRequestError(request.method, ret))
+            elif ret in RETRY_CODES:
+                request.retries += 1
+                with self._cond:
+                    self._buckets[lane].penalize(time.monotonic())
+                    queue.appendleft(request)
+                    stats = self._stats[lane]
+                    stats.retried += 1
+                    stats.depth = len(queue)
+            elif ret != 0:
+                self._finish(lane, request, error=CtpRequestError(request.method, ret))
+            else:
+                self._finish(lane, request)
+
+    def _finish(self, lane: int, request: _Request, error: BaseException | None = None) -> None:
+        with self._cond:
+            stats = self._stats[lane]
+            if error is None:
+                wait = time.monotonic() - request.submitted
+                stats.sent += 1
+                stats.total_wait += wait
+                stats.max_wait = max(stats.max_wait, wait)
+            else:
+                stats.failed += 1
+        if error is None:
+            request.future.set_result(request.request_id)
+        else:
+            request.future.set_exception(error)
+
+    def _cancel_all(self) -> None:
+        for lane, queue in self._lanes.items():
+            while queue:
+                request = queue.popleft()
+                if request.start():
+                    request.future.set_exception(RuntimeError("调度器已关闭，请求未发送"))
+            self._stats[lane].depth = 0
+
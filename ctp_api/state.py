@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : state.py
+@Date       : 2025/12/03 09:30
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 报单、成交、持仓、合约交易状态的增量状态表
+    每条回报通过to_tuple()一次读出全部字段，转换为不可变的行（NamedTuple），更新时整行替换，
+    因此snapshot()只需复制索引字典即可得到一致的快照。
+    索引：报单按(FrontID, SessionID, OrderRef)、(ExchangeID, OrderSysID)和合约的未完成报单；
+    成交按(ExchangeID, TradeID, Direction)去重；持仓按(合约, 投机套保标志)汇总今仓、昨仓，成交后增量更新，查询结果整体替换。
+    持仓查询的结果已包含此前的全部成交：应答期间（第一条应答到is_last）收到的OnRtnTrade在替换后重新计入；
+    OnRspQryTrade的成交用on_qry_trade()处理，已有持仓查询结果时只记录成交、不再计入持仓，避免重复计算。
+    各处理函数与CThostFtdcTraderSpi回调的参数一致，可以直接转发：
+        state = TradingState()
+        def OnRtnOrder(self, pOrder): state.on_order(pOrder)
+        client.on('OnRspQryInvestorPosition', state.on_position)    # AsyncTraderClient
+"""
+import threading
+from dataclasses import dataclass, field, replace
+from operator import itemgetter
+from typing import NamedTuple
+
+from .thosttraderapi import (
+    InstrumentStatus_dtype, InvestorPosition_dtype, Order_dtype, Trade_dtype,
+    THOST_FTDC_D_Buy, THOST_FTDC_OF_CloseToday, THOST_FTDC_OF_CloseYesterday, THOST_FTDC_OF_Open,
+    THOST_FTDC_OST_NoTradeQueueing, THOST_FTDC_OST_NotTouched, THOST_FTDC_OST_PartTradedQueueing,
+    THOST_FTDC_OST_Touched, THOST_FTDC_OST_Unknown, THOST_FTDC_PD_Short,
+)
+
+# 仍可能成交或撤销的报单状态
+OPEN_STATUSES = frozenset((THOST_FTDC_OST_PartTradedQueueing, THOST_FTDC_OST_NoTradeQueueing,
+                           THOST_FTDC_OST_Unknown, THOST_FTDC_OST_NotTouched, THOST_FTDC_OST_Touched))
+
+
+_new = tuple.__new__
+
+
+def _getter(dtype, names):
+    """按dtype字段顺序（与to_tuple()一致）取出指定字段"""
+    return itemgetter(*(dtype.names.index(name) for name in names))
+
+
+class Order(NamedTuple):
+    front_id: int
+    session_id: int
+    order_ref: str
+    exchange_id: str
+    order_sys_id: str
+    investor_id: str
+    instrument_id: str
+    direction: str
+    offset: str
+    hedge: str
+    price: float
+    volume: int
+    traded: int
+    status: str
+    submit_status: str
+    insert_time: str
+    update_time: str
+    status_msg: str
+
+    @property
+    def key(self) -> tuple[int, int, str]:
+        return self.front_id, self.session_id, self.order_ref
+
+    @property
+    def is_open(self) -> bool:
+        return self.status in OPEN_STATUSES
+
+
+_ORDER_FIELDS = _getter(Order_dtype, (
+    'FrontID', 'SessionID', 'OrderRef', 'ExchangeID', 'OrderSysID', 'InvestorID', 'InstrumentID', 'Direction',
+    'CombOffsetFlag', 'CombHedgeFlag', 'LimitPrice', 'VolumeTotalOriginal', 'VolumeTraded', 'OrderStatus',
+    'OrderSubmitStatus', 'InsertTime', 'UpdateTime', 'StatusMsg'))
+
+
+class Trade(NamedTuple):
+    exchange_id: str
+    trade_id: str
+    direction: str
+    order_sys_id: str
+    order_ref: str
+    investor_id: str
+    instrument_id: str
+    offset: str
+    hedge: str
+    price: float
+    volume: int
+    trade_date: str
+    trade_time: str
+
+    @property
+    def key(self) -> tuple[str, str, str]:
+        return self.exchange_id, self.trade_id, self.direction
+
+
+_TRADE_FIELDS = _getter(Trade_dtype, (
+    'ExchangeID', 'TradeID', 'Direction', 'OrderSysID', 'OrderRef', 'InvestorID', 'InstrumentID', 'OffsetFlag',
+    'HedgeFlag', 'Price', 'Volume', 'TradeDate', 'TradeTime'))
+
+_POSITION_FIELDS = _getter(InvestorPosition_dtype, (
+    'InstrumentID', 'ExchangeID', 'HedgeFlag', 'PosiDirection', 'Position', 'TodayPosition', 'LongFrozen',
+    'ShortFrozen', 'PositionCost'))
+
+
+class InstrumentStatus(NamedTuple):
+    exchange_id: str
+    instrument_id: str
+    status: str
+    enter_time: str
+    enter_reason: str
+
+
+_STATUS_FIELDS = _getter(InstrumentStatus_dtype, (
+    'ExchangeID', 'InstrumentID', 'InstrumentStatus', 'EnterTime', 'EnterReason'))
+
+
+@dataclass(slots=True)
+class Position:
+    """单个合约某一投机套保标志的持仓，多空分别记录今仓和昨仓；冻结和持仓成本只来自查询结果"""
+    instrument_id: str
+    exchange_id: str = ''
+    hedge: str = ''
+    long_today: int = 0
+    long_yesterday: int = 0
+    short_today: int = 0
+    short_yesterday: int = 0
+    long_frozen: int = 0
+    short_frozen: int = 0
+    long_cost: float = 0.0
+    short_cost: float = 0.0
+
+    @property
+    def long(self) -> int:
+        return self.long_today + self.long_yesterday
+
+    @property
+    def short(self) -> int:
+        return self.short_today + self.short_yesterday
+
+    @property
+    def net(self) -> int:
+        return self.long - self.short
+
+    def apply_trade(self, trade: Trade) -> None:
+        long_side = trade.direction == THOST_FTDC_D_Buy
+        if trade.offset == THOST_FTDC_OF_Open:
+            if long_side:
+                self.long_today += trade.volume
+            else:
+                self.short_today += trade.volume
+            return
+        # 买平减空头，卖平减多头；平今只减今仓，平昨只减昨仓，其余先减昨仓
+        side = 'short' if long_side else 'long'
+        today, yesterday = getattr(self, side + '_today'), getattr(self, side + '_yesterday')
+        volume = trade.volume
+        if trade.offset == THOST_FTDC_OF_CloseToday:
+            today -= volume
+        elif trade.offset == THOST_FTDC_OF_CloseYesterday:
+            yesterday -= volume
+        else:
+            used = min(volume, max(yesterday, 0))
+            yesterday -= used
+            today -= volume - used
+        setattr(self, side + '_today', today)
+        setattr(self, side + '_yesterday', yesterday)
+
+
+# 按投机套保标志合计持仓时相加的字段
+_POSITION_SUMS = ('long_today', 'long_yesterday', 'short_today', 'short_yesterday', 'long_frozen', 'short_frozen',
+                  'long_cost', 'short_cost')
+
+
+@dataclass(slots=True)
+class StateSnapshot:
+    """某一时刻的一致快照，之后的回报不会改变其内容"""
+    orders: dict[tuple[int, int, str], Order] = field(default_factory=dict)
+    trades: dict[tuple[str, str, str], Trade] = field(default_factory=dict)
+    positions: dict[tuple[str, str], Position] = field(default_factory=dict)
+    statuses: dict[tuple[str, str], InstrumentStatus] = field(default_factory=dict)
+
+    def open_orders(self, instrument_id: str | None = None) -> list[Order]:
+        return [o for o in self.orders.values()
+                if o.is_open and (instrument_id is None or o.instrument_id == instrument_id)]
+
+
+class TradingState:
+    """报单、成交、持仓、合约交易状态表，处理函数可在CTP回调线程中调用，查询可在任意线程中进行"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._orders: dict[tuple[int, int, str], Order] = {}
+        self._by_sys_id: dict[tuple[str, str], tuple[int, int, str]] = {}
+        self._open: dict[str, dict[tuple[int, int, str], Order]] = {}
+        self._trades: dict[tuple[str, str, str], Trade] = {}
+        self._positions: dict[tuple[str, str], Position] = {}     # (合约, 投机套保标志)
+        self._pending_positions: dict[tuple[str, str], Position] | None = None
+        self._window_trades: list[Trade] = []     # 持仓应答期间收到的成交，替换持仓表后重新计入
+        self._has_positions = False               # 持仓表是否来自查询结果
+        self._statuses: dict[tuple[str, str], InstrumentStatus] = {}
+
+    # ---------------- 回报处理 ----------------
+
+    def on_order(self, order) -> Order:
+        """OnRtnOrder / OnRspQryOrder的报单，返回更新后的行"""
+        v = _ORDER_FIELDS(order.to_tuple())
+        # OrderRef、OrderSysID可能带前导空格，作为索引键前先去掉
+        row = _new(Order, (v[0], v[1], v[2].strip(), v[3], v[4].strip(), *v[5:]))
+        key = row[:3]
+        with self._lock:
+            self._orders[key] = row
+            if row.order_sys_id:
+                self._by_sys_id[row.exchange_id, row.order_sys_id] = key
+            if row.status in OPEN_STATUSES:
+                self._open.setdefault(row.instrument_id, {})[key] = row
+            else:
+                pending = self._open.get(row.instrument_id)
+                if pending is not None:
+                    pending.pop(key, None)
+        return row
+
+    def on_trade(self, trade) -> Trade | None:
+        """OnRtnTrade的成交，并增量更新持仓；重复推送的成交返回None"""
+        return self._add_trade(trade, True)
+
+    def on_qry_trade(self, trade, rsp_info=None, request_id: int = 0, is_last: bool = True) -> Trade | None:
+        """OnRspQryTrade的成交：已有持仓查询结果时只记录成交（查询结果已包含这些成交），否则同时更新持仓"""
+        if trade is None:
+            return None
+        with self._lock:
+            return self._add_trade(trade, not self._has_positions)
+
+    def _add_trade(self, trade, apply: bool) -> Trade | None:
+        v = _TRADE_FIELDS(trade.to_tuple())
+        row = _new(Trade, (v[0], v[1].strip(), v[2], v[3].strip(), v[4].strip(), *v[5:]))
+        with self._lock:
+            key = row[:3]
+            if key in self._trades:
+                return None
+            self._trades[key] = row
+            if apply:
+                self._apply_trade(self._positions, row)
+                if self._pending_positions is not None:
+                    self._window_trades.append(row)
+        return row
+
+    @staticmethod
+    def _apply_trade(positions: dict[tuple[str, str], Position], row: Trade) -> None:
+        key = row.instrument_id, row.hedge
+        position = positions.get(key)
+        if position is None:
+            position = positions[key] = Position(row.instrument_id, row.exchange_id, row.hedge)
+        position.apply_trade(row)
+
+    def on_position(self, position, rsp_info=None, request_id: int = 0, is_last: bool = True) -> None:
+        """
+        OnRspQryInvestorPosition：累计到is_last后整体替换持仓表
+        柜台在第一条应答之前生成持仓结果，应答期间收到的成交不在结果中，替换后重新计入
+        """
+        with self._lock:
+            if self._pending_positions is None:
+                self._pending_positions = {}
+                self._window_trades = []
+            if position is not None:
+                instrument_id, exchange_id, hedge, direction, volume, today, long_frozen, short_frozen, cost = \
+                    _POSITION_FIELDS(position.to_tuple())
+                row = self._pending_positions.get((instrument_id, hedge))
+                if row is None:
+                    row = self._pending_positions[instrument_id, hedge] = Position(instrument_id, exchange_id, hedge)
+                # 上期所、能源中心今昨仓分两条返回（昨仓条目TodayPosition为0），其余交易所一条返回
+                if direction == THOST_FTDC_PD_Short:
+                    row.short_today += today
+                    row.short_yesterday += volume - today
+                    row.short_frozen += short_frozen
+                    row.short_cost += cost
+                else:
+                    row.long_today += today
+                    row.long_yesterday += volume - today
+                    row.long_frozen += long_frozen
+                    row.long_cost += cost
+            if is_last:
+                positions, self._pending_positions = self._pending_positions, None
+                for row in self._window_trades:
+                    self._apply_trade(positions, row)
+                self._window_trades = []
+                self._positions = positions
+                self._has_positions = True
+
+    def on_instrument_status(self, status) -> InstrumentStatus:
+        """OnRtnInstrumentStatus"""
+        row = InstrumentStatus._make(_STATUS_FIELDS(status.to_tuple()))
+        with self._lock:
+            self._statuses[row.exchange_id, row.instrument_id] = row
+        return row
+
+    # ---------------- 查询 ----------------
+
+    def order(self, front_id: int, session_id: int, order_ref: str) -> Order | None:
+        with self._lock:
+            return self._orders.get((front_id, session_id, str(order_ref).strip()))
+
+    def order_by_sys_id(self, exchange_id: str, order_sys_id: str) -> Order | None:
+        with self._lock:
+            key = self._by_sys_id.get((exchange_id, order_sys_id.strip()))
+            return self._orders.get(key) if key is not None else None
+
+    def open_orders(self, instrument_id: str | None = None) -> list[Order]:
+        """未完成的报单，可按合约过滤"""
+        with self._lock:
+            if instrument_id is not None:
+                return list(self._open.get(instrument_id, {}).values())
+            return [o for orders in self._open.values() for o in orders.values()]
+
+    def trades(self, instrument_id: str | None = None) -> list[Trade]:
+        with self._lock:
+            return [t for t in self._trades.values() if instrument_id is None or t.instrument_id == instrument_id]
+
+    def position(self, instrument_id: str, hedge: str | None = None) -> Position:
+        """
+        合约持仓的副本，无持仓时各数量为0
+        :param hedge: 投机套保标志（THOST_FTDC_HF_*），None时合计该合约全部标志的持仓（返回的hedge为空）
+        """
+        with self._lock:
+            if hedge is not None:
+                row = self._positions.get((instrument_id, hedge))
+                return replace(row) if row is not None else Position(instrument_id, hedge=hedge)
+            total = Position(instrument_id)
+            for (instrument, _), row in self._positions.items():
+                if instrument == instrument_id:
+                    total.exchange_id = row.exchange_id
+                    for name in _POSITION_SUMS:
+                        setattr(total, name, getattr(total, name) + getattr(row, name))
+            return total
+
+    def net_position(self, instrument_id: str, hedge: str | None = None) -> int:
+        """净持仓（多头 - 空头），hedge同position()"""
+        return self.position(instrument_id, hedge).net
+
+    def instrument_status(self, exchange_id: str, instrument_id: str) -> InstrumentStatus | None:
+        with self._lock:
+            return self._statuses.get((exchange_id, instrument_id))
+
+    def snapshot(self) -> StateSnapshot:
+        """一致快照：报单、成交、状态的行不可变，只需复制索引；持仓逐个复制"""
+        with self._lock:
+            return StateSnapshot(dict(self._orders), dict(self._trades),
+                                 {k: replace(v) for k, v in self._positions.items()}, dict(self._statuses))
+
+    def clear(self) -> None:
+        """清空全部状态（如切换交易日）"""
+        with self._lock:
+            self._reset()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : tickstore.py
+@Date       : 2025/12/06 10:15
+@Author     : Lumosylva
+@Email      : donnymoving@gmail.com
+@Software   : PyCharm
+@Description: 列式内存行情存储
+    每个合约一组按列存放的NumPy数组（只保留选定的CThostFtdcDepthMarketDataField字段），外加一列毫秒时间戳作为索引，
+    按时间二分查找，slice()返回数组视图而不复制。每条行情只占选定字段的字节数加8字节时间戳，没有Python对象开销。
+    时间戳为由交易日和UpdateTime推算的自然时间（见bars.natural_datetime），同一合约晚到的行情时间戳取为已有的最大值，
+    保证索引有序。可按每个合约的条数或按时间保留最近的行情。
+    扩容和淘汰时总是换用新数组，之前返回的视图仍然有效，但不会看到之后追加的行情。不是线程安全的。
+用法：
+    store = TickStore(max_age=600)
+    store.append(spi.drain())
+    view = store.slice("rb2601", "2025-12-05T21:00", "2025-12-05T21:05")
+    view['LastPrice'], view['time']
+"""
+import numpy as np
+
+from .bars import DAY_MS, SESSION_START_MS, group_instruments, natural_datetime, parse_digits, time_of_day_ms
+from .thostmduserapi import DepthMarketData_dtype
+
+DEFAULT_FIELDS = (
+    'LastPrice', 'Volume', 'Turnover', 'OpenInterest',
+    'BidPrice1', 'BidVolume1', 'AskPrice1', 'AskVolume1',
+)
+
+TIME_COLUMN = 'time'
+
+
+class _Series:
+    """单个合约的列数组，有效数据为 [head, head + size)"""
+
+    def __init__(self, dtypes: dict, capacity: int):
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        self.head = 0
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.columns[TIME_COLUMN])
+
+    @property
+    def time(self) -> np.ndarray:
+        return self.columns[TIME_COLUMN][self.head:self.head + self.size]
+
+    def reserve(self, extra: int) -> None:
+        """保证尾部还能放下extra条；空间不足时换用新数组（前部已淘汰的空间一并回收）"""
+        if self.head + self.size + extra <= self.capacity:
+            return
+        capacity = max(self.capacity, 16)
+        while capacity < self.size + extra:
+            capacity *= 2
+        # 淘汰后有效数据不到一半时缩小，长期运行时内存不会只增不减
+        while capacity >= 4 * (self.size + extra) and capacity > 16:
+            capacity //= 2
+        for name, column in self.columns.items():
+            fresh = np.empty(capacity, dtype=column.dtype)
+            fresh[:self.size] = column[self.head:self.head + self.size]
+            self.columns[name] = fresh
+        self.head = 0
+
+    def drop(self, n: int) -> None:
+        n = min(n, self.size)
+        # 只移动起点，不复用前部空间，之前返回的视图不会被覆盖
+        self.head += n
+        self.size -= n
+
+
+class TickStore:
+    """按合约分组的列式行情存储，支持按时间范围取视图"""
+
+    def __init__(self, fields=DEFAULT_FIELDS, *, max_ticks: int | None = None, max_age: float | None = None,
+                 initial_capacity: int = 1024):
+        """
+        :param fields: 保存的CThostFtdcDepthMarketDataField字段
+        :param max_ticks: 每个合约最多保留的条数，None为不限
+        :param max_age: 最多保留的时间（秒），以全部合约中最新的时间戳为准，None为不限
+        :param initial_capacity: 每个合约的初始容量
+        """
+        unknown = [name for name in fields if name not in DepthMarketData_dtype.names]
+        if unknown:
+            raise ValueError(f"未知字段: {', '.join(unknown)}")
+        self.fields = tuple(fields)
+        self.max_ticks = max_ticks
+        self.max_age_ms = None if max_age is None else int(max_age * 1000)
+        self.initial_capacity = initial_capacity
+        self._dtypes = {name: DepthMarketData_dtype.fields[name][0] for name in self.fields}
+        self._dtypes[TIME_COLUMN] = np.dtype('datetime64[ms]')
+        self._series: dict[str, _Series] = {}
+        self.latest = np.datetime64('NaT', 'ms')
+        self.appended = 0
+        self.evicted = 0
+
+    # ---------------- 写入 ----------------
+
+    def append(self, ticks: np.ndarray, trading_day=None) -> int:
+        """
+        追加一批DepthMarketData_dtype行情（drain()、ShardedDispatcher的批、TickBusSubscriber.read()['tick']），返回条数
+        :param trading_day: 交易日（'YYYYMMDD'或整数），None时使用行情中的TradingDay；郑商所夜盘TradingDay不可靠时请显式传入
+        """
+        if ticks.dtype != DepthMarketData_dtype:
+            raise TypeError("ticks的dtype必须是DepthMarketData_dtype")
+        n = len(ticks)
+        if n == 0:
+            return 0
+        tod = time_of_day_ms(ticks['UpdateTime'], ticks['UpdateMillisec'].astype(np.int64))
+        session = np.where(tod >= SESSION_START_MS, tod - SESSION_START_MS, tod + (DAY_MS - SESSION_START_MS))
+        if trading_day is None:
+            day = parse_digits(ticks['TradingDay'], range(8))
+        else:
+            day = np.full(n, int(trading_day), dtype=np.int64)
+        time = natural_datetime(day, session)
+
+        newest = time.max()
+        if np.isnat(self.latest) or newest > self.latest:
+            self.latest = newest
+        columns = {name: ticks[name] for name in self.fields}
+        columns[TIME_COLUMN] = time
+        names, inverse = group_instruments(ticks['InstrumentID'])
+        if len(names) == 1:
+            self._append(names[0].decode('ascii', 'replace'), columns)
+        else:
+            # 按合约排序后每个合约是连续的一段，只需一次取值
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.searchsorted(inverse[order], np.arange(len(names) + 1)).tolist()
+            columns = {key: column[order] for key, column in columns.items()}
+            for i, name in enumerate(names):
+                part = slice(bounds[i], bounds[i + 1])
+                self._append(name.decode('ascii', 'replace'), {key: column[part] for key, column in columns.items()})
+        self.appended += n
+        return n
+
+    def append_field(self, field, trading_day=None) -> int:
+        """追加单个CThostFtdcDepthMarketDataField（在回调中调用时会复制数据）"""
+        return self.append(field.as_array(), trading_day)
+
+    def _append(self, instrument: str, columns: dict) -> None:
+        series = self._series.get(instrument)
+        if series is None:
+            series = self._series[instrument] = _Series(self._dtypes, self.initial_capacity)
+        n = len(columns[TIME_COLUMN])
+        if self.max_ticks is not None and n > self.max_ticks:
+            columns = {name: column[-self.max_ticks:] for name, column in columns.items()}
+            self.evicted += n - self.max_ticks
+            n = self.max_ticks
+        # 晚到的行情时间戳取已有的最大值，保证索引有序
+        time = columns[TIME_COLUMN]
+        if series.size:
+            time = np.maximum(time, series.time[-1])
+        columns[TIME_COLUMN] = np.maximum.accumulate(time)
+        if self.max_ticks is not None and series.size + n > self.max_ticks:
+            self._drop(series, series.size + n - self.max_ticks)
+        series.reserve(n)
+        end = series.head + series.size
+        for name, column in columns.items():
+            series.columns[name][end:end + n] = column
+        series.size += n
+        if self.max_age_ms is not None:
+            self._expire(series, self.latest)
+
+    def _drop(self, series: _Series, n: int) -> None:
+        n = min(n, series.size)
+        series.drop(n)
+        self.evicted += n
+
+    def _expire(self, series: _Series, now: np.datetime64) -> None:
+        cutoff = now - np.timedelta64(self.max_age_ms, 'ms')
+        self._drop(series, int(np.searchsorted(series.time, cutoff, side='left')))
+
+    def evict(self, now=None) -> int:
+        """按max_age淘汰所有合约的过期行情（追加时只处理本批涉及的合约），返回淘汰条数"""
+        if self.max_age_ms is None:
+            return 0
+        now = self.latest if now is None else np.datetime64(now, 'ms')
+        if np.isnat(now):
+            return 0
+        before = self.evicted
+        for series in self._series.values():
+            self._expire(series, now)
+        return self.evicted - before
+
+    def clear(self, instrument: str | None = None) -> None:
+        if instrument is None:
+            self._series.clear()
+        else:
+            self._series.pop(instrument, None)
+
+    # ---------------- 查询 ----------------
+
+    def slice(self, instrument: str, t0=None, t1=None) -> dict[str, np.ndarray]:
+        """
+        合约在 [t0, t1) 内的行情，返回 {字段: 数组视图}，时间列为'time'；视图只读，不会看到之后追加的行情
+        :param t0: 起始时间（含），datetime64、datetime或ISO字符串，None为最早
+        :param t1: 结束时间（不含），None为最新
+        """
+        series = self._series.get(instrument)
+        if series is None:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in self._dtypes.items()}
+        time = series.time
+        start = 0 if t0 is None else int(np.searchsorted(time, np.datetime64(t0, 'ms'), side='left'))
+        stop = len(time) if t1 is None else int(np.searchsorted(time, np.datetime64(t1, 'ms'), side='left'))
+        return self._view(series, start, max(start, stop))
+
+    def last(self, instrument: str, n: int = 1) -> dict[str, np.ndarray]:
+        """合约最近n条行情的视图"""
+        series = self._series.get(instrument)
+        if series is None:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in self._dtypes.items()}
+        return self._view(series, max(series.size - n, 0), series.size)
+
+    @staticmethod
+    def _view(series: _Series, start: int, stop: int) -> dict[str, np.ndarray]:
+        result = {}
+        for name, column in series.columns.items():
+            view = column[series.head + start:series.head + stop]
+            view.flags.writeable = False
+            result[name] = view
+        return result
+
+    def count(self, instrument: str) -> int:
+        series = self._series.get(instrument)
+        return 0 if series is None else series.size
+
+    @property
+    def instruments(self) -> list[str]:
+        return list(self._series)
+
+    @property
+    def nbytes(self) -> int:
+        """已分配的列数组字节数（含预留容量）"""
+        return sum(column.nbytes for series in self._series.values() for column in series.columns.values())
+
+    @property
+    def tick_nbytes(self) -> int:
+        """每条行情的字节数"""
+        return sum(dtype.itemsize for dtype in self._dtypes.values())
+
+    def __len__(self):
+        return sum(series.size for series in self._series.values())
+
+    def __contains__(self, instrument: str):
+        return instrument in self._series
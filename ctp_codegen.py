@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+CTP SWIG代码生成脚本
+解析ctp_source目录中的CTP头文件，在构建时生成供SWIG包含的接口片段（<模块名>_generated.i）
+绑定配置（--profile）决定每个模块绑定哪些结构体、回调和常量，见PROFILES
+"""
+
+import argparse
+import fnmatch
+import re
+from pathlib import Path
+
+# CTP头文件中的基础类型到NumPy类型的映射
+NUMPY_TYPES = {
+    'char': 'S1',
+    'short': 'i2',
+    'int': 'i4',
+    'double': 'f8',
+}
+
+TYPEDEF_RE = re.compile(r'^\s*typedef\s+(char|short|int|double)\s+(\w+)\s*(?:\[(\d+)\])?\s*;', re.M)
+STRUCT_RE = re.compile(r'^\s*struct\s+(\w+)\s*\{(.*?)\};', re.M | re.S)
+MEMBER_RE = re.compile(r'^\s*(\w+)\s+(\w+)\s*;', re.M)
+CLASS_RE = r'^class\s+(?:\w+\s+)?{name}\s*\{{(.*?)^\}};'
+PURE_VIRTUAL_RE = re.compile(r'virtual\s+([\w\s\*]+?)\s*(\w+)\s*\(([^)]*)\)\s*=\s*0\s*;')
+STATIC_RE = re.compile(r'static\s+([\w\s\*]+?)\s*(\w+)\s*\(([^)]*)\)\s*;')
+ON_RSP_RE = re.compile(r'virtual\s+void\s+(OnRsp\w+)\s*\(([^)]*)\)')
+OVERRIDE_RE = re.compile(r'(\w+)\s*\([^)]*\)\s*override')
+
+# 模拟前置：API头文件、API类、回调类和基类
+FAKE_APIS = {
+    'md': ('ThostFtdcMdApi.h', 'CThostFtdcMdApi', 'CThostFtdcMdSpi',
+           'ctp_fake::FakeApiBase', 'enable_ticks'),
+    'trader': ('ThostFtdcTraderApi.h', 'CThostFtdcTraderApi', 'CThostFtdcTraderSpi',
+               'ctp_fake::FakeTraderBase', 'enable_orders'),
+}
+
+# API对应的SWIG模块
+MODULES = {
+    'md': 'thostmduserapi',
+    'trader': 'thosttraderapi',
+}
+
+VIRTUAL_RE = re.compile(r'virtual\s+[\w\s\*]+?\s*(\w+)\s*\(([^)]*)\)')
+STRUCT_PARAM_RE = re.compile(r'\b(CThostFtdc\w+Field)\b')
+CONSTANT_TYPEDEF_RE = re.compile(r'^\s*#define\s+(THOST_FTDC_\w+)\s|^\s*typedef\s+\w+\s+(\w+)', re.M)
+
+# 原生扩展代码和.i文件中的Python代码直接使用的结构体，任何绑定配置下都绑定
+REQUIRED_STRUCTS = {
+    'md': ('CThostFtdcDepthMarketDataField',),
+    'trader': ('CThostFtdcInputOrderField', 'CThostFtdcInputOrderActionField', 'CThostFtdcRspUserLoginField'),
+}
+
+# 行情API的全部请求和回调
+MD_NAMES = ('ReqUserLogin', 'ReqUserLogout', 'ReqQryMulticastInstrument', 'RegisterFensUserInfo',
+            'OnRspError', 'OnRspSubMarketData', 'OnRspUnSubMarketData', 'OnRspSubForQuoteRsp',
+            'OnRspUnSubForQuoteRsp', 'OnRtnDepthMarketData', 'OnRtnForQuoteRsp')
+
+# 内置绑定配置：(绑定的API, 方法/结构体/常量名的fnmatch模式)，full绑定全部
+# 不带结构体参数的方法（Init、RegisterFront、OnFrontConnected等）总是绑定；绑定ReqXxx时一并绑定应答OnRspXxx；
+# 结构体只在被绑定的方法使用或被模式选中时绑定，常量只在其类型被绑定的结构体成员使用或被模式选中时绑定
+PROFILES = {
+    'full': None,
+    'md-only': (('md',), MD_NAMES),
+    'trading-core': (('md', 'trader'), MD_NAMES + (
+        'ReqAuthenticate', 'RegisterUserSystemInfo', 'SubmitUserSystemInfo',
+        'ReqUserPasswordUpdate', 'ReqSettlementInfoConfirm', 'ReqQrySettlementInfo', 'ReqQrySettlementInfoConfirm',
+        'ReqOrderInsert', 'ReqOrderAction', 'OnErrRtnOrderInsert', 'OnErrRtnOrderAction', 'OnRtnOrder', 'OnRtnTrade',
+        'ReqQryOrder', 'ReqQryTrade', 'ReqQryInvestorPosition', 'ReqQryInvestorPositionDetail',
+        'ReqQryTradingAccount', 'ReqQryInvestor', 'ReqQryTradingCode', 'ReqQryMaxOrderVolume',
+        'ReqQryInstrument', 'ReqQryInstrumentMarginRate', 'ReqQryInstrumentCommissionRate',
+        'ReqQryInstrumentOrderCommRate', 'ReqQryExchange', 'ReqQryProduct', 'ReqQryDepthMarketData',
+        'OnRtnInstrumentStatus', 'OnRtnTradingNotice', 'OnRtnBulletin')),
+}
+
+
+def read_header(path):
+    """读取CTP头文件（原始文件为GB2312编码，标识符均为ASCII）"""
+    return Path(path).read_bytes().decode('latin-1')
+
+
+def parse_typedefs(text):
+    """解析数据类型头文件，返回 {类型名: (基础类型, 数组长度)}"""
+    typedefs = {}
+    for base, name, dim in TYPEDEF_RE.findall(text):
+        typedefs[name] = (base, int(dim) if dim else 0)
+    return typedefs
+
+
+def parse_structs(text, typedefs):
+    """解析结构体头文件，返回 {结构体名: [(成员名, 基础类型, 数组长度), ...]}"""
+    structs = {}
+    for name, body in STRUCT_RE.findall(text):
+        body = re.sub(r'//.*', '', body)
+        members = []
+        for type_name, member in MEMBER_RE.findall(body):
+            if type_name not in typedefs:
+                raise ValueError(f"{name}.{member} 使用了未知类型 {type_name}")
+            base, dim = typedefs[type_name]
+            members.append((member, base, dim))
+        structs[name] = members
+    return structs
+
+
+def load_headers(source_dir):
+    """加载并解析CTP数据类型和结构体头文件"""
+    source_path = Path(source_dir)
+    typedefs = parse_typedefs(read_header(source_path / 'ThostFtdcUserApiDataType.h'))
+    structs = parse_structs(read_header(source_path / 'ThostFtdcUserApiStruct.h'), typedefs)
+    return typedefs, structs
+
+
+def parse_constants(text):
+    """解析数据类型头文件中的字符常量，返回 {类型名: [常量名, ...]}（常量定义在所属类型的typedef之前）"""
+    constants = {}
+    pending = []
+    for constant, type_name in CONSTANT_TYPEDEF_RE.findall(text):
+        if constant:
+            pending.append(constant)
+        else:
+            constants[type_name] = pending
+            pending = []
+    return constants
+
+
+def parse_member_types(text):
+    """解析结构体头文件，返回 {结构体名: {成员类型名, ...}}"""
+    return {name: {type_name for type_name, _ in MEMBER_RE.findall(re.sub(r'//.*', '', body))}
+            for name, body in STRUCT_RE.findall(text)}
+
+
+def parse_methods(source_dir, api):
+    """解析API类和回调类的虚函数，返回 [(类名, 方法名, [结构体参数类型, ...]), ...]"""
+    header, api_name, spi_name, _, _ = FAKE_APIS[api]
+    text = re.sub(r'//.*', '', read_header(Path(source_dir) / header))
+    methods = []
+    for class_name in (api_name, spi_name):
+        body = re.search(CLASS_RE.format(name=class_name), text, re.M | re.S).group(1)
+        for name, params in VIRTUAL_RE.findall(body):
+            methods.append((class_name, name, STRUCT_PARAM_RE.findall(params)))
+    return methods
+
+
+def load_profile(profile):
+    """
+    加载绑定配置，返回 (绑定的API, 名称模式)，full返回None
+    :param profile: 内置配置名（见PROFILES）或允许列表文件，文件每行一个方法/结构体/常量名（可用通配符）、
+                    模块名（thostmduserapi/thosttraderapi，不写时绑定两个模块）或 @内置配置名，#之后为注释
+    """
+    if profile in PROFILES:
+        return PROFILES[profile]
+    path = Path(profile)
+    if not path.is_absolute() and not path.exists():
+        path = Path(__file__).parent / path
+    if not path.is_file():
+        raise ValueError(f"未知的绑定配置: {profile}（内置配置: {', '.join(PROFILES)}，或允许列表文件路径）")
+    apis, patterns = [], []
+    for line in path.read_text(encoding='utf-8').splitlines():
+        line = line.split('#')[0].strip()
+        if not line:
+            continue
+        if line.startswith('@'):
+            base = load_profile(line[1:])
+            if base is None:
+                return None
+            apis += base[0]
+            patterns += base[1]
+        elif line in MODULES.values():
+            apis += [api for api, module in MODULES.items() if module == line]
+        else:
+            patterns.append(line)
+    return tuple(api for api in MODULES if api in apis or not apis), tuple(patterns)
+
+
+def profile_modules(profile):
+    """绑定配置要构建的SWIG模块"""
+    spec = load_profile(profile)
+    return [MODULES[api] for api in (MODULES if spec is None else spec[0])]
+
+
+def select_bindings(source_dir, api, profile):
+    """
+    按绑定配置选出API要绑定的内容
+    :return: (绑定的结构体集合, 不绑定的方法 [(类名, 方法名), ...], 不绑定的常量列表)
+    """
+    source_path = Path(source_dir)
+    member_types = parse_member_types(read_header(source_path / 'ThostFtdcUserApiStruct.h'))
+    constants = parse_constants(read_header(source_path / 'ThostFtdcUserApiDataType.h'))
+    methods = parse_methods(source_dir, api)
+    spec = load_profile(profile)
+    if spec is None:
+        return set(member_types), [], []
+
+    patterns = spec[1]
+
+    def selected(name):
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+    requested = {name for _, name, _ in methods if selected(name)}
+    requested |= {'OnRsp' + name[3:] for name in requested if name.startswith('Req')}
+    structs = set(REQUIRED_STRUCTS[api]) | {name for name in member_types if selected(name)}
+    ignored_methods = []
+    for class_name, name, params in methods:
+        if not params or name in requested:
+            structs.update(params)
+        else:
+            ignored_methods.append((class_name, name))
+    used_types = set().union(*(member_types[name] for name in structs))
+    ignored_constants = [constant for type_name, names in constants.items() if type_name not in used_types
+                         for constant in names if not selected(constant)]
+    return structs, ignored_methods, ignored_constants
+
+
+def profile_summary(source_dir, profile):
+    """绑定配置下每个模块绑定的 (结构体, 方法, 常量) 数量及总数，返回 {模块: ((绑定数, 总数), ...)}"""
+    source_path = Path(source_dir)
+    total_structs = len(parse_member_types(read_header(source_path / 'ThostFtdcUserApiStruct.h')))
+    total_constants = sum(map(len, parse_constants(read_header(source_path / 'ThostFtdcUserApiDataType.h')).values()))
+    summary = {}
+    for module in profile_modules(profile):
+        api = next(api for api, name in MODULES.items() if name == module)
+        total_methods = len(parse_methods(source_dir, api))
+        structs, ignored_methods, ignored_constants = select_bindings(source_dir, api, profile)
+        summary[module] = ((len(structs), total_structs),
+                           (total_methods - len(ignored_methods), total_methods),
+                           (total_constants - len(ignored_constants), total_constants))
+    return summary
+
+
+def dtype_name(struct_name):
+    """CThostFtdcDepthMarketDataField -> DepthMarketData_dtype"""
+    short = struct_name.removeprefix('CThostFtdc').removesuffix('Field')
+    return f'{short}_dtype'
+
+
+def numpy_format(base, dim):
+    """成员类型对应的NumPy格式字符串"""
+    if base == 'char' and dim:
+        return f'S{dim}'
+    return NUMPY_TYPES[base]
+
+
+def generate_dtype(struct_name, members):
+    """生成与C结构体内存布局一致的NumPy dtype定义（align=True按C对齐规则计算偏移）"""
+    lines = [f'{dtype_name(struct_name)} = _np.dtype([']
+    for member, base, dim in members:
+        lines.append(f"    ('{member}', '{numpy_format(base, dim)}'),")
+    lines.append('], align=True)')
+    return '\n'.join(lines)
+
+
+def field_kind(base, dim):
+    """成员类型对应的ctp_native::FieldKind"""
+    if base == 'char':
+        return 'ctp_native::kFieldString' if dim else 'ctp_native::kFieldChar'
+    return {
+        'short': 'ctp_native::kFieldShort',
+        'int': 'ctp_native::kFieldInt',
+        'double': 'ctp_native::kFieldDouble',
+    }[base]
+
+
+def generate_field_table(struct_name, members):
+    """生成结构体的原生字段表，供to_tuple/to_dict/update按表批量转换"""
+    lines = [f'static const ctp_native::FieldInfo {struct_name}_fields[] = {{']
+    for member, base, dim in members:
+        lines.append(f'  {{"{member}", offsetof({struct_name}, {member}), '
+                     f'sizeof({struct_name}::{member}), {field_kind(base, dim)}}},')
+    lines.append('};')
+    lines.append(f'static ctp_native::StructInfo {struct_name}_info = {{"{struct_name}", '
+                 f'sizeof({struct_name}), {struct_name}_fields, {len(members)}, {{nullptr}}}};')
+    return '\n'.join(lines)
+
+
+def generate_struct_extension(struct_name):
+    """生成结构体的扩展方法：零拷贝缓冲区、批量转换和记录类型"""
+    return f'''%newobject {struct_name}::copy;
+%extend {struct_name} {{
+  PyObject *_raw_view() {{
+    return PyMemoryView_FromMemory(reinterpret_cast<char *>($self), sizeof({struct_name}), PyBUF_WRITE);
+  }}
+  {struct_name} *copy() {{
+    return new {struct_name}(*$self);
+  }}
+  PyObject *to_tuple() {{
+    return ctp_native::struct_to_tuple({struct_name}_info, $self);
+  }}
+  PyObject *to_dict() {{
+    return ctp_native::struct_to_dict({struct_name}_info, $self);
+  }}
+  PyObject *_update(PyObject *fields) {{
+    if (ctp_native::struct_update({struct_name}_info, $self, fields) < 0)
+      return NULL;
+    Py_RETURN_NONE;
+  }}
+}};'''
+
+
+# 所有结构体共用的Python辅助函数，由_extend_structs挂到每个结构体类上
+# 不写在%extend的%pythoncode中：-builtin构建没有代理类，类体中的Python代码会被丢弃
+STRUCT_HELPERS = '''
+def _extend_class(cls, **attrs):
+    """给代理类或-builtin类型添加方法和类属性"""
+    for name, value in attrs.items():
+        _set_class_attr(cls, name, value)
+        set_name = getattr(type(value), '__set_name__', None)
+        if set_name is not None:
+            set_name(value, cls, name)
+    return cls
+
+
+def _extends(cls):
+    """类装饰器：把类体中定义的方法挂到已有的SWIG类上，返回该SWIG类"""
+    def apply(body):
+        attrs = {name: value for name, value in vars(body).items()
+                 if name not in ('__module__', '__qualname__', '__firstlineno__', '__static_attributes__',
+                                 '__dict__', '__weakref__', '__doc__')}
+        for name, value in attrs.items():
+            if hasattr(value, '__code__'):
+                value.__qualname__ = f'{cls.__name__}.{name}'
+        return _extend_class(cls, **attrs)
+    return apply
+
+
+class _LazyRecord:
+    """按结构体字段顺序定义的namedtuple记录类型，首次访问时创建"""
+
+    def __set_name__(self, owner, name):
+        self.attr = name
+
+    def __get__(self, obj, owner):
+        name = owner.__name__.removeprefix('CThostFtdc').removesuffix('Field') + 'Record'
+        record = _collections.namedtuple(name, owner.dtype.names)
+        record.__module__ = owner.__module__
+        _set_class_attr(owner, self.attr, record)
+        return record
+
+
+def _struct_buffer(self, flags):
+    return self._raw_view()
+
+
+def _struct_as_array(self):
+    """返回共享结构体内存的单元素结构化数组，回调中收到的结构体只在回调期间有效，需要保留时请先copy()"""
+    return _np.frombuffer(self, dtype=self.dtype)
+
+
+def _struct_to_record(self):
+    """转换为按字段顺序排列的namedtuple记录"""
+    return self.Record._make(self.to_tuple())
+
+
+def _struct_update(self, **fields):
+    """一次调用批量写入多个字段，返回自身"""
+    self._update(fields)
+    return self
+
+
+def _struct_from_dict(cls, fields):
+    """由 {字段名: 值} 映射构造结构体"""
+    obj = cls()
+    obj._update(fields)
+    return obj
+
+
+def _extend_structs(namespace):
+    """给每个结构体类挂上dtype、记录类型和转换方法，在全部结构体类定义之后调用"""
+    for struct_name, dtype in STRUCT_DTYPES.items():
+        _extend_class(namespace[struct_name],
+                      dtype=dtype,
+                      Record=_LazyRecord(),
+                      __buffer__=_struct_buffer,
+                      as_array=_struct_as_array,
+                      to_record=_struct_to_record,
+                      update=_struct_update,
+                      from_dict=classmethod(_struct_from_dict))
+'''
+
+
+def generate_interface(structs, ignored=()):
+    """生成SWIG接口片段的内容，ignored为绑定配置未选中的结构体、方法和常量"""
+    parts = [
+        '// 由 ctp_codegen.py 根据CTP头文件自动生成，请勿手动修改',
+        '',
+        '%{',
+        '#include <cstddef>',
+        '#include "ctp_fields.h"',
+        '',
+    ]
+    for struct_name, members in structs.items():
+        parts.append(generate_field_table(struct_name, members))
+    parts.append('%}')
+    parts.append('')
+    parts.append('// 给类添加属性：-builtin构建的类型的元类不允许在Python中新增类属性')
+    parts.append('%rename(_set_class_attr) ctp_native::set_class_attr;')
+    parts.append('%feature("nothreadallow") ctp_native::set_class_attr;')
+    parts.append('namespace ctp_native {')
+    parts.append('PyObject *set_class_attr(PyObject *cls, const char *name, PyObject *value);')
+    parts.append('}')
+    parts.append('')
+    if ignored:
+        parts.append('// 绑定配置未选中的结构体、方法和常量')
+        parts.extend(f'%ignore {name};' for name in ignored)
+        parts.append('')
+    parts.append('%pythoncode %{')
+    parts.append('import collections as _collections')
+    parts.append('')
+    parts.append('import numpy as _np')
+    parts.append(STRUCT_HELPERS)
+    for struct_name, members in structs.items():
+        parts.append(generate_dtype(struct_name, members))
+        parts.append('')
+    parts.append('STRUCT_DTYPES = {')
+    for struct_name in structs:
+        parts.append(f"    '{struct_name}': {dtype_name(struct_name)},")
+    parts.append('}')
+    parts.append('%}')
+    parts.append('')
+    # 以下方法需要调用Python C API，不能在-threads模式下释放GIL
+    parts.append('%nothreadallow;')
+    for struct_name in structs:
+        parts.append(generate_struct_extension(struct_name))
+    parts.append('%clearnothreadallow;')
+    return '\n'.join(parts) + '\n'
+
+
+def split_params(params):
+    """'int a, char *b[]' -> [('int', 'a'), ('char *[]', 'b')]，去掉默认值"""
+    result = []
+    for param in params.split(','):
+        param = param.split('=')[0].strip()
+        if not param or param == 'void':
+            continue
+        match = re.match(r'(.*?)(\w+)\s*(\[\s*\])?$', param, re.S)
+        result.append((match.group(1).strip(), match.group(2)))
+    return result
+
+
+def strip_defaults(params):
+    """去掉参数默认值，用于生成静态成员函数定义"""
+    return ', '.join(p.split('=')[0].strip() for p in params.split(',') if p.strip())
+
+
+def fake_method_body(name, ret, params, spi_name, rsp_methods):
+    """模拟API中单个纯虚函数的实现"""
+    names = [param_name for _, param_name in split_params(params)]
+    if name.startswith('Req') and 'OnRsp' + name[3:] in rsp_methods:
+        query = name[3:].startswith(('Qry', 'Query'))
+        return (f'return on_request({names[0]}, {names[1]}, &{spi_name}::OnRsp{name[3:]}, '
+                f'{"true" if query else "false"});')
+    if 'Subscribe' in name and 'OnRsp' + name.replace('Subscribe', 'Sub') in rsp_methods:
+        add = 'false' if name.startswith('Un') else 'true'
+        market_data = 'true' if name.endswith('MarketData') else 'false'
+        return (f'return on_subscribe({names[0]}, {names[1]}, &{spi_name}::OnRsp{name.replace("Subscribe", "Sub")}, '
+                f'{add}, {market_data});')
+    ret = ret.strip()
+    if ret == 'void':
+        return ''
+    if ret.endswith('*'):
+        return 'return nullptr;'
+    return 'return 0;'
+
+
+def generate_fake_api(source_dir, kind, base_header):
+    """根据API头文件生成模拟前置的实现，基类已实现的方法不再生成"""
+    header, api_name, spi_name, base_name, enable = FAKE_APIS[kind]
+    text = re.sub(r'//.*', '', read_header(Path(source_dir) / header))
+    api_body = re.search(CLASS_RE.format(name=api_name), text, re.M | re.S).group(1)
+    spi_body = re.search(CLASS_RE.format(name=spi_name), text, re.M | re.S).group(1)
+    rsp_methods = {name for name, _ in ON_RSP_RE.findall(spi_body)}
+    implemented = set(OVERRIDE_RE.findall(Path(base_header).read_text(encoding='utf-8')))
+
+    class_name = 'Fake' + api_name.removeprefix('CThostFtdc')
+    lines = [
+        '// 由 ctp_codegen.py 根据CTP头文件自动生成，请勿手动修改',
+        f'#include "{header}"',
+        '#include "fake_front.h"',
+        '',
+        'namespace {',
+        '',
+        f'class {class_name} final : public {base_name}<{api_name}, {spi_name}>',
+        '{',
+        'public:',
+        f'    {class_name}() {{ {enable}(); }}',
+        '',
+    ]
+    for ret, name, params in PURE_VIRTUAL_RE.findall(api_body):
+        if name in implemented:
+            continue
+        ret = ' '.join(ret.split())
+        params = ' '.join(params.split())
+        body = fake_method_body(name, ret, params, spi_name, rsp_methods)
+        lines.append(f'    {ret} {name}({params}) override {{ {body} }}'.replace('{  }', '{}'))
+    lines += ['};', '', '}  // namespace', '']
+    for ret, name, params in STATIC_RE.findall(api_body):
+        ret = ' '.join(ret.split())
+        signature = f'{ret} {api_name}::{name}({strip_defaults(params)})'
+        if name.startswith('Create'):
+            lines += [signature, '{', f'    return new {class_name}();', '}', '']
+        elif name == 'GetApiVersion':
+            lines += [signature, '{', '    return "FakeCTP";', '}', '']
+    return '\n'.join(lines)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='CTP SWIG代码生成脚本')
+    parser.add_argument('--source-dir', default='ctp_source',
+                        help='CTP头文件目录 (默认: ctp_source)')
+    parser.add_argument('--output', default='ctp_generated.i',
+                        help='生成的SWIG接口文件 (默认: ctp_generated.i)')
+    parser.add_argument('--api', choices=sorted(MODULES),
+                        help='按绑定配置生成该API模块的接口片段（md或trader），不指定时绑定全部结构体')
+    parser.add_argument('--profile', default='full',
+                        help=f'绑定配置: {"/".join(PROFILES)} 或允许列表文件 (默认: full)')
+    parser.add_argument('--list-modules', action='store_true',
+                        help='输出绑定配置要构建的模块名后退出')
+    parser.add_argument('--fake-api', choices=sorted(FAKE_APIS),
+                        help='改为生成模拟前置的C++实现（md或trader）')
+    parser.add_argument('--fake-base', default=str(Path(__file__).parent / 'fake_ctp' / 'fake_front.h'),
+                        help='模拟前置基类头文件，其中已实现的方法不再生成')
+    args = parser.parse_args()
+
+    if args.list_modules:
+        print('\n'.join(profile_modules(args.profile)))
+        return
+    if args.fake_api:
+        Path(args.output).write_text(generate_fake_api(args.source_dir, args.fake_api, args.fake_base),
+                                     encoding='utf-8')
+        return
+    _, structs = load_headers(args.source_dir)
+    ignored = []
+    if args.api:
+        kept, ignored_methods, ignored_constants = select_bindings(args.source_dir, args.api, args.profile)
+        ignored = [name for name in structs if name not in kept]
+        ignored += [f'{class_name}::{name}' for class_name, name in ignored_methods]
+        ignored += ignored_constants
+        structs = {name: members for name, members in structs.items() if name in kept}
+    elif load_profile(args.profile) is not None:
+        parser.error('--profile需要同时指定--api')
+    Path(args.output).write_text(generate_interface(structs, ignored), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -62,12 +62,11 @@ class CFtdcMdSpi(mdapi.CThostFtdcMdSpi):
             print("行情服务器登录成功")
             self.login_status = True
 
-            # 获取需要重新订阅的合约列表
-            symbol_bytes_list = [s.encode('utf-8') for s in self.subscribe_symbol_list]
-            print(f"symbol_bytes_list={symbol_bytes_list}")
+            # 订阅合约列表，可直接传入str列表，超长列表会自动分批，返回每批的返回码
+            print(f"subscribe_symbol_list={self.subscribe_symbol_list}")
 
-            ret = self.md_user_api.SubscribeMarketData(symbol_bytes_list, len(symbol_bytes_list))
-            if ret == 0:
+            ret_codes = self.md_user_api.subscribe_market_data(self.subscribe_symbol_list)
+            if all(ret == 0 for ret in ret_codes):
                 print("发送订阅行情请求成功")
             else:
                 print("发送订阅行情请求失败")
@@ -0,0 +1,431 @@
+// 共享内存行情总线：一个进程接收行情，在CTP回调线程中写入内存映射文件中的环形缓冲区，多个进程同时读取
+// 文件布局：BusHeader | 合约代码表（max_instruments个定长条目）| capacity个BusSlot
+// 每个槽位带序号（写入中为0，写完为全局序号+1），读者复制后再次校验序号，被覆盖的记录计入lost()
+// 每条记录带全局序号和合约内序号，按合约过滤后仍可由合约内序号检查是否缺失
+// 发布者重启时沿用同一文件并更换epoch，订阅者据此从新的写入位置重新开始
+#ifndef CTP_NATIVE_BUS_H
+#define CTP_NATIVE_BUS_H
+
+#include "ThostFtdcUserApiStruct.h"
+#include "ctp_sink.h"
+
+#ifndef SWIG
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <cstdio>
+#include <cstring>
+#include <mutex>
+#include <stdexcept>
+#include <string>
+#include <unordered_map>
+#include <unordered_set>
+#include <vector>
+
+#include "ctp_mmap.h"
+
+namespace ctp_native {
+
+constexpr std::uint32_t kBusVersion = 1;
+
+struct BusHeader
+{
+    char magic[8];
+    std::uint32_t version;
+    std::uint32_t slot_size;
+    std::uint64_t capacity;        // 槽位数，2的幂
+    std::uint32_t max_instruments;
+    std::uint32_t symbol_size;
+    std::uint64_t symbols_offset;
+    std::uint64_t slots_offset;
+    char reserved0[16];
+    alignas(64) std::atomic<std::uint64_t> epoch;         // 发布者每次启动时更新
+    std::atomic<std::uint64_t> write_seq;                 // 已发布的记录数
+    std::atomic<std::uint32_t> symbol_count;
+    std::atomic<std::uint32_t> closed;                    // 发布者已关闭
+    char reserved1[40];
+};
+static_assert(sizeof(BusHeader) == 128, "BusHeader必须为128字节");
+static_assert(std::atomic<std::uint64_t>::is_always_lock_free, "共享内存中的原子变量必须无锁");
+
+// 订阅者读出的记录，与BusSlot布局相同
+struct BusRecord
+{
+    std::uint64_t seq;             // 全局序号，从0开始
+    std::uint32_t instrument;      // 合约序号（合约代码表中的位置）
+    std::uint32_t instrument_seq;  // 该合约的序号，从0开始
+    CThostFtdcDepthMarketDataField tick;
+};
+
+struct BusSlot
+{
+    std::atomic<std::uint64_t> seq;  // 0表示写入中或尚未写入，否则为全局序号+1
+    std::uint32_t instrument;
+    std::uint32_t instrument_seq;
+    CThostFtdcDepthMarketDataField tick;
+};
+static_assert(sizeof(BusSlot) == sizeof(BusRecord), "BusSlot与BusRecord布局必须一致");
+
+inline std::size_t bus_align(std::size_t n)
+{
+    return (n + 63) & ~static_cast<std::size_t>(63);
+}
+
+inline std::size_t bus_file_size(std::uint64_t capacity, std::uint32_t max_instruments)
+{
+    return bus_align(sizeof(BusHeader)) + bus_align(max_instruments * sizeof(TThostFtdcInstrumentIDType)) +
+           capacity * sizeof(BusSlot);
+}
+
+}  // namespace ctp_native
+#endif
+
+class TickBusPublisher : public TickSink
+{
+public:
+    // 创建或沿用path处的总线文件（Linux下建议放在/dev/shm），capacity向上取整为2的幂
+    // 已存在的文件布局（容量、合约数上限、版本）不一致时抛出ValueError，需先删除旧文件
+    explicit TickBusPublisher(const char *path, size_t capacity = 1 << 16, size_t max_instruments = 8192)
+    {
+        if (!path || !path[0])
+            throw std::invalid_argument("path must not be empty");
+        if (capacity == 0 || max_instruments == 0 || max_instruments > 0xFFFFFFFFu)
+            throw std::invalid_argument("capacity and max_instruments must be positive");
+        std::uint64_t cap = 1;
+        while (cap < capacity)
+            cap <<= 1;
+        const auto max_inst = static_cast<std::uint32_t>(max_instruments);
+        const std::size_t size = ctp_native::bus_file_size(cap, max_inst);
+        if (!file_.open(path, size))
+            throw std::runtime_error(file_.error());
+        auto *h = header();
+        const bool exists = h->magic[0] != '\0';
+        if (exists && (std::memcmp(h->magic, "CTPBUS", 7) != 0 || h->version != ctp_native::kBusVersion ||
+                       h->slot_size != sizeof(ctp_native::BusSlot) || h->capacity != cap ||
+                       h->max_instruments != max_inst || file_.size() != size))
+        {
+            file_.close();
+            throw std::invalid_argument(std::string("existing bus has a different layout: ") + path);
+        }
+        if (!exists)
+        {
+            std::memcpy(h->magic, "CTPBUS", 7);
+            h->version = ctp_native::kBusVersion;
+            h->slot_size = sizeof(ctp_native::BusSlot);
+            h->capacity = cap;
+            h->max_instruments = max_inst;
+            h->symbol_size = sizeof(TThostFtdcInstrumentIDType);
+            h->symbols_offset = ctp_native::bus_align(sizeof(ctp_native::BusHeader));
+            h->slots_offset = h->symbols_offset + ctp_native::bus_align(max_inst * sizeof(TThostFtdcInstrumentIDType));
+        }
+        // 沿用旧文件时清空序号和合约表，再公开新的epoch
+        h->write_seq.store(0, std::memory_order_relaxed);
+        h->symbol_count.store(0, std::memory_order_relaxed);
+        h->closed.store(0, std::memory_order_relaxed);
+        for (std::uint64_t i = 0; i < cap; ++i)
+            slot(i).seq.store(0, std::memory_order_relaxed);
+        const auto now = std::chrono::system_clock::now().time_since_epoch();
+        h->epoch.store(static_cast<std::uint64_t>(std::chrono::duration_cast<std::chrono::nanoseconds>(now).count()),
+                       std::memory_order_release);
+        mask_ = cap - 1;
+    }
+    virtual ~TickBusPublisher() { close(); }
+
+#ifndef SWIG
+    void on_tick(const CThostFtdcDepthMarketDataField &tick) override { publish(&tick); }
+#endif
+
+    // 发布一条行情；CTP回调线程通过on_tick调用，也可以在Python中手动调用
+    void publish(const CThostFtdcDepthMarketDataField *tick)
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (!file_.is_open() || !tick)
+            return;
+        const std::int64_t instrument = slot_for(tick->InstrumentID);
+        if (instrument < 0)
+        {
+            ++overflow_;
+            return;
+        }
+        ctp_native::BusSlot &s = slot(seq_);
+        s.seq.store(0, std::memory_order_relaxed);
+        std::atomic_thread_fence(std::memory_order_release);
+        s.instrument = static_cast<std::uint32_t>(instrument);
+        s.instrument_seq = instrument_seqs_[static_cast<std::size_t>(instrument)]++;
+        std::memcpy(&s.tick, tick, sizeof(*tick));
+        s.seq.store(seq_ + 1, std::memory_order_release);
+        header()->write_seq.store(++seq_, std::memory_order_release);
+    }
+
+    // 标记总线已关闭并解除映射，之后的行情不再发布
+    void close()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (!file_.is_open())
+            return;
+        header()->closed.store(1, std::memory_order_release);
+        file_.close();
+    }
+
+    // 已发布的记录数
+    unsigned long long published()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return seq_;
+    }
+    // 因合约代码表已满而丢弃的行情数
+    unsigned long long overflow()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return overflow_;
+    }
+    size_t capacity() const { return static_cast<size_t>(mask_ + 1); }
+    static size_t record_size() { return sizeof(ctp_native::BusRecord); }
+
+#ifndef SWIG
+private:
+    ctp_native::BusHeader *header() { return reinterpret_cast<ctp_native::BusHeader *>(file_.data()); }
+
+    ctp_native::BusSlot &slot(std::uint64_t seq)
+    {
+        auto *slots = reinterpret_cast<ctp_native::BusSlot *>(file_.data() + header()->slots_offset);
+        return slots[seq & mask_];
+    }
+
+    std::int64_t slot_for(const char *instrument)
+    {
+        std::string key(instrument, strnlen(instrument, sizeof(TThostFtdcInstrumentIDType)));
+        auto it = instruments_.find(key);
+        if (it != instruments_.end())
+            return it->second;
+        auto *h = header();
+        const std::uint32_t n = h->symbol_count.load(std::memory_order_relaxed);
+        if (n >= h->max_instruments)
+            return -1;
+        char *dst = file_.data() + h->symbols_offset + n * sizeof(TThostFtdcInstrumentIDType);
+        std::memset(dst, 0, sizeof(TThostFtdcInstrumentIDType));
+        std::memcpy(dst, key.data(), key.size());
+        h->symbol_count.store(n + 1, std::memory_order_release);
+        instruments_.emplace(std::move(key), n);
+        instrument_seqs_.push_back(0);
+        return n;
+    }
+
+    ctp_native::MappedFile file_;
+    std::mutex mutex_;
+    std::uint64_t mask_ = 0;
+    std::uint64_t seq_ = 0;
+    std::unordered_map<std::string, std::uint32_t> instruments_;
+    std::vector<std::uint32_t> instrument_seqs_;
+    unsigned long long overflow_ = 0;
+#endif
+};
+
+class TickBusSubscriber
+{
+public:
+    // 打开发布者创建的总线文件；from_start为True时从环形缓冲区中最早的记录开始读，否则只读之后的新行情
+    explicit TickBusSubscriber(const char *path, bool from_start = false) : from_start_(from_start)
+    {
+        if (!path || !path[0])
+            throw std::invalid_argument("path must not be empty");
+        // 不创建文件：总线必须已由发布者建立
+        std::FILE *f = std::fopen(path, "rb");
+        if (!f)
+            throw std::invalid_argument(std::string("bus not found: ") + path);
+        std::fclose(f);
+        if (!file_.open(path, 0))
+            throw std::runtime_error(file_.error());
+        auto *h = header();
+        if (file_.size() < sizeof(ctp_native::BusHeader) || std::memcmp(h->magic, "CTPBUS", 7) != 0 ||
+            h->version != ctp_native::kBusVersion || h->slot_size != sizeof(ctp_native::BusSlot) ||
+            file_.size() < ctp_native::bus_file_size(h->capacity, h->max_instruments))
+        {
+            file_.close();
+            throw std::invalid_argument(std::string("not a valid tick bus: ") + path);
+        }
+        mask_ = h->capacity - 1;
+        resync();
+    }
+    virtual ~TickBusSubscriber() {}
+
+    // 只接收指定合约的行情（可多次调用累加），未调用时接收全部合约
+    void subscribe(char *ppInstrumentID[], int nCount)
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        for (int i = 0; i < nCount; ++i)
+            wanted_.insert(key_of(ppInstrumentID[i]));
+        all_ = false;
+        matches_.clear();
+    }
+    void unsubscribe(char *ppInstrumentID[], int nCount)
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        for (int i = 0; i < nCount; ++i)
+            wanted_.erase(key_of(ppInstrumentID[i]));
+        matches_.clear();
+    }
+    // 恢复接收全部合约
+    void subscribe_all()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        wanted_.clear();
+        all_ = true;
+        matches_.clear();
+    }
+
+    // 读取已发布的新记录（BusRecord）到buffer，返回条数；被覆盖的记录计入lost()并跳过
+    size_t read_into(void *buffer, size_t buffer_size)
+    {
+        auto *out = static_cast<ctp_native::BusRecord *>(buffer);
+        const size_t max_n = buffer_size / sizeof(ctp_native::BusRecord);
+        std::lock_guard<std::mutex> lock(mutex_);
+        auto *h = header();
+        if (h->epoch.load(std::memory_order_acquire) != epoch_)
+        {
+            ++restarts_;
+            resync();
+        }
+        const std::uint64_t head = h->write_seq.load(std::memory_order_acquire);
+        if (head < next_)
+        {
+            ++restarts_;
+            resync();
+        }
+        // 落后超过整个环形缓冲区时直接跳到仍可读的最早记录
+        if (head - next_ > mask_ + 1)
+        {
+            lost_ += head - next_ - (mask_ + 1);
+            next_ = head - (mask_ + 1);
+        }
+        size_t n = 0;
+        for (; next_ < head && n < max_n; ++next_)
+        {
+            ctp_native::BusSlot &s = slot(next_);
+            if (s.seq.load(std::memory_order_acquire) != next_ + 1)
+            {
+                ++lost_;
+                continue;
+            }
+            const std::uint32_t instrument = s.instrument;
+            std::atomic_thread_fence(std::memory_order_acquire);
+            if (s.seq.load(std::memory_order_relaxed) != next_ + 1)
+            {
+                ++lost_;
+                continue;
+            }
+            if (!all_ && !matches(instrument))
+                continue;
+            std::memcpy(reinterpret_cast<char *>(&out[n]) + sizeof(std::uint64_t),
+                        reinterpret_cast<const char *>(&s) + sizeof(std::uint64_t),
+                        sizeof(ctp_native::BusRecord) - sizeof(std::uint64_t));
+            std::atomic_thread_fence(std::memory_order_acquire);
+            if (s.seq.load(std::memory_order_relaxed) != next_ + 1)
+            {
+                ++lost_;
+                continue;
+            }
+            out[n].seq = next_;
+            ++n;
+        }
+        return n;
+    }
+
+    // 尚未读取的记录数（含将被过滤掉的）
+    unsigned long long pending()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        const std::uint64_t head = header()->write_seq.load(std::memory_order_acquire);
+        return head > next_ ? head - next_ : 0;
+    }
+    // 下一条要读取的全局序号
+    unsigned long long next_seq()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return next_;
+    }
+    // 读取不及时、被发布者覆盖而丢失的记录数
+    unsigned long long lost()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return lost_;
+    }
+    // 检测到发布者重启的次数
+    unsigned long long restarts()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return restarts_;
+    }
+    // 发布者是否已关闭总线
+    bool closed() { return header()->closed.load(std::memory_order_acquire) != 0; }
+    size_t capacity() const { return static_cast<size_t>(mask_ + 1); }
+    // 已登记的合约数及合约序号对应的代码
+    size_t instrument_count() { return header()->symbol_count.load(std::memory_order_acquire); }
+    std::string instrument(size_t index)
+    {
+        if (index >= instrument_count())
+            return std::string();
+        return key_of(symbol(static_cast<std::uint32_t>(index)));
+    }
+    static size_t record_size() { return sizeof(ctp_native::BusRecord); }
+
+#ifndef SWIG
+private:
+    ctp_native::BusHeader *header() const { return reinterpret_cast<ctp_native::BusHeader *>(file_.data()); }
+
+    ctp_native::BusSlot &slot(std::uint64_t seq) const
+    {
+        auto *slots = reinterpret_cast<ctp_native::BusSlot *>(file_.data() + header()->slots_offset);
+        return slots[seq & mask_];
+    }
+
+    const char *symbol(std::uint32_t index) const
+    {
+        return file_.data() + header()->symbols_offset + index * sizeof(TThostFtdcInstrumentIDType);
+    }
+
+    static std::string key_of(const char *instrument)
+    {
+        return std::string(instrument, strnlen(instrument, sizeof(TThostFtdcInstrumentIDType)));
+    }
+
+    void resync()
+    {
+        auto *h = header();
+        epoch_ = h->epoch.load(std::memory_order_acquire);
+        const std::uint64_t head = h->write_seq.load(std::memory_order_acquire);
+        next_ = !from_start_ ? head : head > mask_ + 1 ? head - (mask_ + 1) : 0;
+        matches_.clear();
+    }
+
+    // 合约序号是否在订阅集合中，结果按序号缓存
+    bool matches(std::uint32_t instrument)
+    {
+        if (instrument >= matches_.size())
+        {
+            const std::uint32_t n = header()->symbol_count.load(std::memory_order_acquire);
+            if (instrument >= n)
+                return false;
+            const std::size_t old = matches_.size();
+            matches_.resize(n);
+            for (std::uint32_t i = static_cast<std::uint32_t>(old); i < n; ++i)
+                matches_[i] = wanted_.count(key_of(symbol(i))) ? 1 : 0;
+        }
+        return matches_[instrument] != 0;
+    }
+
+    ctp_native::MappedFile file_;
+    std::mutex mutex_;
+    bool from_start_;
+    bool all_ = true;
+    std::uint64_t mask_ = 0;
+    std::uint64_t epoch_ = 0;
+    std::uint64_t next_ = 0;
+    unsigned long long lost_ = 0;
+    unsigned long long restarts_ = 0;
+    std::unordered_set<std::string> wanted_;
+    std::vector<char> matches_;
+#endif
+};
+
+#endif  // CTP_NATIVE_BUS_H
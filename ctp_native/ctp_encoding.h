@@ -0,0 +1,147 @@
+// CTP字符串字段（GB18030编码的定长char数组）到Python str的转换
+// 纯ASCII字段（合约代码、交易所代码、日期时间、报单编号等）直接构造str，不产生中间缓冲区；
+// 仅在出现高位字节时使用缓存的双字节码表解码，四字节序列交给Python的gb18030编解码器处理
+#ifndef CTP_NATIVE_ENCODING_H
+#define CTP_NATIVE_ENCODING_H
+
+#include <Python.h>
+
+#include <atomic>
+#include <cstdint>
+#include <cstring>
+#include <vector>
+
+namespace ctp_native {
+
+constexpr unsigned kGbLeadFirst = 0x81;
+constexpr unsigned kGbLeadLast = 0xFE;
+constexpr unsigned kGbTrailFirst = 0x40;
+constexpr unsigned kGbTrailLast = 0xFE;
+constexpr std::size_t kGbTrailCount = kGbTrailLast - kGbTrailFirst + 1;
+constexpr std::size_t kGbTableSize = (kGbLeadLast - kGbLeadFirst + 1) * kGbTrailCount;
+constexpr Py_UCS2 kReplacementChar = 0xFFFD;
+
+// 字段实际长度：遇到'\0'截止，最长max_len
+inline std::size_t field_length(const char *s, std::size_t max_len)
+{
+    const void *end = std::memchr(s, 0, max_len);
+    return end ? static_cast<const char *>(end) - s : max_len;
+}
+
+inline bool is_ascii(const char *s, std::size_t n)
+{
+    std::size_t i = 0;
+    for (; i + 8 <= n; i += 8)
+    {
+        std::uint64_t word;
+        std::memcpy(&word, s + i, 8);
+        if (word & 0x8080808080808080ULL)
+            return false;
+    }
+    for (; i < n; ++i)
+    {
+        if (static_cast<unsigned char>(s[i]) & 0x80)
+            return false;
+    }
+    return true;
+}
+
+// 双字节GB18030码表，首次遇到非ASCII字段时由Python的gb18030编解码器一次性生成并缓存
+// 调用方必须持有GIL；并发初始化时以先写入者为准，不使用函数内静态变量以免与GIL互相等待
+inline const Py_UCS2 *gb18030_table()
+{
+    static std::atomic<const Py_UCS2 *> cached{nullptr};
+    const Py_UCS2 *table = cached.load(std::memory_order_acquire);
+    if (table)
+        return table;
+
+    Py_UCS2 *built = new Py_UCS2[kGbTableSize];
+    for (unsigned lead = kGbLeadFirst; lead <= kGbLeadLast; ++lead)
+    {
+        for (unsigned trail = kGbTrailFirst; trail <= kGbTrailLast; ++trail)
+        {
+            const char pair[2] = {static_cast<char>(lead), static_cast<char>(trail)};
+            Py_UCS2 code = kReplacementChar;
+            PyObject *decoded = PyUnicode_Decode(pair, 2, "gb18030", "strict");
+            if (decoded && PyUnicode_GET_LENGTH(decoded) == 1)
+            {
+                Py_UCS4 ch = PyUnicode_READ_CHAR(decoded, 0);
+                if (ch <= 0xFFFF)
+                    code = static_cast<Py_UCS2>(ch);
+            }
+            else if (!decoded)
+            {
+                PyErr_Clear();
+            }
+            Py_XDECREF(decoded);
+            built[(lead - kGbLeadFirst) * kGbTrailCount + (trail - kGbTrailFirst)] = code;
+        }
+    }
+
+    const Py_UCS2 *expected = nullptr;
+    if (!cached.compare_exchange_strong(expected, built, std::memory_order_acq_rel))
+    {
+        delete[] built;
+        return expected;
+    }
+    return built;
+}
+
+// 含高位字节时的解码路径，四字节序列（第二字节为0x30-0x39）回退到Python编解码器
+inline PyObject *gb18030_decode_slow(const char *s, std::size_t n)
+{
+    const Py_UCS2 *table = gb18030_table();
+    Py_UCS2 stack_buf[1024];
+    std::vector<Py_UCS2> heap_buf;
+    Py_UCS2 *out = stack_buf;
+    if (n > sizeof(stack_buf) / sizeof(stack_buf[0]))
+    {
+        heap_buf.resize(n);
+        out = heap_buf.data();
+    }
+
+    std::size_t len = 0;
+    for (std::size_t i = 0; i < n;)
+    {
+        const unsigned char c = static_cast<unsigned char>(s[i]);
+        if (c < 0x80)
+        {
+            out[len++] = c;
+            ++i;
+            continue;
+        }
+        if (c >= kGbLeadFirst && c <= kGbLeadLast && i + 1 < n)
+        {
+            const unsigned char t = static_cast<unsigned char>(s[i + 1]);
+            if (t >= 0x30 && t <= 0x39)
+                return PyUnicode_Decode(s, static_cast<Py_ssize_t>(n), "gb18030", "replace");
+            if (t >= kGbTrailFirst && t <= kGbTrailLast && t != 0x7F)
+            {
+                out[len++] = table[(c - kGbLeadFirst) * kGbTrailCount + (t - kGbTrailFirst)];
+                i += 2;
+                continue;
+            }
+        }
+        out[len++] = kReplacementChar;
+        ++i;
+    }
+    return PyUnicode_FromKindAndData(PyUnicode_2BYTE_KIND, out, static_cast<Py_ssize_t>(len));
+}
+
+// 把GB18030编码的CTP字段转换为Python str，max_len为字段数组长度
+inline PyObject *gb18030_to_pystr(const char *s, std::size_t max_len)
+{
+    const std::size_t n = field_length(s, max_len);
+    if (is_ascii(s, n))
+    {
+        PyObject *result = PyUnicode_New(static_cast<Py_ssize_t>(n), 127);
+        if (result)
+            std::memcpy(PyUnicode_1BYTE_DATA(result), s, n);
+        return result;
+    }
+    return gb18030_decode_slow(s, n);
+}
+
+}  // namespace ctp_native
+
+#endif  // CTP_NATIVE_ENCODING_H
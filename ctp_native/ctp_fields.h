@@ -0,0 +1,353 @@
+// CTP结构体与Python对象之间的批量转换
+// ctp_codegen.py为每个结构体生成一张字段表（名称、偏移、长度、类型），
+// 这里的通用函数按字段表一次性构造整个tuple/dict，或从映射批量写入字段
+#ifndef CTP_NATIVE_FIELDS_H
+#define CTP_NATIVE_FIELDS_H
+
+#include <Python.h>
+
+#include <atomic>
+#include <climits>
+#include <cstddef>
+#include <cstring>
+
+#include "ctp_encoding.h"
+
+namespace ctp_native {
+
+enum FieldKind : unsigned char
+{
+    kFieldString,  // char[N]，GB18030编码的字符串
+    kFieldChar,    // char，单字符枚举值
+    kFieldShort,
+    kFieldInt,
+    kFieldDouble,
+};
+
+struct FieldInfo
+{
+    const char *name;
+    std::size_t offset;
+    std::size_t size;
+    FieldKind kind;
+};
+
+struct StructInfo
+{
+    const char *name;
+    std::size_t size;
+    const FieldInfo *fields;
+    std::size_t count;
+    std::atomic<PyObject **> keys;  // 驻留的字段名，首次构造dict时生成
+};
+
+inline PyObject **struct_keys(StructInfo &info)
+{
+    PyObject **keys = info.keys.load(std::memory_order_acquire);
+    if (keys)
+        return keys;
+    PyObject **built = new PyObject *[info.count]();
+    for (std::size_t i = 0; i < info.count; ++i)
+    {
+        built[i] = PyUnicode_InternFromString(info.fields[i].name);
+        if (!built[i])
+        {
+            for (std::size_t j = 0; j < i; ++j)
+                Py_DECREF(built[j]);
+            delete[] built;
+            return nullptr;
+        }
+    }
+    PyObject **expected = nullptr;
+    if (!info.keys.compare_exchange_strong(expected, built, std::memory_order_acq_rel))
+    {
+        for (std::size_t i = 0; i < info.count; ++i)
+            Py_DECREF(built[i]);
+        delete[] built;
+        return expected;
+    }
+    return built;
+}
+
+inline PyObject *field_to_py(const FieldInfo &field, const char *base)
+{
+    const char *p = base + field.offset;
+    switch (field.kind)
+    {
+    case kFieldString:
+        return gb18030_to_pystr(p, field.size);
+    case kFieldChar:
+        return PyUnicode_FromOrdinal(static_cast<unsigned char>(*p));
+    case kFieldShort:
+    {
+        short v;
+        std::memcpy(&v, p, sizeof(v));
+        return PyLong_FromLong(v);
+    }
+    case kFieldInt:
+    {
+        int v;
+        std::memcpy(&v, p, sizeof(v));
+        return PyLong_FromLong(v);
+    }
+    case kFieldDouble:
+    {
+        double v;
+        std::memcpy(&v, p, sizeof(v));
+        return PyFloat_FromDouble(v);
+    }
+    }
+    PyErr_SetString(PyExc_SystemError, "unknown CTP field kind");
+    return nullptr;
+}
+
+// 字符串字段：str按GB18030编码（ASCII直接复制），bytes原样写入，剩余部分补'\0'
+inline int set_string_field(const FieldInfo &field, char *dst, PyObject *value)
+{
+    PyObject *encoded = nullptr;
+    const char *data;
+    Py_ssize_t len;
+    if (PyUnicode_Check(value))
+    {
+        if (PyUnicode_IS_ASCII(value))
+        {
+            data = reinterpret_cast<const char *>(PyUnicode_1BYTE_DATA(value));
+            len = PyUnicode_GET_LENGTH(value);
+        }
+        else
+        {
+            encoded = PyUnicode_AsEncodedString(value, "gb18030", "strict");
+            if (!encoded)
+                return -1;
+            data = PyBytes_AS_STRING(encoded);
+            len = PyBytes_GET_SIZE(encoded);
+        }
+    }
+    else if (PyBytes_Check(value))
+    {
+        data = PyBytes_AS_STRING(value);
+        len = PyBytes_GET_SIZE(value);
+    }
+    else
+    {
+        PyErr_Format(PyExc_TypeError, "field %s expects str or bytes, got %s", field.name, Py_TYPE(value)->tp_name);
+        return -1;
+    }
+    if (static_cast<std::size_t>(len) > field.size)
+    {
+        Py_XDECREF(encoded);
+        PyErr_Format(PyExc_ValueError, "field %s holds at most %zu bytes, got %zd", field.name, field.size, len);
+        return -1;
+    }
+    std::memcpy(dst, data, len);
+    std::memset(dst + len, 0, field.size - len);
+    Py_XDECREF(encoded);
+    return 0;
+}
+
+inline int set_char_field(const FieldInfo &field, char *dst, PyObject *value)
+{
+    if (PyUnicode_Check(value) && PyUnicode_GET_LENGTH(value) <= 1)
+    {
+        Py_UCS4 ch = PyUnicode_GET_LENGTH(value) ? PyUnicode_READ_CHAR(value, 0) : 0;
+        if (ch < 0x80)
+        {
+            *dst = static_cast<char>(ch);
+            return 0;
+        }
+    }
+    else if (PyBytes_Check(value) && PyBytes_GET_SIZE(value) <= 1)
+    {
+        *dst = PyBytes_GET_SIZE(value) ? PyBytes_AS_STRING(value)[0] : '\0';
+        return 0;
+    }
+    PyErr_Format(PyExc_TypeError, "field %s expects a single ASCII character", field.name);
+    return -1;
+}
+
+inline int py_to_field(const FieldInfo &field, char *base, PyObject *value)
+{
+    char *p = base + field.offset;
+    switch (field.kind)
+    {
+    case kFieldString:
+        return set_string_field(field, p, value);
+    case kFieldChar:
+        return set_char_field(field, p, value);
+    case kFieldShort:
+    case kFieldInt:
+    {
+        long v = PyLong_AsLong(value);
+        if (v == -1 && PyErr_Occurred())
+            return -1;
+        const long lo = field.kind == kFieldShort ? SHRT_MIN : INT_MIN;
+        const long hi = field.kind == kFieldShort ? SHRT_MAX : INT_MAX;
+        if (v < lo || v > hi)
+        {
+            PyErr_Format(PyExc_OverflowError, "value out of range for field %s", field.name);
+            return -1;
+        }
+        if (field.kind == kFieldShort)
+        {
+            short s = static_cast<short>(v);
+            std::memcpy(p, &s, sizeof(s));
+        }
+        else
+        {
+            int i = static_cast<int>(v);
+            std::memcpy(p, &i, sizeof(i));
+        }
+        return 0;
+    }
+    case kFieldDouble:
+    {
+        double v = PyFloat_AsDouble(value);
+        if (v == -1.0 && PyErr_Occurred())
+            return -1;
+        std::memcpy(p, &v, sizeof(v));
+        return 0;
+    }
+    }
+    PyErr_SetString(PyExc_SystemError, "unknown CTP field kind");
+    return -1;
+}
+
+// 按字段顺序构造tuple
+inline PyObject *struct_to_tuple(StructInfo &info, const void *obj)
+{
+    const char *base = static_cast<const char *>(obj);
+    PyObject *result = PyTuple_New(static_cast<Py_ssize_t>(info.count));
+    if (!result)
+        return nullptr;
+    for (std::size_t i = 0; i < info.count; ++i)
+    {
+        PyObject *value = field_to_py(info.fields[i], base);
+        if (!value)
+        {
+            Py_DECREF(result);
+            return nullptr;
+        }
+        PyTuple_SET_ITEM(result, static_cast<Py_ssize_t>(i), value);
+    }
+    return result;
+}
+
+// 构造 {字段名: 值} 字典
+inline PyObject *struct_to_dict(StructInfo &info, const void *obj)
+{
+    PyObject **keys = struct_keys(info);
+    if (!keys)
+        return nullptr;
+    const char *base = static_cast<const char *>(obj);
+    PyObject *result = PyDict_New();
+    if (!result)
+        return nullptr;
+    for (std::size_t i = 0; i < info.count; ++i)
+    {
+        PyObject *value = field_to_py(info.fields[i], base);
+        if (!value || PyDict_SetItem(result, keys[i], value) < 0)
+        {
+            Py_XDECREF(value);
+            Py_DECREF(result);
+            return nullptr;
+        }
+        Py_DECREF(value);
+    }
+    return result;
+}
+
+// 从映射批量写入字段，出现未知字段名时抛出AttributeError且不修改结构体
+inline int struct_update(StructInfo &info, void *obj, PyObject *mapping)
+{
+    PyObject **keys = struct_keys(info);
+    if (!keys)
+        return -1;
+#ifdef Py_GIL_DISABLED
+    // 自由线程构建下调用方的dict可能被其他线程修改，借用引用不再安全，总是先复制一份私有的dict
+    PyObject *items = PyDict_New();
+#else
+    PyObject *items = PyDict_Check(mapping) ? (Py_INCREF(mapping), mapping) : PyDict_New();
+#endif
+    if (!items)
+        return -1;
+    if (items != mapping && PyDict_Update(items, mapping) < 0)
+    {
+        Py_DECREF(items);
+        return -1;
+    }
+
+    // 先写入副本，全部成功后再提交，避免出错时结构体只更新了一半
+    char stack_buf[4096];
+    char *scratch = info.size <= sizeof(stack_buf) ? stack_buf : new char[info.size];
+    std::memcpy(scratch, obj, info.size);
+
+    int status = 0;
+    Py_ssize_t matched = 0;
+    for (std::size_t i = 0; i < info.count && status == 0; ++i)
+    {
+        PyObject *value = PyDict_GetItemWithError(items, keys[i]);
+        if (!value)
+        {
+            if (PyErr_Occurred())
+                status = -1;
+            continue;
+        }
+        ++matched;
+        status = py_to_field(info.fields[i], scratch, value);
+    }
+    if (status == 0 && matched != PyDict_GET_SIZE(items))
+    {
+        PyObject *key, *value;
+        Py_ssize_t pos = 0;
+        while (PyDict_Next(items, &pos, &key, &value))
+        {
+            bool known = false;
+            for (std::size_t i = 0; i < info.count && !known; ++i)
+            {
+                int eq = PyObject_RichCompareBool(key, keys[i], Py_EQ);
+                if (eq < 0)
+                {
+                    status = -1;
+                    break;
+                }
+                known = eq == 1;
+            }
+            if (status == 0 && !known)
+            {
+                PyErr_Format(PyExc_AttributeError, "%s has no field %R", info.name, key);
+                status = -1;
+            }
+            if (status != 0)
+                break;
+        }
+    }
+    if (status == 0)
+        std::memcpy(obj, scratch, info.size);
+    if (scratch != stack_buf)
+        delete[] scratch;
+    Py_DECREF(items);
+    return status;
+}
+
+// 设置类属性。-builtin构建的类型的元类只允许修改已有的静态成员，这里直接调用type的tp_setattro，
+// 与在类体中定义一样会更新__buffer__等特殊方法对应的类型槽
+inline PyObject *set_class_attr(PyObject *cls, const char *name, PyObject *value)
+{
+    if (!PyType_Check(cls))
+    {
+        PyErr_SetString(PyExc_TypeError, "cls must be a type");
+        return nullptr;
+    }
+    PyObject *key = PyUnicode_InternFromString(name);
+    if (!key)
+        return nullptr;
+    int status = PyType_Type.tp_setattro(cls, key, value);
+    Py_DECREF(key);
+    if (status < 0)
+        return nullptr;
+    Py_RETURN_NONE;
+}
+
+}  // namespace ctp_native
+
+#endif  // CTP_NATIVE_FIELDS_H
@@ -0,0 +1,134 @@
+// 原生行情队列：在CTP回调线程中直接把深度行情复制进无锁环形缓冲区，不经过Python
+// 其余回调（连接、登录、订阅应答等）仍通过SWIG director转发给Python子类
+#ifndef CTP_NATIVE_MD_QUEUE_H
+#define CTP_NATIVE_MD_QUEUE_H
+
+#include "ThostFtdcMdApi.h"
+#include "ctp_sink.h"
+
+#ifndef SWIG
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <cstddef>
+#include <mutex>
+#include <vector>
+
+#include "ctp_notify.h"
+#include "ctp_ring.h"
+#endif
+
+class MdTickQueueSpi : public CThostFtdcMdSpi
+{
+public:
+    // capacity为0时不排队，行情只交给旁路（如SnapshotCache合并模式）
+    explicit MdTickQueueSpi(size_t capacity = 65536) : ring_(capacity), queued_(capacity > 0) {}
+    virtual ~MdTickQueueSpi() {}
+
+    // 在CTP线程中调用，队列满时丢弃最新行情并计数
+    virtual void OnRtnDepthMarketData(CThostFtdcDepthMarketDataField *pDepthMarketData)
+    {
+        if (!pDepthMarketData)
+            return;
+        received_.fetch_add(1, std::memory_order_relaxed);
+        if (has_sinks_.load(std::memory_order_acquire))
+        {
+            std::lock_guard<std::mutex> lock(sinks_mutex_);
+            for (TickSink *sink : sinks_)
+                sink->on_tick(*pDepthMarketData);
+        }
+        if (!queued_)
+            return;
+        if (!ring_.push(*pDepthMarketData))
+        {
+            dropped_.fetch_add(1, std::memory_order_relaxed);
+            return;
+        }
+        std::atomic_thread_fence(std::memory_order_seq_cst);
+        if (waiting_.load(std::memory_order_relaxed))
+        {
+            std::lock_guard<std::mutex> lock(wait_mutex_);
+            wait_cv_.notify_all();
+        }
+        notify_.fire();
+    }
+
+    // 设置批量到达通知：队列在arm_notify()之后收到第一条行情时，在CTP线程中调用一次callback
+    // 用于asyncio等事件循环，每批行情只唤醒一次；传入None取消通知
+    void set_notify(PyObject *callback) { notify_.set(callback); }
+
+    // 挂接行情旁路（录制等），在进入队列之前于CTP线程中调用；Python侧的add_sink负责保持对象存活
+    void add_sink(TickSink *sink)
+    {
+        if (!sink)
+            return;
+        std::lock_guard<std::mutex> lock(sinks_mutex_);
+        for (TickSink *s : sinks_)
+            if (s == sink)
+                return;
+        sinks_.push_back(sink);
+        has_sinks_.store(true, std::memory_order_release);
+    }
+
+    // 移除旁路，返回后CTP线程不会再访问该对象
+    void remove_sink(TickSink *sink)
+    {
+        std::lock_guard<std::mutex> lock(sinks_mutex_);
+        for (auto it = sinks_.begin(); it != sinks_.end(); ++it)
+        {
+            if (*it == sink)
+            {
+                sinks_.erase(it);
+                break;
+            }
+        }
+        has_sinks_.store(!sinks_.empty(), std::memory_order_release);
+    }
+
+    // 消费者读空队列后重新启用通知；调用后应再检查一次pending()，避免错过并发到达的行情
+    void arm_notify() { notify_.arm(); }
+
+    // 把最多 buffer_size / sizeof(CThostFtdcDepthMarketDataField) 条行情复制到buffer，返回条数
+    size_t drain_into(void *buffer, size_t buffer_size)
+    {
+        std::lock_guard<std::mutex> lock(drain_mutex_);
+        return ring_.pop_into(static_cast<CThostFtdcDepthMarketDataField *>(buffer),
+                              buffer_size / sizeof(CThostFtdcDepthMarketDataField));
+    }
+
+    // 阻塞等待直到队列非空或超时，返回是否有待读取的行情
+    bool wait(int timeout_ms)
+    {
+        std::unique_lock<std::mutex> lock(wait_mutex_);
+        waiting_.store(true, std::memory_order_relaxed);
+        std::atomic_thread_fence(std::memory_order_seq_cst);
+        bool ready = wait_cv_.wait_for(lock, std::chrono::milliseconds(timeout_ms),
+                                       [this] { return ring_.size() > 0; });
+        waiting_.store(false, std::memory_order_relaxed);
+        return ready;
+    }
+
+    size_t pending() const { return ring_.size(); }
+    size_t capacity() const { return queued_ ? ring_.capacity() : 0; }
+    unsigned long long received() const { return received_.load(std::memory_order_relaxed); }
+    unsigned long long dropped() const { return dropped_.load(std::memory_order_relaxed); }
+    static size_t record_size() { return sizeof(CThostFtdcDepthMarketDataField); }
+
+#ifndef SWIG
+private:
+    ctp_native::SpscRing<CThostFtdcDepthMarketDataField> ring_;
+    const bool queued_;
+    std::atomic<unsigned long long> received_{0};
+    std::atomic<unsigned long long> dropped_{0};
+    std::atomic<bool> waiting_{false};
+    ctp_native::NotifyCallback notify_;
+    std::atomic<bool> has_sinks_{false};
+    std::mutex sinks_mutex_;
+    std::vector<TickSink *> sinks_;
+    std::mutex drain_mutex_;  // drain_into在释放GIL后调用，多个Python线程读取时需要串行化
+    std::mutex wait_mutex_;
+    std::condition_variable wait_cv_;
+#endif
+};
+
+#endif  // CTP_NATIVE_MD_QUEUE_H
@@ -0,0 +1,179 @@
+// 可扩展的内存映射文件（Windows使用CreateFileMapping，Linux使用mmap）
+// 单一写者：扩容时重新映射，调用方负责保证扩容期间没有其他线程访问data()
+#ifndef CTP_NATIVE_MMAP_H
+#define CTP_NATIVE_MMAP_H
+
+#include <cstddef>
+#include <cstdint>
+#include <string>
+
+#ifdef _WIN32
+#ifndef NOMINMAX
+#define NOMINMAX
+#endif
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+namespace ctp_native {
+
+class MappedFile
+{
+public:
+    MappedFile() = default;
+    ~MappedFile() { close(); }
+    MappedFile(const MappedFile &) = delete;
+    MappedFile &operator=(const MappedFile &) = delete;
+
+    // 打开或创建文件并映射至少min_size字节，返回false时error()给出原因
+    bool open(const std::string &path, std::size_t min_size)
+    {
+        close();
+        path_ = path;
+#ifdef _WIN32
+        // 路径为UTF-8（来自Python str），转换为宽字符以支持中文目录
+        int wlen = MultiByteToWideChar(CP_UTF8, 0, path.c_str(), -1, nullptr, 0);
+        std::wstring wpath(wlen > 0 ? wlen : 1, L'\0');
+        MultiByteToWideChar(CP_UTF8, 0, path.c_str(), -1, &wpath[0], wlen);
+        file_ = CreateFileW(wpath.c_str(), GENERIC_READ | GENERIC_WRITE, FILE_SHARE_READ | FILE_SHARE_WRITE,
+                            nullptr, OPEN_ALWAYS, FILE_ATTRIBUTE_NORMAL, nullptr);
+        if (file_ == INVALID_HANDLE_VALUE)
+            return fail("CreateFile");
+        LARGE_INTEGER current;
+        if (!GetFileSizeEx(file_, &current))
+            return fail("GetFileSizeEx");
+        std::size_t size = static_cast<std::size_t>(current.QuadPart);
+#else
+        fd_ = ::open(path.c_str(), O_RDWR | O_CREAT, 0644);
+        if (fd_ < 0)
+            return fail("open");
+        struct stat st;
+        if (fstat(fd_, &st) != 0)
+            return fail("fstat");
+        std::size_t size = static_cast<std::size_t>(st.st_size);
+#endif
+        return map(size > min_size ? size : min_size);
+    }
+
+    // 扩大映射到至少new_size字节，已有内容保留
+    bool grow(std::size_t new_size)
+    {
+        if (new_size <= size_)
+            return true;
+        unmap();
+        return map(new_size);
+    }
+
+    // 把脏页写回磁盘
+    void flush()
+    {
+        if (!data_)
+            return;
+#ifdef _WIN32
+        FlushViewOfFile(data_, 0);
+#else
+        msync(data_, size_, MS_ASYNC);
+#endif
+    }
+
+    // 解除映射并把文件截断为final_size字节（0表示保持当前大小）
+    void close(std::size_t final_size = 0)
+    {
+        unmap();
+#ifdef _WIN32
+        if (file_ != INVALID_HANDLE_VALUE)
+        {
+            if (final_size)
+            {
+                LARGE_INTEGER pos;
+                pos.QuadPart = static_cast<LONGLONG>(final_size);
+                SetFilePointerEx(file_, pos, nullptr, FILE_BEGIN);
+                SetEndOfFile(file_);
+            }
+            CloseHandle(file_);
+            file_ = INVALID_HANDLE_VALUE;
+        }
+#else
+        if (fd_ >= 0)
+        {
+            if (final_size && ftruncate(fd_, static_cast<off_t>(final_size)) != 0)
+                error_ = "ftruncate failed: " + path_;
+            ::close(fd_);
+            fd_ = -1;
+        }
+#endif
+    }
+
+    char *data() const { return data_; }
+    std::size_t size() const { return size_; }
+    bool is_open() const { return data_ != nullptr; }
+    const std::string &path() const { return path_; }
+    const std::string &error() const { return error_; }
+
+private:
+    bool map(std::size_t size)
+    {
+#ifdef _WIN32
+        LARGE_INTEGER li;
+        li.QuadPart = static_cast<LONGLONG>(size);
+        mapping_ = CreateFileMappingA(file_, nullptr, PAGE_READWRITE, li.HighPart, li.LowPart, nullptr);
+        if (!mapping_)
+            return fail("CreateFileMapping");
+        data_ = static_cast<char *>(MapViewOfFile(mapping_, FILE_MAP_ALL_ACCESS, 0, 0, size));
+        if (!data_)
+            return fail("MapViewOfFile");
+#else
+        if (ftruncate(fd_, static_cast<off_t>(size)) != 0)
+            return fail("ftruncate");
+        void *p = mmap(nullptr, size, PROT_READ | PROT_WRITE, MAP_SHARED, fd_, 0);
+        if (p == MAP_FAILED)
+            return fail("mmap");
+        data_ = static_cast<char *>(p);
+#endif
+        size_ = size;
+        return true;
+    }
+
+    void unmap()
+    {
+#ifdef _WIN32
+        if (data_)
+            UnmapViewOfFile(data_);
+        if (mapping_)
+            CloseHandle(mapping_);
+        mapping_ = nullptr;
+#else
+        if (data_)
+            munmap(data_, size_);
+#endif
+        data_ = nullptr;
+        size_ = 0;
+    }
+
+    bool fail(const char *what)
+    {
+        error_ = std::string(what) + " failed: " + path_;
+        unmap();
+        close();
+        return false;
+    }
+
+#ifdef _WIN32
+    HANDLE file_ = INVALID_HANDLE_VALUE;
+    HANDLE mapping_ = nullptr;
+#else
+    int fd_ = -1;
+#endif
+    char *data_ = nullptr;
+    std::size_t size_ = 0;
+    std::string path_;
+    std::string error_;
+};
+
+}  // namespace ctp_native
+
+#endif  // CTP_NATIVE_MMAP_H
@@ -0,0 +1,85 @@
+// 批量到达通知：消费者arm()之后，生产者（CTP线程）第一次fire()时调用一次Python回调
+// 用于asyncio等事件循环，每批数据只唤醒一次
+#ifndef CTP_NATIVE_NOTIFY_H
+#define CTP_NATIVE_NOTIFY_H
+
+#include <Python.h>
+
+#include <atomic>
+#include <mutex>
+
+namespace ctp_native {
+
+class NotifyCallback
+{
+public:
+    NotifyCallback() = default;
+    NotifyCallback(const NotifyCallback &) = delete;
+    NotifyCallback &operator=(const NotifyCallback &) = delete;
+
+    // 析构可能发生在SWIG释放GIL之后，需自行获取GIL
+    ~NotifyCallback()
+    {
+        if (callback_ && Py_IsInitialized())
+        {
+            PyGILState_STATE gil = PyGILState_Ensure();
+            Py_CLEAR(callback_);
+            PyGILState_Release(gil);
+        }
+    }
+
+    // 调用方必须持有GIL（自由线程构建下为已附加线程状态）；传入None取消通知
+    void set(PyObject *callback)
+    {
+        callback = callback == Py_None ? nullptr : callback;
+        Py_XINCREF(callback);
+        PyObject *old;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            old = callback_;
+            callback_ = callback;
+        }
+        // 旧回调的析构可能执行任意Python代码，放到锁外
+        Py_XDECREF(old);
+    }
+
+    // 消费者读空数据后重新启用通知；调用后应再检查一次是否有数据，避免错过并发到达的数据
+    void arm() { armed_.store(true, std::memory_order_seq_cst); }
+
+    // 生产者在数据可见之后调用，未启用时只有一次原子读
+    void fire()
+    {
+        if (armed_.load(std::memory_order_relaxed) && armed_.exchange(false))
+            call();
+    }
+
+private:
+    void call()
+    {
+        PyGILState_STATE gil = PyGILState_Ensure();
+        PyObject *callback;
+        {
+            // 自由线程构建下set()可能在其他线程中同时替换回调，先在锁内取得引用
+            std::lock_guard<std::mutex> lock(mutex_);
+            callback = callback_;
+            Py_XINCREF(callback);
+        }
+        if (callback)
+        {
+            PyObject *result = PyObject_CallNoArgs(callback);
+            if (!result)
+                PyErr_WriteUnraisable(callback);
+            Py_XDECREF(result);
+            Py_DECREF(callback);
+        }
+        PyGILState_Release(gil);
+    }
+
+    std::atomic<bool> armed_{false};
+    std::mutex mutex_;
+    PyObject *callback_ = nullptr;  // 在mutex_内读写
+};
+
+}  // namespace ctp_native
+
+#endif  // CTP_NATIVE_NOTIFY_H
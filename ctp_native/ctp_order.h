@@ -0,0 +1,185 @@
+// 报单快速通道：按账户和合约预先填好固定字段的报单模板，下单时在栈上复制模板，
+// 只改写价格、数量、方向、开平、报单引用和请求编号后直接调用ReqOrderInsert，不创建任何Python对象
+// 报单引用由模板池统一递增分配，登录后以MaxOrderRef + 1初始化
+#ifndef CTP_NATIVE_ORDER_H
+#define CTP_NATIVE_ORDER_H
+
+#include "ThostFtdcTraderApi.h"
+
+#ifndef SWIG
+#include <atomic>
+#include <cstring>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#endif
+
+class OrderTemplatePool;
+
+// 报单模板，由OrderTemplatePool创建和持有，登记后不再修改，可在多个线程中同时使用
+class OrderTemplate
+{
+public:
+    const char *broker_id() const { return field_.BrokerID; }
+    const char *investor_id() const { return field_.InvestorID; }
+    const char *instrument_id() const { return field_.InstrumentID; }
+    const char *exchange_id() const { return field_.ExchangeID; }
+
+#ifndef SWIG
+    OrderTemplate(OrderTemplatePool *pool, const CThostFtdcInputOrderField &field) : pool_(pool), field_(field) {}
+    OrderTemplatePool *pool() const { return pool_; }
+    const CThostFtdcInputOrderField &field() const { return field_; }
+
+private:
+    OrderTemplatePool *pool_;
+    const CThostFtdcInputOrderField field_;
+#endif
+};
+
+class OrderTemplatePool
+{
+public:
+    OrderTemplatePool() {}
+
+    // 登录成功后设置会话，next_order_ref一般为CThostFtdcRspUserLoginField.MaxOrderRef + 1
+    void set_session(int front_id, int session_id, int next_order_ref)
+    {
+        front_id_.store(front_id, std::memory_order_relaxed);
+        session_id_.store(session_id, std::memory_order_relaxed);
+        order_ref_.store(next_order_ref, std::memory_order_relaxed);
+    }
+
+    // 登记模板：以投资者、合约和投机套保标志为键，已登记时返回原模板（固定字段不变）
+    OrderTemplate *add(const CThostFtdcInputOrderField &field)
+    {
+        std::string key = key_of(field.InvestorID, field.InstrumentID, field.CombHedgeFlag[0]);
+        std::lock_guard<std::mutex> lock(mutex_);
+        auto it = templates_.find(key);
+        if (it != templates_.end())
+            return it->second.get();
+        OrderTemplate *tmpl = new OrderTemplate(this, field);
+        templates_.emplace(std::move(key), std::unique_ptr<OrderTemplate>(tmpl));
+        return tmpl;
+    }
+
+    // 查找已登记的模板，不存在时返回None
+    OrderTemplate *find(const char *investor_id, const char *instrument_id, char hedge_flag = THOST_FTDC_HF_Speculation)
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        auto it = templates_.find(key_of(investor_id, instrument_id, hedge_flag));
+        return it == templates_.end() ? nullptr : it->second.get();
+    }
+
+    size_t size()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return templates_.size();
+    }
+    int front_id() const { return front_id_.load(std::memory_order_relaxed); }
+    int session_id() const { return session_id_.load(std::memory_order_relaxed); }
+    // 下一个将要分配的报单引用
+    int next_order_ref() const { return order_ref_.load(std::memory_order_relaxed); }
+
+#ifndef SWIG
+    int take_order_ref() { return order_ref_.fetch_add(1, std::memory_order_relaxed); }
+
+private:
+    static std::string key_of(const char *investor_id, const char *instrument_id, char hedge_flag)
+    {
+        std::string key(investor_id, strnlen(investor_id, sizeof(TThostFtdcInvestorIDType)));
+        key += '\0';
+        key.append(instrument_id, strnlen(instrument_id, sizeof(TThostFtdcInstrumentIDType)));
+        key += '\0';
+        key += hedge_flag;
+        return key;
+    }
+
+    std::mutex mutex_;
+    std::unordered_map<std::string, std::unique_ptr<OrderTemplate>> templates_;
+    std::atomic<int> order_ref_{1};
+    std::atomic<int> front_id_{0};
+    std::atomic<int> session_id_{0};
+#endif
+};
+
+#ifndef SWIG
+namespace ctp_native {
+
+// 非负整数写成十进制字符串，dst至少12字节（TThostFtdcOrderRefType为char[13]）
+inline void format_order_ref(char *dst, size_t size, int value)
+{
+    char digits[16];
+    int n = 0;
+    unsigned int v = value < 0 ? 0u : static_cast<unsigned int>(value);
+    do
+    {
+        digits[n++] = static_cast<char>('0' + v % 10);
+        v /= 10;
+    } while (v && n < 15);
+    size_t i = 0;
+    while (n > 0 && i + 1 < size)
+        dst[i++] = digits[--n];
+    dst[i] = '\0';
+}
+
+inline void copy_field(char *dst, const char *src, size_t size)
+{
+    std::strncpy(dst, src, size - 1);
+    dst[size - 1] = '\0';
+}
+
+// 按模板报单：成功时返回本次分配的报单引用（正数），失败时返回ReqOrderInsert的返回码（负数）
+inline int insert_order(CThostFtdcTraderApi *api, const OrderTemplate *tmpl, double price, int volume, char direction,
+                        char offset, int request_id)
+{
+    CThostFtdcInputOrderField order;
+    std::memcpy(&order, &tmpl->field(), sizeof(order));
+    const int order_ref = tmpl->pool()->take_order_ref();
+    format_order_ref(order.OrderRef, sizeof(order.OrderRef), order_ref);
+    order.LimitPrice = price;
+    order.VolumeTotalOriginal = volume;
+    order.Direction = direction;
+    order.CombOffsetFlag[0] = offset;
+    order.RequestID = request_id;
+    const int ret = api->ReqOrderInsert(&order, request_id);
+    return ret == 0 ? order_ref : ret;
+}
+
+// 按模板撤单：order_sys_id非空时按交易所报单编号撤单，否则按本会话的报单引用撤单
+// front_id/session_id为0时使用模板池记录的当前会话；返回ReqOrderAction的返回码
+inline int cancel_order(CThostFtdcTraderApi *api, const OrderTemplate *tmpl, int order_ref, const char *order_sys_id,
+                        int front_id, int session_id, int request_id)
+{
+    const CThostFtdcInputOrderField &src = tmpl->field();
+    OrderTemplatePool *pool = tmpl->pool();
+    CThostFtdcInputOrderActionField action;
+    std::memset(&action, 0, sizeof(action));
+    copy_field(action.BrokerID, src.BrokerID, sizeof(action.BrokerID));
+    copy_field(action.InvestorID, src.InvestorID, sizeof(action.InvestorID));
+    copy_field(action.UserID, src.UserID, sizeof(action.UserID));
+    copy_field(action.InstrumentID, src.InstrumentID, sizeof(action.InstrumentID));
+    copy_field(action.ExchangeID, src.ExchangeID, sizeof(action.ExchangeID));
+    copy_field(action.InvestUnitID, src.InvestUnitID, sizeof(action.InvestUnitID));
+    copy_field(action.MacAddress, src.MacAddress, sizeof(action.MacAddress));
+    copy_field(action.IPAddress, src.IPAddress, sizeof(action.IPAddress));
+    action.ActionFlag = THOST_FTDC_AF_Delete;
+    action.OrderActionRef = pool->take_order_ref();
+    action.RequestID = request_id;
+    if (order_sys_id && order_sys_id[0])
+    {
+        copy_field(action.OrderSysID, order_sys_id, sizeof(action.OrderSysID));
+    }
+    else
+    {
+        format_order_ref(action.OrderRef, sizeof(action.OrderRef), order_ref);
+        action.FrontID = front_id ? front_id : pool->front_id();
+        action.SessionID = session_id ? session_id : pool->session_id();
+    }
+    return api->ReqOrderAction(&action, request_id);
+}
+
+}  // namespace ctp_native
+#endif
+
+#endif  // CTP_NATIVE_ORDER_H
@@ -0,0 +1,291 @@
+// 回调延迟探针：以CTP_PROBES编译时，director回调在CTP线程进入时、取得GIL后、Python方法返回后各取一次单调时钟
+// 按回调名称累计三组直方图：GIL等待、Python处理、总耗时。分桶为对数线性（每个2的幂区间16个子桶，相对误差约6%）
+// 未定义CTP_PROBES时director代码与SWIG生成的完全相同，查询接口返回空结果
+// 本文件须在SWIG运行时代码之后包含（.i文件的%{ %}块），以替换SWIG_PYTHON_THREAD_BEGIN_BLOCK
+#ifndef CTP_NATIVE_PROBE_H
+#define CTP_NATIVE_PROBE_H
+
+#include <cstddef>
+#include <string>
+
+#ifndef SWIG
+#include <Python.h>
+
+#include <atomic>
+#include <chrono>
+#include <cstdint>
+#include <memory>
+#include <mutex>
+
+#if defined(_MSC_VER)
+#include <intrin.h>
+#endif
+
+namespace ctp_native {
+
+constexpr int kProbeSubBits = 4;
+constexpr int kProbeSub = 1 << kProbeSubBits;
+constexpr int kProbeMaxExp = 40;  // 2^40纳秒（约18分钟）以上计入最后一个桶
+constexpr int kProbeBuckets = kProbeSub + (kProbeMaxExp - kProbeSubBits + 1) * kProbeSub;
+constexpr int kProbeMaxSlots = 256;
+
+enum ProbeKind
+{
+    kProbeGil = 0,
+    kProbeHandler = 1,
+    kProbeTotal = 2,
+    kProbeKinds = 3
+};
+
+// 与Python的time.perf_counter_ns()同一时钟
+inline std::uint64_t probe_now()
+{
+    return static_cast<std::uint64_t>(
+        std::chrono::duration_cast<std::chrono::nanoseconds>(std::chrono::steady_clock::now().time_since_epoch())
+            .count());
+}
+
+inline int probe_bucket(std::uint64_t v)
+{
+    if (v < static_cast<std::uint64_t>(kProbeSub))
+        return static_cast<int>(v);
+#if defined(_MSC_VER)
+    unsigned long msb;
+    _BitScanReverse64(&msb, v);
+    const int e = static_cast<int>(msb);
+#else
+    const int e = 63 - __builtin_clzll(v);
+#endif
+    if (e > kProbeMaxExp)
+        return kProbeBuckets - 1;
+    return kProbeSub + (e - kProbeSubBits) * kProbeSub +
+           static_cast<int>((v >> (e - kProbeSubBits)) & (kProbeSub - 1));
+}
+
+inline std::uint64_t probe_bucket_lower(int bucket)
+{
+    if (bucket < kProbeSub)
+        return static_cast<std::uint64_t>(bucket);
+    const int e = (bucket - kProbeSub) / kProbeSub + kProbeSubBits;
+    const std::uint64_t m = static_cast<std::uint64_t>((bucket - kProbeSub) % kProbeSub);
+    return (kProbeSub + m) << (e - kProbeSubBits);
+}
+
+struct ProbeHistogram
+{
+    std::atomic<std::uint64_t> counts[kProbeBuckets] = {};
+    std::atomic<std::uint64_t> max{0};
+
+    void record(std::uint64_t v)
+    {
+        counts[probe_bucket(v)].fetch_add(1, std::memory_order_relaxed);
+        std::uint64_t m = max.load(std::memory_order_relaxed);
+        while (v > m && !max.compare_exchange_weak(m, v, std::memory_order_relaxed))
+        {
+        }
+    }
+
+    void reset()
+    {
+        for (auto &c : counts)
+            c.store(0, std::memory_order_relaxed);
+        max.store(0, std::memory_order_relaxed);
+    }
+};
+
+struct ProbeSlot
+{
+    std::string name;
+    ProbeHistogram histograms[kProbeKinds];
+};
+
+// 按回调名称登记的直方图，每个扩展模块一份；槽位只增不减
+class ProbeRegistry
+{
+public:
+    static ProbeRegistry &instance()
+    {
+        static ProbeRegistry registry;
+        return registry;
+    }
+
+    // 只为On*回调分配槽位，其余返回-1
+    int slot(const char *name)
+    {
+        if (!name || name[0] != 'O' || name[1] != 'n')
+            return -1;
+        std::lock_guard<std::mutex> lock(mutex_);
+        const int n = count_.load(std::memory_order_relaxed);
+        for (int i = 0; i < n; ++i)
+            if (slots_[i]->name == name)
+                return i;
+        if (n >= kProbeMaxSlots)
+            return -1;
+        slots_[n].reset(new ProbeSlot());
+        slots_[n]->name = name;
+        count_.store(n + 1, std::memory_order_release);
+        return n;
+    }
+
+    int count() const { return count_.load(std::memory_order_acquire); }
+    ProbeSlot *get(int i) const { return i >= 0 && i < count() ? slots_[i].get() : nullptr; }
+
+private:
+    std::mutex mutex_;
+    std::atomic<int> count_{0};
+    std::unique_ptr<ProbeSlot> slots_[kProbeMaxSlots];
+};
+
+// 当前线程正在执行的回调的进入时刻，回调之外为0
+inline std::uint64_t &probe_current_receive()
+{
+    static thread_local std::uint64_t receive_ns = 0;
+    return receive_ns;
+}
+
+// 替代SWIG_Python_Thread_Block：在获取GIL前后及释放GIL前计时
+class ProbeBlock
+{
+public:
+    explicit ProbeBlock(int slot)
+        : slot_(slot), enter_(slot >= 0 ? probe_now() : 0), state_(PyGILState_Ensure()),
+          acquired_(slot >= 0 ? probe_now() : 0)
+    {
+        if (slot_ >= 0)
+        {
+            previous_ = probe_current_receive();
+            probe_current_receive() = enter_;
+        }
+    }
+    ~ProbeBlock() { end(); }
+    ProbeBlock(const ProbeBlock &) = delete;
+    ProbeBlock &operator=(const ProbeBlock &) = delete;
+
+    void end()
+    {
+        if (!active_)
+            return;
+        active_ = false;
+        if (ProbeSlot *slot = ProbeRegistry::instance().get(slot_))
+        {
+            const std::uint64_t done = probe_now();
+            slot->histograms[kProbeGil].record(acquired_ - enter_);
+            slot->histograms[kProbeHandler].record(done - acquired_);
+            slot->histograms[kProbeTotal].record(done - enter_);
+            probe_current_receive() = previous_;
+        }
+        PyGILState_Release(state_);
+    }
+
+    std::uint64_t enter_ns() const { return enter_; }
+
+private:
+    const int slot_;
+    const std::uint64_t enter_;
+    const PyGILState_STATE state_;
+    const std::uint64_t acquired_;
+    std::uint64_t previous_ = 0;
+    bool active_ = true;
+};
+
+// 把进入时刻写入回调参数对象的recv_ns属性，参数为None时跳过
+inline void probe_attach(PyObject *obj, std::uint64_t enter_ns)
+{
+    if (!obj || obj == Py_None)
+        return;
+    PyObject *value = PyLong_FromUnsignedLongLong(enter_ns);
+    if (!value || PyObject_SetAttrString(obj, "recv_ns", value) < 0)
+        PyErr_Clear();
+    Py_XDECREF(value);
+}
+
+}  // namespace ctp_native
+#endif  // SWIG
+
+// 是否以CTP_PROBES编译
+inline bool probe_enabled()
+{
+#ifdef CTP_PROBES
+    return true;
+#else
+    return false;
+#endif
+}
+
+// 已登记的回调数
+inline int probe_count()
+{
+    return ctp_native::ProbeRegistry::instance().count();
+}
+
+inline std::string probe_name(int slot)
+{
+    ctp_native::ProbeSlot *s = ctp_native::ProbeRegistry::instance().get(slot);
+    return s ? s->name : std::string();
+}
+
+inline int probe_bucket_count()
+{
+    return ctp_native::kProbeBuckets;
+}
+
+// 把各桶的下界（纳秒，uint64）写入buffer，返回桶数
+inline size_t probe_bounds_into(void *buffer, size_t buffer_size)
+{
+    auto *out = static_cast<unsigned long long *>(buffer);
+    size_t n = buffer_size / sizeof(unsigned long long);
+    if (n > static_cast<size_t>(ctp_native::kProbeBuckets))
+        n = ctp_native::kProbeBuckets;
+    for (size_t i = 0; i < n; ++i)
+        out[i] = ctp_native::probe_bucket_lower(static_cast<int>(i));
+    return n;
+}
+
+// 把回调slot的kind直方图（0 GIL等待，1 Python处理，2 总耗时）的计数（uint64）写入buffer，返回桶数
+inline size_t probe_histogram_into(int slot, int kind, void *buffer, size_t buffer_size)
+{
+    ctp_native::ProbeSlot *s = ctp_native::ProbeRegistry::instance().get(slot);
+    if (!s || kind < 0 || kind >= ctp_native::kProbeKinds)
+        return 0;
+    auto *out = static_cast<unsigned long long *>(buffer);
+    size_t n = buffer_size / sizeof(unsigned long long);
+    if (n > static_cast<size_t>(ctp_native::kProbeBuckets))
+        n = ctp_native::kProbeBuckets;
+    for (size_t i = 0; i < n; ++i)
+        out[i] = s->histograms[kind].counts[i].load(std::memory_order_relaxed);
+    return n;
+}
+
+inline unsigned long long probe_max(int slot, int kind)
+{
+    ctp_native::ProbeSlot *s = ctp_native::ProbeRegistry::instance().get(slot);
+    if (!s || kind < 0 || kind >= ctp_native::kProbeKinds)
+        return 0;
+    return s->histograms[kind].max.load(std::memory_order_relaxed);
+}
+
+// 清空全部直方图，已登记的回调保留
+inline void probe_reset()
+{
+    auto &registry = ctp_native::ProbeRegistry::instance();
+    for (int i = 0; i < registry.count(); ++i)
+        for (auto &h : registry.get(i)->histograms)
+            h.reset();
+}
+
+// 当前线程正在执行的回调在CTP线程中的进入时刻（纳秒），回调之外为0
+inline unsigned long long probe_receive_ns()
+{
+    return ctp_native::probe_current_receive();
+}
+
+#if defined(CTP_PROBES) && !defined(SWIG) && defined(SWIG_PYTHON_THREAD_BEGIN_BLOCK)
+#undef SWIG_PYTHON_THREAD_BEGIN_BLOCK
+#undef SWIG_PYTHON_THREAD_END_BLOCK
+#define SWIG_PYTHON_THREAD_BEGIN_BLOCK                                                                \
+    static const int _ctp_probe_slot = ctp_native::ProbeRegistry::instance().slot(__func__);          \
+    ctp_native::ProbeBlock _swig_thread_block(_ctp_probe_slot)
+#define SWIG_PYTHON_THREAD_END_BLOCK _swig_thread_block.end()
+#endif
+
+#endif  // CTP_NATIVE_PROBE_H
@@ -0,0 +1,368 @@
+// 深度行情录制：在CTP回调线程中把行情追加到按交易日分段的内存映射文件
+// 每个交易日三个文件：
+//   <day>.ticks  定长行情记录（完整CThostFtdcDepthMarketDataField或精简的PackedTick）
+//   <day>.idx    与记录一一对应的索引项（合约序号、日内毫秒），读取时只扫描索引即可定位某个合约
+//   <day>.sym    合约序号到合约代码的映射，定长条目
+// 所有文件以64字节SegmentHeader开头，先写记录再更新count，读者以count为准
+#ifndef CTP_NATIVE_RECORDER_H
+#define CTP_NATIVE_RECORDER_H
+
+#include "ThostFtdcUserApiStruct.h"
+#include "ctp_sink.h"
+
+#ifndef SWIG
+#include <atomic>
+#include <cstdint>
+#include <cstring>
+#include <initializer_list>
+#include <mutex>
+#include <stdexcept>
+#include <string>
+#include <unordered_map>
+
+#include "ctp_mmap.h"
+
+namespace ctp_native {
+
+constexpr std::uint32_t kSegmentVersion = 1;
+
+struct SegmentHeader
+{
+    char magic[8];
+    std::uint32_t version;
+    std::uint32_t format;       // 仅.ticks文件使用：记录格式
+    std::uint32_t record_size;
+    std::uint32_t header_size;
+    std::uint64_t count;        // 已提交的记录数
+    char trading_day[9];
+    char reserved[23];
+};
+static_assert(sizeof(SegmentHeader) == 64, "SegmentHeader必须为64字节");
+
+struct IndexEntry
+{
+    std::int32_t instrument;  // 合约序号
+    std::int32_t time_ms;     // UpdateTime + UpdateMillisec，日内毫秒
+};
+
+// 精简记录：常用的数值字段，合约代码由索引中的序号表示
+struct PackedTick
+{
+    std::int32_t instrument;
+    std::int32_t action_day;  // YYYYMMDD
+    std::int32_t time_ms;
+    std::int32_t volume;
+    double last_price;
+    double turnover;
+    double open_interest;
+    double average_price;
+    double bid_price1;
+    double ask_price1;
+    std::int32_t bid_volume1;
+    std::int32_t ask_volume1;
+};
+
+inline std::int32_t parse_day(const char *s)
+{
+    std::int32_t v = 0;
+    for (int i = 0; i < 8 && s[i] >= '0' && s[i] <= '9'; ++i)
+        v = v * 10 + (s[i] - '0');
+    return v;
+}
+
+// "HH:MM:SS" + 毫秒 -> 日内毫秒，格式不正确时返回-1
+inline std::int32_t parse_time_ms(const char *s, int millisec)
+{
+    for (int i : {0, 1, 3, 4, 6, 7})
+        if (s[i] < '0' || s[i] > '9')
+            return -1;
+    const int h = (s[0] - '0') * 10 + (s[1] - '0');
+    const int m = (s[3] - '0') * 10 + (s[4] - '0');
+    const int sec = (s[6] - '0') * 10 + (s[7] - '0');
+    return ((h * 60 + m) * 60 + sec) * 1000 + millisec;
+}
+
+// 一个追加写入的分段文件
+class SegmentFile
+{
+public:
+    bool open(const std::string &path, const char *magic, std::uint32_t format, std::uint32_t record_size,
+              const char *day, std::size_t reserve_records)
+    {
+        record_size_ = record_size;
+        if (!file_.open(path, sizeof(SegmentHeader) + reserve_records * record_size))
+        {
+            error_ = file_.error();
+            return false;
+        }
+        SegmentHeader *h = header();
+        if (h->magic[0] == '\0')
+        {
+            std::memset(h, 0, sizeof(SegmentHeader));
+            std::memcpy(h->magic, magic, 8);
+            h->version = kSegmentVersion;
+            h->format = format;
+            h->record_size = record_size;
+            h->header_size = sizeof(SegmentHeader);
+            std::strncpy(h->trading_day, day, sizeof(h->trading_day) - 1);
+        }
+        else if (std::memcmp(h->magic, magic, 8) != 0 || h->version != kSegmentVersion ||
+                 h->format != format || h->record_size != record_size)
+        {
+            error_ = "existing segment has a different layout: " + path;
+            file_.close();
+            return false;
+        }
+        count_ = h->count;
+        return true;
+    }
+
+    // 返回下一条记录的写入位置，空间不足时扩容为两倍
+    char *reserve()
+    {
+        const std::size_t need = sizeof(SegmentHeader) + (count_ + 1) * record_size_;
+        if (need > file_.size() && !file_.grow(need > 2 * file_.size() ? need : 2 * file_.size()))
+        {
+            error_ = file_.error();
+            return nullptr;
+        }
+        return file_.data() + sizeof(SegmentHeader) + count_ * record_size_;
+    }
+
+    void commit_local() { ++count_; }
+
+    // 丢弃n之后的记录（重启时对齐各文件的count）
+    void rewind(std::uint64_t n)
+    {
+        if (n < count_)
+        {
+            count_ = n;
+            publish();
+        }
+    }
+
+    // 记录内容写完后再公开count
+    void publish()
+    {
+        std::atomic_thread_fence(std::memory_order_release);
+        reinterpret_cast<volatile std::uint64_t &>(header()->count) = count_;
+    }
+
+    const char *record(std::uint64_t i) const { return file_.data() + sizeof(SegmentHeader) + i * record_size_; }
+    std::uint64_t count() const { return count_; }
+    void flush() { file_.flush(); }
+    void close() { file_.close(sizeof(SegmentHeader) + count_ * record_size_); }
+    bool is_open() const { return file_.is_open(); }
+    const std::string &error() const { return error_; }
+
+private:
+    SegmentHeader *header() { return reinterpret_cast<SegmentHeader *>(file_.data()); }
+
+    MappedFile file_;
+    std::uint32_t record_size_ = 0;
+    std::uint64_t count_ = 0;
+    std::string error_;
+};
+
+}  // namespace ctp_native
+#endif
+
+class TickRecorder : public TickSink
+{
+public:
+    enum
+    {
+        kFormatFull = 0,    // 完整CThostFtdcDepthMarketDataField
+        kFormatPacked = 1,  // PackedTick
+    };
+
+    // directory必须已存在；reserve_records为每个分段文件的初始容量，写满后自动扩容
+    explicit TickRecorder(const char *directory, int format = kFormatFull, size_t reserve_records = 1 << 20)
+        : directory_(directory ? directory : ""), format_(format), reserve_records_(reserve_records)
+    {
+        if (format != kFormatFull && format != kFormatPacked)
+            throw std::invalid_argument("format must be TickRecorder.kFormatFull or TickRecorder.kFormatPacked");
+        if (!directory_.empty() && directory_.back() != '/' && directory_.back() != '\\')
+            directory_ += '/';
+    }
+    virtual ~TickRecorder() { close(); }
+
+#ifndef SWIG
+    void on_tick(const CThostFtdcDepthMarketDataField &tick) override { append(&tick); }
+#endif
+
+    // 追加一条行情；CTP回调线程通过on_tick调用，也可以在Python中手动调用
+    void append(const CThostFtdcDepthMarketDataField *tick)
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (closed_ || !tick)
+            return;
+        const char *day = tick->TradingDay[0] ? tick->TradingDay : tick->ActionDay;
+        if (std::strncmp(day, day_, sizeof(day_)) != 0 && !open_segment(day))
+        {
+            failed_.fetch_add(1, std::memory_order_relaxed);
+            return;
+        }
+        if (!write(*tick))
+            failed_.fetch_add(1, std::memory_order_relaxed);
+    }
+
+    // 把已写入的数据刷新到磁盘（异步）
+    void flush()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        data_.flush();
+        index_.flush();
+        symbols_.flush();
+    }
+
+    // 关闭当前分段并把文件截断到实际大小，之后的行情不再记录
+    void close()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        close_segment();
+        closed_ = true;
+    }
+
+    // 当前分段的记录数
+    unsigned long long count()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return data_.count();
+    }
+    // 因打开或扩容文件失败而丢失的行情数
+    unsigned long long failed() const { return failed_.load(std::memory_order_relaxed); }
+    // 当前分段的交易日，尚未收到行情时为空
+    std::string trading_day()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return day_;
+    }
+    std::string last_error()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return error_;
+    }
+    int format() const { return format_; }
+    static size_t record_size(int format)
+    {
+        return format == kFormatPacked ? sizeof(ctp_native::PackedTick) : sizeof(CThostFtdcDepthMarketDataField);
+    }
+    static size_t symbol_size() { return sizeof(TThostFtdcInstrumentIDType); }
+
+#ifndef SWIG
+private:
+    bool open_segment(const char *day)
+    {
+        close_segment();
+        std::strncpy(day_, day, sizeof(day_) - 1);
+        day_[sizeof(day_) - 1] = '\0';
+        const std::string base = directory_ + day_;
+        const std::uint32_t rsize = static_cast<std::uint32_t>(record_size(format_));
+        if (!data_.open(base + ".ticks", "CTPTICK", format_, rsize, day_, reserve_records_) ||
+            !index_.open(base + ".idx", "CTPTIDX", 0, sizeof(ctp_native::IndexEntry), day_, reserve_records_) ||
+            !symbols_.open(base + ".sym", "CTPTSYM", 0, static_cast<std::uint32_t>(symbol_size()), day_, 1024))
+        {
+            error_ = !data_.error().empty() ? data_.error() : !index_.error().empty() ? index_.error() : symbols_.error();
+            close_segment();
+            return false;
+        }
+        // 中途重启时继续追加：写入中断的记录以较小的count为准丢弃，并恢复合约序号
+        const std::uint64_t n = data_.count() < index_.count() ? data_.count() : index_.count();
+        data_.rewind(n);
+        index_.rewind(n);
+        for (std::uint64_t i = 0; i < symbols_.count(); ++i)
+        {
+            const char *sym = symbols_.record(i);
+            slots_.emplace(std::string(sym, strnlen(sym, symbol_size())), static_cast<std::int32_t>(i));
+        }
+        return true;
+    }
+
+    void close_segment()
+    {
+        if (data_.is_open())
+        {
+            data_.close();
+            index_.close();
+            symbols_.close();
+        }
+        slots_.clear();
+        day_[0] = '\0';
+    }
+
+    std::int32_t slot_for(const char *instrument)
+    {
+        std::string key(instrument, strnlen(instrument, symbol_size()));
+        auto it = slots_.find(key);
+        if (it != slots_.end())
+            return it->second;
+        char *dst = symbols_.reserve();
+        if (!dst)
+            return -1;
+        std::memset(dst, 0, symbol_size());
+        std::memcpy(dst, key.data(), key.size());
+        const std::int32_t slot = static_cast<std::int32_t>(symbols_.count());
+        symbols_.commit_local();
+        symbols_.publish();
+        slots_.emplace(std::move(key), slot);
+        return slot;
+    }
+
+    bool write(const CThostFtdcDepthMarketDataField &tick)
+    {
+        const std::int32_t slot = slot_for(tick.InstrumentID);
+        char *rec = slot < 0 ? nullptr : data_.reserve();
+        char *idx = rec ? index_.reserve() : nullptr;
+        if (!idx)
+        {
+            error_ = !data_.error().empty() ? data_.error() : !index_.error().empty() ? index_.error() : symbols_.error();
+            return false;
+        }
+        const std::int32_t time_ms = ctp_native::parse_time_ms(tick.UpdateTime, tick.UpdateMillisec);
+        if (format_ == kFormatFull)
+        {
+            std::memcpy(rec, &tick, sizeof(tick));
+        }
+        else
+        {
+            ctp_native::PackedTick packed;
+            packed.instrument = slot;
+            packed.action_day = ctp_native::parse_day(tick.ActionDay);
+            packed.time_ms = time_ms;
+            packed.volume = tick.Volume;
+            packed.last_price = tick.LastPrice;
+            packed.turnover = tick.Turnover;
+            packed.open_interest = tick.OpenInterest;
+            packed.average_price = tick.AveragePrice;
+            packed.bid_price1 = tick.BidPrice1;
+            packed.ask_price1 = tick.AskPrice1;
+            packed.bid_volume1 = tick.BidVolume1;
+            packed.ask_volume1 = tick.AskVolume1;
+            std::memcpy(rec, &packed, sizeof(packed));
+        }
+        ctp_native::IndexEntry entry{slot, time_ms};
+        std::memcpy(idx, &entry, sizeof(entry));
+        data_.commit_local();
+        index_.commit_local();
+        index_.publish();
+        data_.publish();
+        return true;
+    }
+
+    std::string directory_;
+    int format_;
+    size_t reserve_records_;
+    std::mutex mutex_;
+    bool closed_ = false;
+    char day_[9] = {0};
+    ctp_native::SegmentFile data_;
+    ctp_native::SegmentFile index_;
+    ctp_native::SegmentFile symbols_;
+    std::unordered_map<std::string, std::int32_t> slots_;
+    std::atomic<unsigned long long> failed_{0};
+    std::string error_;
+#endif
+};
+
+#endif  // CTP_NATIVE_RECORDER_H
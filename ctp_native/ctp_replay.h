@@ -0,0 +1,27 @@
+// 行情回放：把连续存放的CThostFtdcDepthMarketDataField记录逐条交给Spi
+// 复用同一个结构体，回调收到的指针与实盘一样只在回调期间有效
+#ifndef CTP_NATIVE_REPLAY_H
+#define CTP_NATIVE_REPLAY_H
+
+#include "ThostFtdcMdApi.h"
+
+#ifndef SWIG
+#include <cstddef>
+#include <cstring>
+#endif
+
+// 依次回调buffer中的每条行情，返回回调次数；Python子类中抛出的异常会中断回放并向上传递
+inline size_t replay_ticks(CThostFtdcMdSpi *spi, const void *buffer, size_t buffer_size)
+{
+    const size_t n = buffer_size / sizeof(CThostFtdcDepthMarketDataField);
+    const char *src = static_cast<const char *>(buffer);
+    CThostFtdcDepthMarketDataField field;
+    for (size_t i = 0; i < n; ++i)
+    {
+        std::memcpy(&field, src + i * sizeof(field), sizeof(field));
+        spi->OnRtnDepthMarketData(&field);
+    }
+    return n;
+}
+
+#endif  // CTP_NATIVE_REPLAY_H
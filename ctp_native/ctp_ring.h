@@ -0,0 +1,89 @@
+// 单生产者/单消费者无锁环形缓冲区
+// 生产者为CTP回调线程，消费者为Python侧的批量读取，元素必须是可平凡复制的CTP结构体
+#ifndef CTP_NATIVE_RING_H
+#define CTP_NATIVE_RING_H
+
+#include <atomic>
+#include <cstddef>
+#include <cstring>
+#include <type_traits>
+#include <vector>
+
+namespace ctp_native {
+
+constexpr std::size_t kCacheLineSize = 64;
+
+inline std::size_t round_up_pow2(std::size_t n)
+{
+    std::size_t v = 1;
+    while (v < n)
+        v <<= 1;
+    return v;
+}
+
+template <typename T>
+class SpscRing
+{
+    static_assert(std::is_trivially_copyable<T>::value, "SpscRing元素必须可平凡复制");
+
+public:
+    explicit SpscRing(std::size_t capacity)
+        : mask_(round_up_pow2(capacity < 2 ? 2 : capacity) - 1), slots_(mask_ + 1)
+    {
+    }
+
+    // 仅生产者线程调用，队列已满时返回false
+    bool push(const T &value)
+    {
+        const std::size_t head = head_.load(std::memory_order_relaxed);
+        if (head - tail_cache_ > mask_)
+        {
+            tail_cache_ = tail_.load(std::memory_order_acquire);
+            if (head - tail_cache_ > mask_)
+                return false;
+        }
+        std::memcpy(&slots_[head & mask_], &value, sizeof(T));
+        head_.store(head + 1, std::memory_order_release);
+        return true;
+    }
+
+    // 仅消费者线程调用，最多取出max_n个元素到out，返回实际数量
+    std::size_t pop_into(T *out, std::size_t max_n)
+    {
+        const std::size_t tail = tail_.load(std::memory_order_relaxed);
+        const std::size_t head = head_.load(std::memory_order_acquire);
+        std::size_t n = head - tail;
+        if (n > max_n)
+            n = max_n;
+        if (n == 0)
+            return 0;
+        const std::size_t start = tail & mask_;
+        const std::size_t first = (n < slots_.size() - start) ? n : slots_.size() - start;
+        std::memcpy(out, &slots_[start], first * sizeof(T));
+        if (n > first)
+            std::memcpy(out + first, &slots_[0], (n - first) * sizeof(T));
+        tail_.store(tail + n, std::memory_order_release);
+        return n;
+    }
+
+    std::size_t size() const
+    {
+        return head_.load(std::memory_order_acquire) - tail_.load(std::memory_order_acquire);
+    }
+
+    std::size_t capacity() const
+    {
+        return slots_.size();
+    }
+
+private:
+    alignas(kCacheLineSize) std::atomic<std::size_t> head_{0};
+    std::size_t tail_cache_ = 0;  // 生产者缓存的tail，减少跨核读取
+    alignas(kCacheLineSize) std::atomic<std::size_t> tail_{0};
+    alignas(kCacheLineSize) const std::size_t mask_;
+    std::vector<T> slots_;
+};
+
+}  // namespace ctp_native
+
+#endif  // CTP_NATIVE_RING_H
@@ -0,0 +1,234 @@
+// 按合约分片的行情队列：CTP回调线程按InstrumentID的哈希把行情放入固定分片，每个分片由一个工作线程批量读取，
+// 因此同一合约的行情始终按到达顺序处理，不同合约可以并行（自由线程构建下真正并行）
+// 分片满时的处理方式：丢弃最新、丢弃最旧，或阻塞CTP线程等待（有超时，超时后丢弃最新，避免前置断线）
+#ifndef CTP_NATIVE_SHARD_H
+#define CTP_NATIVE_SHARD_H
+
+#include "ThostFtdcUserApiStruct.h"
+#include "ctp_sink.h"
+
+#ifndef SWIG
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <cstdint>
+#include <cstring>
+#include <memory>
+#include <mutex>
+#include <stdexcept>
+#include <vector>
+
+namespace ctp_native {
+
+// 单个分片：互斥锁保护的定长环形缓冲区，生产者与消费者各一个，锁几乎不会竞争
+struct TickShard
+{
+    explicit TickShard(std::size_t capacity) : slots(capacity) {}
+
+    std::mutex mutex;
+    std::condition_variable not_empty;
+    std::condition_variable not_full;
+    std::vector<CThostFtdcDepthMarketDataField> slots;
+    std::size_t head = 0;  // 最旧元素的位置
+    std::size_t size = 0;
+    int waiting = 0;       // 等待行情的消费者数
+    bool woken = false;    // wake()之后wait()立即返回一次
+    unsigned long long pushed = 0;
+    unsigned long long dropped = 0;
+    unsigned long long blocked = 0;
+    std::size_t max_depth = 0;
+};
+
+// FNV-1a，Python侧按同样的哈希分配回报，保证同一合约落在同一工作线程
+inline std::uint32_t instrument_hash(const char *instrument)
+{
+    std::uint32_t h = 2166136261u;
+    for (std::size_t i = 0; i < sizeof(TThostFtdcInstrumentIDType) && instrument[i]; ++i)
+    {
+        h ^= static_cast<unsigned char>(instrument[i]);
+        h *= 16777619u;
+    }
+    return h;
+}
+
+}  // namespace ctp_native
+#endif
+
+class ShardedTickQueue : public TickSink
+{
+public:
+    enum
+    {
+        kDropNewest = 0,  // 分片满时丢弃新到的行情
+        kDropOldest = 1,  // 分片满时覆盖最旧的行情
+        kBlock = 2,       // 分片满时CTP线程等待，最多block_timeout_ms毫秒
+    };
+
+    explicit ShardedTickQueue(int shards = 4, size_t capacity = 16384, int policy = kDropNewest,
+                              int block_timeout_ms = 100)
+        : policy_(policy), block_timeout_ms_(block_timeout_ms)
+    {
+        if (shards <= 0 || capacity == 0)
+            throw std::invalid_argument("shards and capacity must be positive");
+        if (policy != kDropNewest && policy != kDropOldest && policy != kBlock)
+            throw std::invalid_argument("policy must be kDropNewest, kDropOldest or kBlock");
+        for (int i = 0; i < shards; ++i)
+            shards_.emplace_back(new ctp_native::TickShard(capacity));
+    }
+    virtual ~ShardedTickQueue() {}
+
+#ifndef SWIG
+    void on_tick(const CThostFtdcDepthMarketDataField &tick) override { push(&tick); }
+#endif
+
+    // 放入一条行情；CTP回调线程通过on_tick调用，也可以在Python中手动调用
+    void push(const CThostFtdcDepthMarketDataField *tick)
+    {
+        if (!tick)
+            return;
+        ctp_native::TickShard &s = *shards_[shard_index(tick->InstrumentID)];
+        std::unique_lock<std::mutex> lock(s.mutex);
+        const std::size_t capacity = s.slots.size();
+        if (s.size == capacity && !closed_)
+        {
+            if (policy_ == kBlock)
+            {
+                ++s.blocked;
+                s.not_full.wait_for(lock, std::chrono::milliseconds(block_timeout_ms_),
+                                    [&] { return s.size < capacity || closed_; });
+            }
+            else if (policy_ == kDropOldest)
+            {
+                s.head = (s.head + 1) % capacity;
+                --s.size;
+                ++s.dropped;
+            }
+        }
+        if (s.size == capacity || closed_)
+        {
+            ++s.dropped;
+            return;
+        }
+        std::memcpy(&s.slots[(s.head + s.size) % capacity], tick, sizeof(*tick));
+        ++s.size;
+        ++s.pushed;
+        if (s.size > s.max_depth)
+            s.max_depth = s.size;
+        if (s.waiting)
+            s.not_empty.notify_one();
+    }
+
+    // 取出分片中最多 buffer_size / sizeof(CThostFtdcDepthMarketDataField) 条行情，返回条数
+    size_t drain_into(int shard, void *buffer, size_t buffer_size)
+    {
+        ctp_native::TickShard *s = get(shard);
+        if (!s)
+            return 0;
+        auto *out = static_cast<CThostFtdcDepthMarketDataField *>(buffer);
+        std::lock_guard<std::mutex> lock(s->mutex);
+        std::size_t n = buffer_size / sizeof(CThostFtdcDepthMarketDataField);
+        if (n > s->size)
+            n = s->size;
+        const std::size_t capacity = s->slots.size();
+        const std::size_t first = n < capacity - s->head ? n : capacity - s->head;
+        std::memcpy(out, &s->slots[s->head], first * sizeof(CThostFtdcDepthMarketDataField));
+        if (n > first)
+            std::memcpy(out + first, &s->slots[0], (n - first) * sizeof(CThostFtdcDepthMarketDataField));
+        s->head = (s->head + n) % capacity;
+        s->size -= n;
+        if (n && policy_ == kBlock)
+            s->not_full.notify_one();
+        return n;
+    }
+
+    // 阻塞等待直到分片非空、被wake()唤醒、队列关闭或超时，返回分片中的行情数
+    size_t wait(int shard, int timeout_ms)
+    {
+        ctp_native::TickShard *s = get(shard);
+        if (!s)
+            return 0;
+        std::unique_lock<std::mutex> lock(s->mutex);
+        ++s->waiting;
+        s->not_empty.wait_for(lock, std::chrono::milliseconds(timeout_ms),
+                              [&] { return s->size > 0 || s->woken || closed_; });
+        --s->waiting;
+        s->woken = false;
+        return s->size;
+    }
+
+    // 唤醒在wait()中等待的消费者（如有其他待处理的事件）
+    void wake(int shard)
+    {
+        ctp_native::TickShard *s = get(shard);
+        if (!s)
+            return;
+        std::lock_guard<std::mutex> lock(s->mutex);
+        s->woken = true;
+        s->not_empty.notify_all();
+    }
+
+    // 关闭队列：之后的行情全部丢弃，等待中的生产者和消费者立即返回
+    void close()
+    {
+        closed_.store(true);
+        for (auto &s : shards_)
+        {
+            std::lock_guard<std::mutex> lock(s->mutex);
+            s->not_empty.notify_all();
+            s->not_full.notify_all();
+        }
+    }
+
+    // 合约所在的分片
+    int shard_of(const char *instrument_id) const { return shard_index(instrument_id); }
+    int shards() const { return static_cast<int>(shards_.size()); }
+    int policy() const { return policy_; }
+    size_t capacity() const { return shards_[0]->slots.size(); }
+
+    // 分片统计：当前深度、最大深度、放入数、丢弃数、生产者因分片满而等待的次数
+    size_t depth(int shard) { return stat(shard, &ctp_native::TickShard::size); }
+    size_t max_depth(int shard) { return stat(shard, &ctp_native::TickShard::max_depth); }
+    unsigned long long pushed(int shard) { return stat(shard, &ctp_native::TickShard::pushed); }
+    unsigned long long dropped(int shard) { return stat(shard, &ctp_native::TickShard::dropped); }
+    unsigned long long blocked(int shard) { return stat(shard, &ctp_native::TickShard::blocked); }
+    // 把各分片的最大深度重置为当前深度
+    void reset_max_depth()
+    {
+        for (auto &s : shards_)
+        {
+            std::lock_guard<std::mutex> lock(s->mutex);
+            s->max_depth = s->size;
+        }
+    }
+    static size_t record_size() { return sizeof(CThostFtdcDepthMarketDataField); }
+
+#ifndef SWIG
+private:
+    int shard_index(const char *instrument_id) const
+    {
+        return static_cast<int>(ctp_native::instrument_hash(instrument_id) % shards_.size());
+    }
+
+    ctp_native::TickShard *get(int shard) const
+    {
+        return shard >= 0 && shard < static_cast<int>(shards_.size()) ? shards_[shard].get() : nullptr;
+    }
+
+    template <typename T>
+    T stat(int shard, T ctp_native::TickShard::*member)
+    {
+        ctp_native::TickShard *s = get(shard);
+        if (!s)
+            return 0;
+        std::lock_guard<std::mutex> lock(s->mutex);
+        return s->*member;
+    }
+
+    const int policy_;
+    const int block_timeout_ms_;
+    std::atomic<bool> closed_{false};
+    std::vector<std::unique_ptr<ctp_native::TickShard>> shards_;
+#endif
+};
+
+#endif  // CTP_NATIVE_SHARD_H
@@ -0,0 +1,20 @@
+// 行情旁路接口：MdTickQueueSpi在CTP回调线程中把每条深度行情交给已挂接的TickSink
+// 实现必须线程安全且不能调用Python，耗时会直接计入行情回调延迟
+#ifndef CTP_NATIVE_SINK_H
+#define CTP_NATIVE_SINK_H
+
+#include "ThostFtdcUserApiStruct.h"
+
+class TickSink
+{
+public:
+    virtual ~TickSink() {}
+#ifndef SWIG
+    virtual void on_tick(const CThostFtdcDepthMarketDataField &tick) = 0;
+#endif
+
+protected:
+    TickSink() {}
+};
+
+#endif  // CTP_NATIVE_SINK_H
@@ -0,0 +1,184 @@
+// 最新行情快照：每个合约一个槽位，在CTP回调线程中原地覆盖，内存占用与行情速率无关
+// 消费者跟不上时只丢弃中间状态（合并计数），读到的总是最新快照
+//   get_snapshot(ids)  按合约代码读取当前快照
+//   drain()            读取自上次drain以来有变化的合约（脏集合），按首次变化的顺序
+#ifndef CTP_NATIVE_SNAPSHOT_H
+#define CTP_NATIVE_SNAPSHOT_H
+
+#include "ThostFtdcUserApiStruct.h"
+#include "ctp_sink.h"
+
+#ifndef SWIG
+#include <cstring>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+#include "ctp_notify.h"
+#endif
+
+class SnapshotCache : public TickSink
+{
+public:
+    // max_instruments：槽位上限，超出后新合约的行情计入overflow()并丢弃
+    explicit SnapshotCache(size_t max_instruments = 4096) : capacity_(max_instruments) {}
+    virtual ~SnapshotCache() {}
+
+#ifndef SWIG
+    void on_tick(const CThostFtdcDepthMarketDataField &tick) override
+    {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            ++received_;
+            const int slot = slot_for(tick.InstrumentID);
+            if (slot < 0)
+            {
+                ++overflow_;
+                return;
+            }
+            std::memcpy(&snapshots_[slot], &tick, sizeof(tick));
+            if (dirty_flags_[slot])
+            {
+                ++conflated_;
+            }
+            else
+            {
+                dirty_flags_[slot] = 1;
+                dirty_.push_back(slot);
+            }
+        }
+        notify_.fire();
+    }
+#endif
+
+    // 按合约代码复制快照到buffer，尚无行情的合约对应全零记录，返回写入条数
+    size_t snapshot_into(void *buffer, size_t buffer_size, char *ppInstrumentID[], int nCount)
+    {
+        auto *out = static_cast<CThostFtdcDepthMarketDataField *>(buffer);
+        size_t n = buffer_size / sizeof(CThostFtdcDepthMarketDataField);
+        if (n > static_cast<size_t>(nCount))
+            n = static_cast<size_t>(nCount);
+        std::lock_guard<std::mutex> lock(mutex_);
+        for (size_t i = 0; i < n; ++i)
+        {
+            auto it = slots_.find(key_of(ppInstrumentID[i]));
+            if (it != slots_.end())
+                std::memcpy(&out[i], &snapshots_[it->second], sizeof(CThostFtdcDepthMarketDataField));
+            else
+                std::memset(&out[i], 0, sizeof(CThostFtdcDepthMarketDataField));
+        }
+        return n;
+    }
+
+    // 按首次出现的顺序复制全部合约的快照，返回条数
+    size_t snapshot_all_into(void *buffer, size_t buffer_size)
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        size_t n = buffer_size / sizeof(CThostFtdcDepthMarketDataField);
+        if (n > snapshots_.size())
+            n = snapshots_.size();
+        if (n)
+            std::memcpy(buffer, snapshots_.data(), n * sizeof(CThostFtdcDepthMarketDataField));
+        return n;
+    }
+
+    // 取出脏集合中的快照并清除其标记，buffer不足时其余合约留到下次，返回条数
+    size_t drain_into(void *buffer, size_t buffer_size)
+    {
+        auto *out = static_cast<CThostFtdcDepthMarketDataField *>(buffer);
+        std::lock_guard<std::mutex> lock(mutex_);
+        size_t n = buffer_size / sizeof(CThostFtdcDepthMarketDataField);
+        if (n > dirty_.size())
+            n = dirty_.size();
+        for (size_t i = 0; i < n; ++i)
+        {
+            const int slot = dirty_[i];
+            std::memcpy(&out[i], &snapshots_[slot], sizeof(CThostFtdcDepthMarketDataField));
+            dirty_flags_[slot] = 0;
+        }
+        dirty_.erase(dirty_.begin(), dirty_.begin() + static_cast<std::ptrdiff_t>(n));
+        return n;
+    }
+
+    // 设置脏集合通知：arm_notify()之后第一个合约变脏时，在CTP线程中调用一次callback；传入None取消通知
+    void set_notify(PyObject *callback) { notify_.set(callback); }
+    // 读空脏集合后重新启用通知；调用后应再检查一次dirty_count()，避免错过并发到达的行情
+    void arm_notify() { notify_.arm(); }
+
+    // 清空全部快照
+    void clear()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        slots_.clear();
+        snapshots_.clear();
+        dirty_flags_.clear();
+        dirty_.clear();
+    }
+
+    size_t dirty_count()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return dirty_.size();
+    }
+    // 已有快照的合约数
+    size_t size()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return snapshots_.size();
+    }
+    size_t capacity() const { return capacity_; }
+    unsigned long long received()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return received_;
+    }
+    // 被后续行情覆盖、未被读取过的快照数
+    unsigned long long conflated()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return conflated_;
+    }
+    // 因槽位已满而丢弃的行情数
+    unsigned long long overflow()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return overflow_;
+    }
+
+#ifndef SWIG
+private:
+    static std::string key_of(const char *instrument)
+    {
+        return std::string(instrument, strnlen(instrument, sizeof(TThostFtdcInstrumentIDType)));
+    }
+
+    int slot_for(const char *instrument)
+    {
+        std::string key = key_of(instrument);
+        auto it = slots_.find(key);
+        if (it != slots_.end())
+            return it->second;
+        if (snapshots_.size() >= capacity_)
+            return -1;
+        const int slot = static_cast<int>(snapshots_.size());
+        snapshots_.emplace_back();
+        dirty_flags_.push_back(0);
+        slots_.emplace(std::move(key), slot);
+        return slot;
+    }
+
+    size_t capacity_;
+    std::mutex mutex_;
+    std::unordered_map<std::string, int> slots_;
+    std::vector<CThostFtdcDepthMarketDataField> snapshots_;
+    std::vector<char> dirty_flags_;
+    std::vector<int> dirty_;  // 按首次变化顺序排列的脏槽位
+    unsigned long long received_ = 0;
+    unsigned long long conflated_ = 0;
+    unsigned long long overflow_ = 0;
+    ctp_native::NotifyCallback notify_;
+#endif
+};
+
+#endif  // CTP_NATIVE_SNAPSHOT_H
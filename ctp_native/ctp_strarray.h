@@ -0,0 +1,197 @@
+// Python合约代码集合到CTP char *[] 参数的转换
+// 支持任意str/bytes序列或可迭代对象、单个str/bytes以及NumPy定长字节数组（dtype为'S'）；
+// ASCII的str和bytes直接借用对象内部缓冲区，元素由调用期间持有的元组快照保持存活；
+// 每个线程复用同一组缓冲区，调用结束后只释放引用
+#ifndef CTP_NATIVE_STRARRAY_H
+#define CTP_NATIVE_STRARRAY_H
+
+#include <Python.h>
+
+#include <cstddef>
+#include <cstring>
+#include <utility>
+#include <vector>
+
+namespace ctp_native {
+
+class InstrumentIdArray
+{
+public:
+    // 当前线程复用的实例：SWIG在调用期间释放GIL，但同一线程不会重入
+    static InstrumentIdArray &local()
+    {
+        static thread_local InstrumentIdArray instance;
+        return instance;
+    }
+
+    // 解析Python对象，成功返回0，失败返回-1并设置Python异常
+    int assign(PyObject *obj)
+    {
+        release();
+        if (PyUnicode_Check(obj) || PyBytes_Check(obj))
+            return assign_items(&obj, 1);
+
+        if (PyObject_CheckBuffer(obj) && assign_fixed_width(obj) != 0)
+            return PyErr_Occurred() ? -1 : 0;
+
+        // 先复制为元组，由元组持有元素引用：调用期间会释放GIL，其他线程修改或清空原列表也不会释放借用的字符串
+        keepalive_ = PyList_Check(obj) ? PyList_AsTuple(obj) : PySequence_Tuple(obj);
+        if (!keepalive_ && PyErr_ExceptionMatches(PyExc_TypeError))
+        {
+            PyErr_Clear();
+            PyErr_SetString(PyExc_TypeError, "instrument ids must be str, bytes or an iterable of them");
+        }
+        if (!keepalive_)
+            return -1;
+        return assign_items(PySequence_Fast_ITEMS(keepalive_), PySequence_Fast_GET_SIZE(keepalive_));
+    }
+
+    // 释放对Python对象的引用，保留已分配的缓冲区供下次使用；调用方必须持有GIL
+    void release()
+    {
+        Py_CLEAR(keepalive_);
+        ptrs_.clear();
+        storage_.clear();
+        offsets_.clear();
+    }
+
+    char **data() { return ptrs_.data(); }
+    int size() const { return ptrs_.empty() ? 0 : static_cast<int>(ptrs_.size()) - 1; }
+
+private:
+    InstrumentIdArray() = default;
+
+    int assign_items(PyObject **items, Py_ssize_t n)
+    {
+        ptrs_.assign(static_cast<std::size_t>(n) + 1, nullptr);
+        for (Py_ssize_t i = 0; i < n; ++i)
+        {
+            PyObject *item = items[i];
+            if (PyUnicode_Check(item))
+            {
+                if (PyUnicode_IS_ASCII(item))
+                {
+                    ptrs_[i] = reinterpret_cast<char *>(PyUnicode_1BYTE_DATA(item));
+                    continue;
+                }
+                PyObject *encoded = PyUnicode_AsEncodedString(item, "gb18030", "strict");
+                if (!encoded)
+                    return fail();
+                append_copy(i, PyBytes_AS_STRING(encoded), PyBytes_GET_SIZE(encoded));
+                Py_DECREF(encoded);
+            }
+            else if (PyBytes_Check(item))
+            {
+                ptrs_[i] = PyBytes_AS_STRING(item);
+            }
+            else
+            {
+                PyErr_Format(PyExc_TypeError, "instrument id at index %zd must be str or bytes, got %s",
+                             i, Py_TYPE(item)->tp_name);
+                return fail();
+            }
+        }
+        fix_copied_pointers();
+        return 0;
+    }
+
+    // NumPy 'S'数组：元素定长且不保证以'\0'结尾，逐个复制到连续缓冲区并补'\0'
+    // 返回1表示已处理（可能设置了异常），0表示不是定长字节数组
+    int assign_fixed_width(PyObject *obj)
+    {
+        Py_buffer view;
+        if (PyObject_GetBuffer(obj, &view, PyBUF_FORMAT | PyBUF_C_CONTIGUOUS) != 0)
+        {
+            PyErr_Clear();
+            return 0;
+        }
+        const char *format = view.format ? view.format : "B";
+        const std::size_t flen = std::strlen(format);
+        if (view.ndim != 1 || flen == 0 || format[flen - 1] != 's')
+        {
+            PyBuffer_Release(&view);
+            return 0;
+        }
+        const std::size_t itemsize = static_cast<std::size_t>(view.itemsize);
+        const Py_ssize_t n = view.shape[0];
+        ptrs_.assign(static_cast<std::size_t>(n) + 1, nullptr);
+        storage_.reserve(static_cast<std::size_t>(n) * (itemsize + 1));
+        offsets_.reserve(static_cast<std::size_t>(n));
+        const char *base = static_cast<const char *>(view.buf);
+        for (Py_ssize_t i = 0; i < n; ++i)
+        {
+            const char *item = base + i * itemsize;
+            const void *end = std::memchr(item, 0, itemsize);
+            append_copy(i, item, end ? static_cast<const char *>(end) - item : itemsize);
+        }
+        fix_copied_pointers();
+        PyBuffer_Release(&view);
+        return 1;
+    }
+
+    void append_copy(Py_ssize_t index, const char *src, std::size_t len)
+    {
+        offsets_.emplace_back(static_cast<std::size_t>(index), storage_.size());
+        storage_.insert(storage_.end(), src, src + len);
+        storage_.push_back('\0');
+    }
+
+    // storage_扩容会移动数据，全部复制完成后再回填指针
+    void fix_copied_pointers()
+    {
+        for (const auto &entry : offsets_)
+            ptrs_[entry.first] = storage_.data() + entry.second;
+    }
+
+    int fail()
+    {
+        release();
+        return -1;
+    }
+
+    PyObject *keepalive_ = nullptr;
+    std::vector<char *> ptrs_;
+    std::vector<char> storage_;
+    std::vector<std::pair<std::size_t, std::size_t>> offsets_;
+};
+
+// 按chunk_size把合约列表拆成多次调用（如SubscribeMarketData），调用期间释放GIL，返回每批的返回码列表
+template <typename Api>
+PyObject *call_in_chunks(Api *api, int (Api::*fn)(char *[], int), PyObject *ids, int chunk_size)
+{
+    if (chunk_size <= 0)
+    {
+        PyErr_SetString(PyExc_ValueError, "chunk_size must be positive");
+        return nullptr;
+    }
+    InstrumentIdArray &array = InstrumentIdArray::local();
+    if (array.assign(ids) < 0)
+        return nullptr;
+
+    const int total = array.size();
+    const int chunks = (total + chunk_size - 1) / chunk_size;
+    PyObject *codes = PyList_New(chunks);
+    if (!codes)
+    {
+        array.release();
+        return nullptr;
+    }
+    std::vector<int> results(static_cast<std::size_t>(chunks));
+    Py_BEGIN_ALLOW_THREADS
+    for (int i = 0; i < chunks; ++i)
+    {
+        const int offset = i * chunk_size;
+        const int count = total - offset < chunk_size ? total - offset : chunk_size;
+        results[i] = (api->*fn)(array.data() + offset, count);
+    }
+    Py_END_ALLOW_THREADS
+    array.release();
+
+    for (int i = 0; i < chunks; ++i)
+        PyList_SET_ITEM(codes, i, PyLong_FromLong(results[i]));
+    return codes;
+}
+
+}  // namespace ctp_native
+
+#endif  // CTP_NATIVE_STRARRAY_H
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+SWIG包装代码拆分脚本
+把SWIG生成的单个 *_wrap.cxx 拆成多个翻译单元并行编译，链接进同一个扩展模块：
+  <stem>_common.h      运行时、类型表、%{ %}中的代码和director类声明，每个单元都包含
+  <stem>_part<N>.cxx   按大小均分的包装函数（结构体字段访问器占绝大部分，API类在最后）
+  <stem>_constants.cxx ThostFtdcUserApiDataType.h等中的常量注册
+  <stem>_init.cxx      director方法、方法表、类型转换表和模块初始化
+包装函数改为模块内可见（GCC/Clang下为hidden）并在公共头文件中声明；
+SWIG运行时函数改为inline、文件级静态数据改为C++17 inline变量，多个单元共享同一份类型表和运行时状态。
+"""
+
+import argparse
+import re
+from pathlib import Path
+
+FUNCTION_RE = re.compile(rb'^SWIGINTERN (.*\))\s*\{\s*$')
+STATIC_DATA_RE = re.compile(rb'^static (?=[^(]*[=;\[])(?![^=]*\()')
+CONSTANT_RE = re.compile(rb'^  SWIG_Python_SetConstant\(d, .*\);\s*$')
+# director的类静态互斥量改为inline静态成员，不再需要类外定义
+GUARD_DECLARATION_RE = re.compile(rb'^(#define SWIG_GUARD_DECLARATION\(_mutex\)) static ')
+GUARD_DEFINITION_RE = re.compile(rb'^(#define SWIG_GUARD_DEFINITION\(_cls, _mutex\)).*$')
+
+LINKAGE = b'SWIG_SPLIT_LINKAGE'
+CONSTANTS_FUNCTION = b'SWIG_split_constants'
+
+PROLOGUE = b"""/* \xe7\x94\xb1ctp_split.py\xe6\xa0\xb9\xe6\x8d\xae%(source)s\xe7\x94\x9f\xe6\x88\x90\xef\xbc\x8c\xe4\xb8\x8d\xe8\xa6\x81\xe6\x89\x8b\xe5\x8a\xa8\xe4\xbf\xae\xe6\x94\xb9 */
+#ifndef %(guard)s
+#define %(guard)s
+
+#define SWIGRUNTIME inline
+#define SWIGRUNTIMEINLINE inline
+#if defined(__GNUC__) && !defined(_WIN32)
+#  define SWIG_SPLIT_LINKAGE __attribute__((visibility("hidden")))
+#else
+#  define SWIG_SPLIT_LINKAGE
+#endif
+
+"""
+
+EXTERN_C_BEGIN = b'#ifdef __cplusplus\nextern "C" {\n#endif\n'
+EXTERN_C_END = b'#ifdef __cplusplus\n}\n#endif\n'
+
+
+def find_line(lines, pattern, start=0):
+    for i in range(start, len(lines)):
+        if re.match(pattern, lines[i]):
+            return i
+    return -1
+
+
+def split_wrapper(path, parts):
+    """拆分包装代码，返回 {文件名: 内容}"""
+    lines = Path(path).read_bytes().splitlines(keepends=True)
+    stem = Path(path).stem
+    if b'#define SWIGPYTHON_BUILTIN\n' in lines:
+        raise ValueError(f"{path} 由-builtin模式生成，类型对象与包装函数交织，不支持拆分")
+
+    # 包装函数区：第一个_wrap_函数所在的extern "C"块开始，到方法表为止
+    first = find_line(lines, rb'SWIGINTERN PyObject \*_wrap_')
+    table = find_line(lines, rb'static PyMethodDef SwigMethods\[\] = \{', max(first, 0))
+    if first < 0 or table < 0:
+        raise ValueError(f"{path} 不是预期格式的SWIG包装代码")
+    body_start = first
+    while body_start > 0 and not lines[body_start - 1].startswith(b'extern "C" {'):
+        body_start -= 1
+    open_block = body_start - 2  # '#ifdef __cplusplus' / 'extern "C" {' / '#endif'
+    if body_start == 0 or not lines[open_block].startswith(b'#ifdef __cplusplus'):
+        raise ValueError(f"{path} 中未找到包装函数区的extern \"C\"块")
+    body_start += 1
+    directors = find_line(lines, rb' \* C\+\+ director class methods')
+    directors = directors - 1 if 0 <= directors < open_block else open_block
+
+    # 文件级静态数据改为inline变量，多个单元共享
+    prologue = []
+    for line in lines[:directors]:
+        line = STATIC_DATA_RE.sub(b'inline ', line)
+        line = GUARD_DECLARATION_RE.sub(rb'\1 static inline ', line)
+        prologue.append(GUARD_DEFINITION_RE.sub(rb'\1', line))
+
+    # 按函数拆分包装函数区，改为模块内可见并收集声明
+    items, declarations = [], []
+    for line in lines[body_start:table]:
+        match = FUNCTION_RE.match(line)
+        if match:
+            declarations.append(LINKAGE + b' ' + match.group(1) + b';\n')
+            items.append([LINKAGE + line[len(b'SWIGINTERN'):]])
+        elif line.startswith(b'SWIGINTERN'):
+            raise ValueError(f"无法识别的包装函数定义: {line.decode('latin-1').strip()}")
+        elif items:
+            items[-1].append(line)
+        elif line.strip():
+            raise ValueError(f"包装函数区开头有无法归属的内容: {line.decode('latin-1').strip()}")
+
+    # 常量注册移到单独的单元
+    tail = lines[table:]
+    constants = [line for line in tail if CONSTANT_RE.match(line)]
+    if constants:
+        first_constant = tail.index(constants[0])
+        tail = [line for line in tail if not CONSTANT_RE.match(line)]
+        tail.insert(first_constant, b'  ' + CONSTANTS_FUNCTION + b'(d);\n')
+        declarations.append(LINKAGE + b' void ' + CONSTANTS_FUNCTION + b'(PyObject *d);\n')
+
+    guard = re.sub(rb'\W', b'_', stem.encode()).upper() + b'_COMMON_H'
+    header = PROLOGUE % {b'source': Path(path).name.encode(), b'guard': guard}
+    header += b''.join(prologue)
+    director_header = Path(path).with_suffix('.h')
+    if directors < open_block and director_header.exists():
+        header += b'#include "' + director_header.name.encode() + b'"\n'
+    header += b'\n' + EXTERN_C_BEGIN + b''.join(declarations) + EXTERN_C_END + b'\n#endif\n'
+
+    include = b'#include "' + f'{stem}_common.h'.encode() + b'"\n\n'
+    outputs = {f'{stem}_common.h': header}
+
+    # 按字节数均分包装函数
+    total = sum(len(line) for item in items for line in item)
+    chunks = [[] for _ in range(parts)]
+    size = 0
+    for item in items:
+        index = min(size * parts // max(total, 1), parts - 1)
+        chunks[index].extend(item)
+        size += sum(len(line) for line in item)
+    for index, chunk in enumerate(chunks):
+        outputs[f'{stem}_part{index}.cxx'] = include + EXTERN_C_BEGIN + b''.join(chunk) + EXTERN_C_END
+
+    outputs[f'{stem}_constants.cxx'] = (
+        include + EXTERN_C_BEGIN
+        + b'SWIG_SPLIT_LINKAGE void ' + CONSTANTS_FUNCTION + b'(PyObject *d) {\n'
+        + (b''.join(constants) if constants else b'  (void)d;\n')
+        + b'}\n' + EXTERN_C_END)
+
+    # director方法定义在包装函数区之前，方法表和初始化代码在之后（末尾自带extern "C"块的结束）
+    outputs[f'{stem}_init.cxx'] = include + b''.join(lines[directors:open_block]) + EXTERN_C_BEGIN + b''.join(tail)
+    return outputs
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='SWIG包装代码拆分脚本')
+    parser.add_argument('wrapper', help='SWIG生成的 *_wrap.cxx')
+    parser.add_argument('--parts', type=int, default=8,
+                        help='包装函数拆分的单元数 (默认: 8)')
+    parser.add_argument('--output-dir', default='.',
+                        help='输出目录 (默认: 当前目录)')
+    args = parser.parse_args()
+
+    if args.parts < 1:
+        parser.error('--parts必须大于0')
+    output_dir = Path(args.output_dir)
+    for name, content in split_wrapper(args.wrapper, args.parts).items():
+        (output_dir / name).write_bytes(content)
+
+
+if __name__ == '__main__':
+    main()
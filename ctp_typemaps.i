@@ -0,0 +1,49 @@
+// 行情和交易模块共用的类型映射
+%{
+#include "ctp_encoding.h"
+%}
+
+// CTP定长字符串字段（GB18030编码）转换为Python str：ASCII直接返回，含中文时走缓存码表
+%typemap(out) char[ANY] {
+  resultobj = ctp_native::gb18030_to_pystr($1, $1_dim0);
+  if (!resultobj) SWIG_fail;
+}
+%typemap(out) char[] {
+  resultobj = ctp_native::gb18030_to_pystr($1, strlen($1));
+  if (!resultobj) SWIG_fail;
+}
+// 可写缓冲区（NumPy数组、bytearray等），供原生队列、探针直方图等批量复制数据
+%typemap(in) (void *buffer, size_t buffer_size) (Py_buffer view) {
+  view.obj = NULL;
+  if (PyObject_GetBuffer($input, &view, PyBUF_WRITABLE | PyBUF_C_CONTIGUOUS) != 0) {
+    SWIG_fail;
+  }
+  $1 = view.buf;
+  $2 = (size_t) view.len;
+}
+%typemap(freearg) (void *buffer, size_t buffer_size) {
+  if (view$argnum.obj) {
+    PyBuffer_Release(&view$argnum);
+  }
+}
+// 只读缓冲区（包括只读映射的录制文件）
+%typemap(in) (const void *buffer, size_t buffer_size) (Py_buffer view) {
+  view.obj = NULL;
+  if (PyObject_GetBuffer($input, &view, PyBUF_C_CONTIGUOUS) != 0) {
+    SWIG_fail;
+  }
+  $1 = view.buf;
+  $2 = (size_t) view.len;
+}
+%typemap(freearg) (const void *buffer, size_t buffer_size) {
+  if (view$argnum.obj) {
+    PyBuffer_Release(&view$argnum);
+  }
+}
+// 以CTP_PROBES编译时，回调参数对象带有recv_ns属性：CTP线程进入回调的时刻（纳秒）
+%typemap(directorin) SWIGTYPE * %{
+  $input = SWIG_NewPointerObj(SWIG_as_voidptr($1), $descriptor, 0);
+#ifdef CTP_PROBES
+  ctp_native::probe_attach($input, _swig_thread_block.enter_ns());
+#endif
+%}
@@ -0,0 +1,476 @@
+// 本地模拟CTP前置：替代thostmduserapi_se/thosttraderapi_se，用于没有SimNow时的测试与基准
+// ctp_codegen.py --fake-api根据API头文件生成具体的API类，这里实现公共的线程模型、请求应答和模拟推送：
+//   - 所有回调都在一个工作线程中发生，与真实API一样请求调用立即返回
+//   - Req*请求回复对应的OnRsp*（查询返回空结果），登录、报单、撤单返回模拟数据
+//   - 行情按CTP_FAKE_TICK_RATE（条/秒，默认1000）轮流推送已订阅合约，
+//     PreDelta字段填入发送时刻的steady_clock纳秒数，用于测量回调延迟
+//   - 交易按CTP_FAKE_ORDER_RATE（笔/秒，默认0）推送成交的OnRtnOrder和OnRtnTrade
+#ifndef CTP_FAKE_FRONT_H
+#define CTP_FAKE_FRONT_H
+
+#include <chrono>
+#include <condition_variable>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <ctime>
+#include <deque>
+#include <functional>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include "ThostFtdcUserApiStruct.h"
+
+namespace ctp_fake {
+
+inline double env_rate(const char *name, double default_value)
+{
+    const char *value = std::getenv(name);
+    return value && *value ? std::atof(value) : default_value;
+}
+
+inline std::int64_t steady_ns()
+{
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(
+               std::chrono::steady_clock::now().time_since_epoch())
+        .count();
+}
+
+template <std::size_t N>
+inline void copy_str(char (&dst)[N], const char *src)
+{
+    std::strncpy(dst, src, N - 1);
+    dst[N - 1] = '\0';
+}
+
+// 当前本地日期和时间，date为YYYYMMDD，time为HH:MM:SS
+inline void local_now(char (&date)[9], char (&time)[9], int *millisec = nullptr)
+{
+    auto now = std::chrono::system_clock::now();
+    std::time_t t = std::chrono::system_clock::to_time_t(now);
+    std::tm tm_now;
+#ifdef _WIN32
+    localtime_s(&tm_now, &t);
+#else
+    localtime_r(&t, &tm_now);
+#endif
+    std::strftime(date, sizeof(date), "%Y%m%d", &tm_now);
+    std::strftime(time, sizeof(time), "%H:%M:%S", &tm_now);
+    if (millisec)
+        *millisec = static_cast<int>(
+            std::chrono::duration_cast<std::chrono::milliseconds>(now.time_since_epoch()).count() % 1000);
+}
+
+// 工作线程：执行投递的回调任务，并按固定速率调用模拟推送
+class FakeFront
+{
+public:
+    using Task = std::function<void()>;
+    // 生成第seq条模拟推送，没有可推送的内容时返回false
+    using Generator = std::function<bool(std::uint64_t seq)>;
+
+    ~FakeFront() { stop(); }
+
+    void set_generator(double rate, Generator generator)
+    {
+        rate_ = rate;
+        generator_ = std::move(generator);
+    }
+
+    void start()
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (thread_.joinable())
+            return;
+        stopping_ = false;
+        thread_ = std::thread([this] { run(); });
+    }
+
+    void stop()
+    {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            stopping_ = true;
+        }
+        cv_.notify_all();
+        if (thread_.joinable() && thread_.get_id() != std::this_thread::get_id())
+            thread_.join();
+        std::lock_guard<std::mutex> lock(mutex_);
+        stopped_ = true;
+        stopped_cv_.notify_all();
+    }
+
+    void wait_stopped()
+    {
+        std::unique_lock<std::mutex> lock(mutex_);
+        stopped_cv_.wait(lock, [this] { return stopped_; });
+    }
+
+    void post(Task task)
+    {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            tasks_.push_back(std::move(task));
+        }
+        cv_.notify_one();
+    }
+
+    // 在工作线程中执行task并等待完成，保证返回后不再有使用旧状态的回调；工作线程未运行时直接执行
+    void call(Task task)
+    {
+        std::unique_lock<std::mutex> lock(mutex_);
+        if (!thread_.joinable() || stopping_ || thread_.get_id() == std::this_thread::get_id())
+        {
+            lock.unlock();
+            task();
+            return;
+        }
+        bool done = false;
+        tasks_.push_back([this, &task, &done] {
+            task();
+            std::lock_guard<std::mutex> guard(mutex_);
+            done = true;
+            done_cv_.notify_all();
+        });
+        cv_.notify_one();
+        done_cv_.wait(lock, [&done] { return done; });
+    }
+
+private:
+    void run()
+    {
+        using clock = std::chrono::steady_clock;
+        const bool generating = generator_ && rate_ > 0;
+        const auto period = std::chrono::duration<double>(generating ? 1.0 / rate_ : 1.0);
+        auto origin = clock::now();
+        std::uint64_t due_seq = 0;  // 从origin起已推送的条数
+        std::uint64_t seq = 0;      // 全局序号
+        std::deque<Task> tasks;
+        for (;;)
+        {
+            {
+                std::unique_lock<std::mutex> lock(mutex_);
+                auto ready = [this] { return stopping_ || !tasks_.empty(); };
+                if (generating)
+                    cv_.wait_until(lock, origin + std::chrono::duration_cast<clock::duration>(period * (due_seq + 1)),
+                                   ready);
+                else
+                    cv_.wait(lock, ready);
+                if (stopping_)
+                    return;
+                tasks.swap(tasks_);
+            }
+            for (Task &task : tasks)
+                task();
+            tasks.clear();
+            if (!generating)
+                continue;
+
+            const double elapsed = std::chrono::duration<double>(clock::now() - origin).count();
+            std::uint64_t target = static_cast<std::uint64_t>(elapsed * rate_);
+            // 单轮最多推送一批，避免长时间不处理请求
+            if (target > due_seq + kMaxBurst)
+                target = due_seq + kMaxBurst;
+            while (due_seq < target)
+            {
+                if (!generator_(seq))
+                {
+                    // 没有订阅时不累积欠发的推送
+                    origin = clock::now();
+                    due_seq = 0;
+                    break;
+                }
+                ++seq;
+                ++due_seq;
+            }
+        }
+    }
+
+    static constexpr std::uint64_t kMaxBurst = 10000;
+
+    std::mutex mutex_;
+    std::condition_variable cv_;
+    std::condition_variable stopped_cv_;
+    std::condition_variable done_cv_;
+    std::deque<Task> tasks_;
+    std::thread thread_;
+    bool stopping_ = false;
+    bool stopped_ = false;
+    double rate_ = 0;
+    Generator generator_;
+};
+
+// 行情与交易API公共部分；Api为CThostFtdcMdApi或CThostFtdcTraderApi，Spi为对应的回调类
+template <class Api, class Spi>
+class FakeApiBase : public Api
+{
+public:
+    FakeApiBase() { local_now(trading_day_, login_time_); }
+    virtual ~FakeApiBase() {}
+
+    void Release() override
+    {
+        front_.stop();
+        delete this;
+    }
+    void Init() override
+    {
+        front_.start();
+        front_.post([this] {
+            if (spi_)
+                spi_->OnFrontConnected();
+        });
+    }
+    int Join() override
+    {
+        front_.wait_stopped();
+        return 0;
+    }
+    const char *GetTradingDay() override { return trading_day_; }
+    void RegisterSpi(Spi *pSpi) override
+    {
+        front_.call([this, pSpi] { spi_ = pSpi; });
+    }
+
+protected:
+    // 通用请求：回复一条OnRsp*，查询类返回空结果
+    template <class Req, class Rsp>
+    int on_request(Req *req, int request_id, void (Spi::*callback)(Rsp *, CThostFtdcRspInfoField *, int, bool),
+                   bool query)
+    {
+        if (!req)
+            return -1;
+        front_.post([this, request_id, callback, query] {
+            Rsp rsp;
+            std::memset(&rsp, 0, sizeof(rsp));
+            CThostFtdcRspInfoField info;
+            std::memset(&info, 0, sizeof(info));
+            if (spi_)
+                (spi_->*callback)(query ? nullptr : &rsp, &info, request_id, true);
+        });
+        return 0;
+    }
+
+    // 登录：返回交易日、会话编号等
+    int on_request(CThostFtdcReqUserLoginField *req, int request_id,
+                   void (Spi::*callback)(CThostFtdcRspUserLoginField *, CThostFtdcRspInfoField *, int, bool), bool)
+    {
+        if (!req)
+            return -1;
+        CThostFtdcReqUserLoginField login = *req;
+        front_.post([this, login, request_id, callback] {
+            CThostFtdcRspUserLoginField rsp;
+            std::memset(&rsp, 0, sizeof(rsp));
+            copy_str(rsp.TradingDay, trading_day_);
+            copy_str(rsp.LoginTime, login_time_);
+            copy_str(rsp.BrokerID, login.BrokerID);
+            copy_str(rsp.UserID, login.UserID);
+            copy_str(rsp.SystemName, "FakeCTP");
+            copy_str(rsp.MaxOrderRef, "1");
+            rsp.FrontID = 1;
+            rsp.SessionID = ++session_id_;
+            CThostFtdcRspInfoField info;
+            std::memset(&info, 0, sizeof(info));
+            if (spi_)
+                (spi_->*callback)(&rsp, &info, request_id, true);
+        });
+        return 0;
+    }
+
+    // 订阅类请求：逐个合约回复，并由on_subscribed更新模拟推送的合约列表
+    int on_subscribe(char *ids[], int count,
+                     void (Spi::*callback)(CThostFtdcSpecificInstrumentField *, CThostFtdcRspInfoField *, int, bool),
+                     bool add, bool market_data)
+    {
+        if (count < 0 || (count > 0 && !ids))
+            return -1;
+        std::vector<std::string> list(ids, ids + count);
+        front_.post([this, list, callback, add, market_data] {
+            for (std::size_t i = 0; i < list.size(); ++i)
+            {
+                if (market_data)
+                    on_subscribed(list[i], add);
+                CThostFtdcSpecificInstrumentField rsp;
+                std::memset(&rsp, 0, sizeof(rsp));
+                copy_str(rsp.InstrumentID, list[i].c_str());
+                CThostFtdcRspInfoField info;
+                std::memset(&info, 0, sizeof(info));
+                if (spi_)
+                    (spi_->*callback)(&rsp, &info, 0, i + 1 == list.size());
+            }
+        });
+        return 0;
+    }
+
+    void on_subscribed(const std::string &instrument, bool add)
+    {
+        for (auto it = instruments_.begin(); it != instruments_.end(); ++it)
+        {
+            if (*it == instrument)
+            {
+                if (!add)
+                    instruments_.erase(it);
+                return;
+            }
+        }
+        if (add)
+            instruments_.push_back(instrument);
+    }
+
+    // 行情模拟：在已订阅的合约间轮流推送，价格在固定区间内变动
+    void enable_ticks()
+    {
+        front_.set_generator(env_rate("CTP_FAKE_TICK_RATE", 1000), [this](std::uint64_t seq) {
+            if (instruments_.empty() || !spi_)
+                return false;
+            CThostFtdcDepthMarketDataField tick;
+            std::memset(&tick, 0, sizeof(tick));
+            const std::string &instrument = instruments_[seq % instruments_.size()];
+            copy_str(tick.InstrumentID, instrument.c_str());
+            char day[9], time[9];
+            int millisec = 0;
+            local_now(day, time, &millisec);
+            copy_str(tick.TradingDay, trading_day_);
+            copy_str(tick.ActionDay, day);
+            copy_str(tick.UpdateTime, time);
+            tick.UpdateMillisec = millisec;
+            tick.LastPrice = 3000.0 + static_cast<double>(seq % 200);
+            tick.BidPrice1 = tick.LastPrice - 1.0;
+            tick.AskPrice1 = tick.LastPrice + 1.0;
+            tick.BidVolume1 = 10;
+            tick.AskVolume1 = 12;
+            tick.Volume = static_cast<int>(seq / instruments_.size());
+            tick.OpenInterest = 100000.0;
+            tick.PreDelta = static_cast<double>(steady_ns());
+            spi_->OnRtnDepthMarketData(&tick);
+            return true;
+        });
+    }
+
+    char trading_day_[9] = {0};
+    char login_time_[9] = {0};
+    int session_id_ = 0;
+    Spi *spi_ = nullptr;
+    std::vector<std::string> instruments_;  // 仅在工作线程中访问
+    FakeFront front_;
+};
+
+// 交易API：报单全部成交，撤单直接撤销
+template <class Api, class Spi>
+class FakeTraderBase : public FakeApiBase<Api, Spi>
+{
+protected:
+    using FakeApiBase<Api, Spi>::on_request;
+
+    int on_request(CThostFtdcInputOrderField *req, int, void (Spi::*)(CThostFtdcInputOrderField *,
+                   CThostFtdcRspInfoField *, int, bool), bool)
+    {
+        if (!req)
+            return -1;
+        CThostFtdcInputOrderField input = *req;
+        this->front_.post([this, input] { fill_order(input); });
+        return 0;
+    }
+
+    int on_request(CThostFtdcInputOrderActionField *req, int, void (Spi::*)(CThostFtdcInputOrderActionField *,
+                   CThostFtdcRspInfoField *, int, bool), bool)
+    {
+        if (!req)
+            return -1;
+        CThostFtdcInputOrderActionField action = *req;
+        this->front_.post([this, action] {
+            CThostFtdcOrderField order;
+            std::memset(&order, 0, sizeof(order));
+            copy_str(order.BrokerID, action.BrokerID);
+            copy_str(order.InvestorID, action.InvestorID);
+            copy_str(order.InstrumentID, action.InstrumentID);
+            copy_str(order.OrderRef, action.OrderRef);
+            copy_str(order.OrderSysID, action.OrderSysID);
+            order.FrontID = action.FrontID;
+            order.SessionID = action.SessionID;
+            order.OrderStatus = THOST_FTDC_OST_Canceled;
+            order.OrderSubmitStatus = THOST_FTDC_OSS_Accepted;
+            if (this->spi_)
+                this->spi_->OnRtnOrder(&order);
+        });
+        return 0;
+    }
+
+    // 交易模拟：按速率推送成交的委托和成交回报
+    void enable_orders()
+    {
+        this->front_.set_generator(env_rate("CTP_FAKE_ORDER_RATE", 0), [this](std::uint64_t seq) {
+            if (!this->spi_)
+                return false;
+            CThostFtdcInputOrderField input;
+            std::memset(&input, 0, sizeof(input));
+            copy_str(input.InstrumentID, "FAKE");
+            std::snprintf(input.OrderRef, sizeof(input.OrderRef), "%llu", static_cast<unsigned long long>(seq));
+            input.Direction = seq % 2 ? THOST_FTDC_D_Sell : THOST_FTDC_D_Buy;
+            input.CombOffsetFlag[0] = THOST_FTDC_OF_Open;
+            input.LimitPrice = 3000.0 + static_cast<double>(seq % 200);
+            input.VolumeTotalOriginal = 1;
+            fill_order(input);
+            return true;
+        });
+    }
+
+    void fill_order(const CThostFtdcInputOrderField &input)
+    {
+        CThostFtdcOrderField order;
+        std::memset(&order, 0, sizeof(order));
+        copy_str(order.BrokerID, input.BrokerID);
+        copy_str(order.InvestorID, input.InvestorID);
+        copy_str(order.InstrumentID, input.InstrumentID);
+        copy_str(order.OrderRef, input.OrderRef);
+        copy_str(order.TradingDay, this->trading_day_);
+        std::snprintf(order.OrderSysID, sizeof(order.OrderSysID), "%12d", ++order_sys_id_);
+        order.Direction = input.Direction;
+        order.CombOffsetFlag[0] = input.CombOffsetFlag[0];
+        order.LimitPrice = input.LimitPrice;
+        order.VolumeTotalOriginal = input.VolumeTotalOriginal;
+        order.RequestID = input.RequestID;
+        order.FrontID = 1;
+        order.SessionID = this->session_id_;
+        char day[9];
+        local_now(day, order.InsertTime);
+        copy_str(order.InsertDate, day);
+        order.OrderSubmitStatus = THOST_FTDC_OSS_Accepted;
+        order.OrderStatus = THOST_FTDC_OST_NoTradeQueueing;
+        order.VolumeTotal = input.VolumeTotalOriginal;
+        if (!this->spi_)
+            return;
+        this->spi_->OnRtnOrder(&order);
+
+        CThostFtdcTradeField trade;
+        std::memset(&trade, 0, sizeof(trade));
+        copy_str(trade.BrokerID, order.BrokerID);
+        copy_str(trade.InvestorID, order.InvestorID);
+        copy_str(trade.InstrumentID, order.InstrumentID);
+        copy_str(trade.OrderRef, order.OrderRef);
+        copy_str(trade.OrderSysID, order.OrderSysID);
+        copy_str(trade.TradingDay, order.TradingDay);
+        copy_str(trade.TradeDate, day);
+        copy_str(trade.TradeTime, order.InsertTime);
+        std::snprintf(trade.TradeID, sizeof(trade.TradeID), "%12d", order_sys_id_);
+        trade.Direction = order.Direction;
+        trade.OffsetFlag = order.CombOffsetFlag[0];
+        trade.Price = order.LimitPrice;
+        trade.Volume = order.VolumeTotalOriginal;
+        this->spi_->OnRtnTrade(&trade);
+
+        order.OrderStatus = THOST_FTDC_OST_AllTraded;
+        order.VolumeTraded = order.VolumeTotalOriginal;
+        order.VolumeTotal = 0;
+        this->spi_->OnRtnOrder(&order);
+    }
+
+    int order_sys_id_ = 0;  // 仅在工作线程中访问
+};
+
+}  // namespace ctp_fake
+
+#endif  // CTP_FAKE_FRONT_H
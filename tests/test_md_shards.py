@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : test_md_shards.py
+@Description: 多会话行情合并的去重、水位和再平衡规划，需要先构建（python build.py --fake-ctp）
+"""
+import numpy as np
+import pytest
+
+mdapi = pytest.importorskip("ctp_api.thostmduserapi")
+
+from ctp_api.md_shards import TickMerger, plan_rebalance, session_ms  # noqa: E402
+
+
+def ticks(*rows, instrument=b'SR601'):
+    """rows: (UpdateTime, UpdateMillisec, Volume, BidPrice1)"""
+    out = np.zeros(len(rows), dtype=mdapi.DepthMarketData_dtype)
+    for record, (update_time, millisec, volume, bid) in zip(out, rows):
+        record['InstrumentID'] = instrument
+        record['UpdateTime'] = update_time
+        record['UpdateMillisec'] = millisec
+        record['Volume'] = volume
+        record['BidPrice1'] = bid
+    return out
+
+
+def test_same_millisecond_snapshots_differing_in_book():
+    # 郑商所UpdateMillisec恒为0，只有盘口变化时成交量也不变
+    merger = TickMerger(2, window=0)
+    book = ticks((b'10:00:00', 0, 5, 6000.0), (b'10:00:00', 0, 5, 6001.0), (b'10:00:00', 0, 5, 6002.0))
+    assert merger.push(0, book[:2], 0) == 2
+    assert merger.push(1, book[:1], 0) == 0
+    assert merger.push(1, book[1:], 0) == 1
+    assert merger.push(0, book[2:], 0) == 0
+    merged = merger.pop(0, flush=True)
+    assert sorted(merged['BidPrice1'].tolist()) == [6000.0, 6001.0, 6002.0]
+    assert merger.duplicates == [1, 2]
+
+
+def test_handover_overlap_is_deduplicated():
+    # 迁移期间新旧会话都订阅了同一合约，各自收到同一串行情
+    merger = TickMerger(2, window=0)
+    stream = ticks(*[(b'10:00:%02d' % (i // 2), 500 * (i % 2), i, 6000.0 + i) for i in range(10)])
+    merged = []
+    assert merger.push(0, stream[:6], 0) == 6
+    merged.append(merger.pop(0))
+    assert merger.push(1, stream[3:8], 0) == 2
+    assert merger.push(0, stream[6:8], 0) == 0
+    assert merger.push(1, stream[8:], 0) == 2
+    merged.append(merger.pop(0, flush=True))
+    merged = np.concatenate(merged)
+    assert merged['Volume'].tolist() == list(range(10))
+    assert np.all(np.diff(session_ms(merged)) >= 0)
+
+
+def test_late_batch_does_not_move_newest_backwards():
+    merger = TickMerger(1, window=10)
+    merger.push(0, ticks((b'10:00:05', 0, 2, 1.0)), 0)
+    newest = int(merger.newest[0])
+    merger.push(0, ticks((b'10:00:01', 0, 1, 1.0)), 0)
+    assert int(merger.newest[0]) == newest
+    assert merger.watermark(0) == newest
+
+
+def test_trading_day_rollover_resets_state():
+    merger = TickMerger(1, window=0)
+    assert merger.push(0, ticks((b'14:59:59', 0, 1000, 1.0)), 0) == 1
+    # 新交易日夜盘：时间比上一笔早一小时以上，成交量从头开始
+    assert merger.push(0, ticks((b'21:00:00', 0, 1, 2.0)), 0) == 1
+    assert int(merger.newest[0]) == int(session_ms(ticks((b'21:00:00', 0, 1, 2.0)))[0])
+    # 同一交易日内较早的行情仍然丢弃
+    assert merger.push(0, ticks((b'20:59:00', 0, 1, 3.0)), 0) == 0
+    assert merger.push(0, ticks((b'21:00:01', 0, 2, 2.0)), 0) == 1
+
+
+def test_plan_rebalance_converges():
+    rng = np.random.default_rng(1)
+    names = [f"rb{2601 + i}" for i in range(200)]
+    rates = dict(zip(names, rng.uniform(0.1, 20.0, len(names)).tolist()))
+    assignment = {name: 0 if i < 120 else 1 + i % 3 for i, name in enumerate(names)}
+    moves = plan_rebalance(assignment, rates, 4, tolerance=0.2)
+    for name, source, target in moves:
+        assert assignment[name] == source
+        assignment[name] = target
+    load = [0.0] * 4
+    for name, shard in assignment.items():
+        load[shard] += rates[name]
+    assert moves
+    assert max(load) <= sum(load) / 4 * 1.2
+    assert plan_rebalance(assignment, rates, 4, tolerance=0.2) == []
+
+
+def test_plan_rebalance_respects_max_moves():
+    rates = {f"i{k}": 1.0 for k in range(40)}
+    assignment = {name: 0 for name in rates}
+    assert len(plan_rebalance(assignment, rates, 4, max_moves=5)) == 5
+    assert plan_rebalance(assignment, {}, 4) == []
+
+
+def test_plan_rebalance_cannot_split_a_dominant_instrument():
+    # 单个合约的速率超过平均负载时无法再分，不产生无效的来回迁移
+    rates = {'hot': 100.0, 'a': 1.0, 'b': 1.0}
+    assert plan_rebalance({'hot': 0, 'a': 1, 'b': 1}, rates, 2) == []
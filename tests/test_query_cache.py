@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : test_query_cache.py
+@Description: 查询缓存的写入和失效，需要先构建（python build.py --fake-ctp --profile trading-core）
+"""
+import numpy as np
+import pytest
+
+traderapi = pytest.importorskip("ctp_api.thosttraderapi")
+
+from ctp_api.query_cache import QueryCache  # noqa: E402
+
+
+def margin(instrument_id: str, ratio: float):
+    return traderapi.CThostFtdcInstrumentMarginRateField.from_dict({
+        'InstrumentID': instrument_id, 'HedgeFlag': '1', 'LongMarginRatioByMoney': ratio})
+
+
+def test_upsert_replaces_matching_keys(tmp_path):
+    cache = QueryCache(tmp_path, "9999", "000001", "20251128")
+    cache.store('margin', [margin('rb2601', 0.1), margin('ag2602', 0.12)])
+    records = cache.upsert('margin', [margin('rb2601', 0.15)])
+    assert sorted(records['InstrumentID'].tolist()) == [b'ag2602', b'rb2601']
+    assert cache.find('margin', 'rb2601', '1')['LongMarginRatioByMoney'] == 0.15
+    cache.close()
+
+
+def test_layout_change_is_a_miss(tmp_path):
+    cache = QueryCache(tmp_path, "9999", "000001", "20251128")
+    cache.store('margin', [margin('rb2601', 0.1)])
+    cache.close()
+    # 大小相同但字段不同的旧版本布局
+    dtype = traderapi.InstrumentMarginRate_dtype
+    np.save(cache.path('margin'), np.zeros(1, dtype=np.dtype([('Other', f'V{dtype.itemsize}')])))
+    reopened = QueryCache(tmp_path, "9999", "000001", "20251128")
+    assert reopened.load('margin') is None
+    assert 'margin' not in reopened
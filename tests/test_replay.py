@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : test_replay.py
+@Description: 录制行情回放的时间顺序，需要先构建（python build.py --fake-ctp）
+"""
+import numpy as np
+import pytest
+
+mdapi = pytest.importorskip("ctp_api.thostmduserapi")
+
+from ctp_api.replay import TickReplayer  # noqa: E402
+
+
+def record(directory, rows):
+    """rows: [(TradingDay, ActionDay, UpdateTime, Volume)]，按到达顺序写入录制文件"""
+    recorder = mdapi.TickRecorder(str(directory), mdapi.TickRecorder.kFormatFull)
+    for trading_day, action_day, update_time, volume in rows:
+        recorder.append(mdapi.CThostFtdcDepthMarketDataField.from_dict({
+            'InstrumentID': 'm2601', 'ExchangeID': 'DCE', 'TradingDay': trading_day, 'ActionDay': action_day,
+            'UpdateTime': update_time, 'Volume': volume}))
+    recorder.close()
+
+
+def test_dce_night_session_precedes_day_session(tmp_path):
+    # 大商所夜盘的ActionDay为交易日：周五夜盘属于下周一的交易日
+    record(tmp_path, [
+        ('20251128', '20251128', '21:00:00', 1),
+        ('20251128', '20251128', '23:00:00', 2),
+        ('20251128', '20251128', '09:00:00', 3),
+        ('20251128', '20251128', '14:59:59', 4),
+        ('20251201', '20251201', '21:00:00', 1),
+        ('20251201', '20251201', '09:00:00', 2),
+    ])
+    replayer = TickReplayer(tmp_path)
+    ticks = np.concatenate([batch.copy() for batch in replayer.batches()])
+    assert ticks['TradingDay'].tolist() == [b'20251128'] * 4 + [b'20251201'] * 2
+    assert ticks['Volume'].tolist() == [1, 2, 3, 4, 1, 2]
+    assert np.all(np.diff(replayer.timestamps) > 0)
+    assert replayer.timestamps[0] == np.datetime64('2025-11-27T21:00:00', 'ms').astype(np.int64)
+    assert replayer.timestamps[4] == np.datetime64('2025-11-28T21:00:00', 'ms').astype(np.int64)
+
+
+def test_night_session_after_midnight(tmp_path):
+    record(tmp_path, [
+        ('20251128', '20251128', '23:59:59', 1),
+        ('20251128', '20251128', '00:30:00', 2),
+        ('20251128', '20251128', '09:00:00', 3),
+    ])
+    replayer = TickReplayer(tmp_path)
+    assert np.all(np.diff(replayer.timestamps) > 0)
+    assert replayer.timestamps[1] == np.datetime64('2025-11-28T00:30:00', 'ms').astype(np.int64)
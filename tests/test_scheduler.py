@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : test_scheduler.py
+@Description: 请求调度器的重试、退避和优先级，使用模拟的交易API，不需要构建
+"""
+import threading
+import time
+
+import pytest
+
+from ctp_api.aio import CtpRequestError
+from ctp_api.scheduler import RequestScheduler
+
+
+class FakeApi:
+    """按方法名返回预设的返回码序列（用完后返回0），并记录调用顺序和时间"""
+
+    def __init__(self, returns=None):
+        self.returns = {name: list(codes) for name, codes in (returns or {}).items()}
+        self.calls: list[tuple[str, int, float]] = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __getattr__(self, method):
+        if not method.startswith('Req'):
+            raise AttributeError(method)
+
+        def call(field, request_id):
+            self.gate.wait()
+            self.calls.append((method, request_id, time.monotonic()))
+            codes = self.returns.get(method)
+            return codes.pop(0) if codes else 0
+        return call
+
+
+@pytest.mark.parametrize("code", [-2, -3])
+def test_retry_after_flow_control_rejection(code):
+    api = FakeApi({'ReqOrderInsert': [code, code]})
+    scheduler = RequestScheduler(api, retry_delay=0.05)
+    try:
+        future = scheduler.submit('ReqOrderInsert')
+        assert future.result(timeout=5) == 1
+        times = [stamp for _, _, stamp in api.calls]
+        assert len(times) == 3
+        # 不限速的通道同样在被拒绝后等待retry_delay
+        assert all(b - a >= 0.045 for a, b in zip(times, times[1:]))
+        stats = scheduler.stats()['order']
+        assert (stats.sent, stats.retried, stats.failed) == (1, 2, 0)
+    finally:
+        scheduler.close()
+
+
+def test_retries_are_capped():
+    api = FakeApi({'ReqQryInstrument': [-3] * 10})
+    scheduler = RequestScheduler(api, query_rate=None, retry_delay=0.01, max_retries=3)
+    try:
+        future = scheduler.submit('ReqQryInstrument')
+        with pytest.raises(CtpRequestError) as info:
+            future.result(timeout=5)
+        assert info.value.error_id == -3
+        assert len(api.calls) == 4
+        stats = scheduler.stats()['query']
+        assert (stats.retried, stats.failed) == (3, 1)
+    finally:
+        scheduler.close()
+
+
+def test_cancel_is_sent_before_order_and_query():
+    api = FakeApi()
+    scheduler = RequestScheduler(api, query_rate=None)
+    try:
+        # 第一个请求阻塞在API中，其余请求在此期间排队
+        api.gate.clear()
+        first = scheduler.submit('ReqUserLogin')
+        while not first.running():
+            time.sleep(0.001)
+        futures = [scheduler.submit(method) for method in
+                   ('ReqQryInstrument', 'ReqOrderInsert', 'ReqOrderAction', 'ReqOrderInsert')]
+        api.gate.set()
+        for future in [first, *futures]:
+            future.result(timeout=5)
+        assert [method for method, _, _ in api.calls] == [
+            'ReqUserLogin', 'ReqOrderAction', 'ReqOrderInsert', 'ReqOrderInsert', 'ReqQryInstrument']
+    finally:
+        scheduler.close()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@ProjectName: ctp_swig_build
+@FileName   : test_state.py
+@Description: 成交与持仓查询的合并，需要先构建（python build.py --fake-ctp --profile trading-core）
+"""
+import pytest
+
+traderapi = pytest.importorskip("ctp_api.thosttraderapi")
+
+from ctp_api.state import TradingState  # noqa: E402
+
+BUY, SELL = traderapi.THOST_FTDC_D_Buy, traderapi.THOST_FTDC_D_Sell
+OPEN, CLOSE_TODAY = traderapi.THOST_FTDC_OF_Open, traderapi.THOST_FTDC_OF_CloseToday
+SPEC, HEDGE = traderapi.THOST_FTDC_HF_Speculation, traderapi.THOST_FTDC_HF_Hedge
+LONG, SHORT = traderapi.THOST_FTDC_PD_Long, traderapi.THOST_FTDC_PD_Short
+
+
+def trade(trade_id: str, volume: int, direction=BUY, offset=OPEN, hedge=SPEC, instrument_id='rb2601'):
+    return traderapi.CThostFtdcTradeField.from_dict({
+        'ExchangeID': 'SHFE', 'TradeID': trade_id, 'Direction': direction, 'InstrumentID': instrument_id,
+        'OffsetFlag': offset, 'HedgeFlag': hedge, 'Volume': volume})
+
+
+def position(volume: int, today: int, direction=LONG, hedge=SPEC, instrument_id='rb2601'):
+    return traderapi.CThostFtdcInvestorPositionField.from_dict({
+        'InstrumentID': instrument_id, 'ExchangeID': 'SHFE', 'PosiDirection': direction, 'HedgeFlag': hedge,
+        'Position': volume, 'TodayPosition': today})
+
+
+def test_trade_during_position_response_is_kept():
+    state = TradingState()
+    state.on_trade(trade('1', 2))
+    state.on_position(position(2, 2), is_last=False)    # 查询结果已包含成交1
+    state.on_trade(trade('2', 3))                       # 应答期间的成交
+    state.on_position(None, is_last=True)
+    assert state.net_position('rb2601') == 5
+    state.on_trade(trade('3', 1, SELL, CLOSE_TODAY))
+    assert state.position('rb2601').long_today == 4
+
+
+def test_duplicate_rtn_trade_is_ignored():
+    state = TradingState()
+    assert state.on_trade(trade('1', 2)) is not None
+    assert state.on_trade(trade('1', 2)) is None
+    assert state.net_position('rb2601') == 2
+    assert len(state.trades()) == 1
+
+
+def test_qry_trade_before_position_load_updates_positions():
+    state = TradingState()
+    state.on_qry_trade(trade('1', 2), None, 1, False)
+    state.on_qry_trade(trade('2', 1, SELL), None, 1, True)
+    assert state.net_position('rb2601') == 1
+    state.on_qry_trade(None, None, 2, True)             # 没有成交时的空应答
+    assert len(state.trades()) == 2
+
+
+def test_qry_trade_after_position_load_is_not_counted_twice():
+    state = TradingState()
+    state.on_position(position(3, 3), is_last=True)
+    state.on_qry_trade(trade('1', 1), None, 1, False)
+    state.on_qry_trade(trade('2', 2), None, 1, True)
+    assert state.net_position('rb2601') == 3
+    assert len(state.trades()) == 2
+    # 之后推送的同一成交仍然去重，新成交照常计入
+    assert state.on_trade(trade('2', 2)) is None
+    state.on_trade(trade('3', 1))
+    assert state.net_position('rb2601') == 4
+
+
+def test_shfe_today_and_yesterday_rows():
+    # 上期所今昨仓分两条返回，昨仓条目的TodayPosition为0
+    state = TradingState()
+    state.on_position(position(5, 5), is_last=False)
+    state.on_position(position(3, 0), is_last=False)
+    state.on_position(position(2, 2, SHORT), is_last=True)
+    row = state.position('rb2601', SPEC)
+    assert (row.long_today, row.long_yesterday, row.short_today, row.short_yesterday) == (5, 3, 2, 0)
+    assert state.net_position('rb2601') == 6
+
+
+def test_hedge_flags_are_separate_rows():
+    state = TradingState()
+    state.on_position(position(4, 4, hedge=SPEC), is_last=False)
+    state.on_position(position(10, 0, SHORT, hedge=HEDGE), is_last=True)
+    state.on_trade(trade('1', 1, hedge=HEDGE, direction=BUY, offset=OPEN))
+    assert state.net_position('rb2601', SPEC) == 4
+    assert state.net_position('rb2601', HEDGE) == -9
+    assert state.net_position('rb2601') == -5
+    assert set(state.snapshot().positions) == {('rb2601', SPEC), ('rb2601', HEDGE)}
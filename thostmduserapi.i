@@ -1,19 +1,29 @@
 %module(directors="1") thostmduserapi
 %{
 #include "ThostFtdcMdApi.h"
-#include <codecvt>
-#include <locale>
+#include "ctp_bus.h"
+#include "ctp_md_queue.h"
+#include "ctp_probe.h"
+#include "ctp_recorder.h"
+#include "ctp_replay.h"
+#include "ctp_shard.h"
+#include "ctp_snapshot.h"
+#include "ctp_strarray.h"
 #include <vector>
 #include <string>
 using namespace std;
-#ifdef _MSC_VER
-const static locale g_loc("zh-CN");
-#else    
-const static locale g_loc("zh_CN.GB18030");
-#endif
 %}
 
 %feature("director") CThostFtdcMdSpi;
+%feature("director") MdTickQueueSpi;
+// 深度行情由原生代码写入队列，不再回调Python
+%feature("nodirector") MdTickQueueSpi::OnRtnDepthMarketData;
+// 需要操作Python对象引用计数，调用期间保持GIL
+%feature("nothreadallow") MdTickQueueSpi::set_notify;
+%feature("nothreadallow") SnapshotCache::set_notify;
+// 由Python包装方法add_sink/remove_sink负责保持旁路对象存活
+%rename(_add_sink) MdTickQueueSpi::add_sink;
+%rename(_remove_sink) MdTickQueueSpi::remove_sink;
 %ignore THOST_FTDC_VTC_BankBankToFuture;
 %ignore THOST_FTDC_VTC_BankFutureToBank;
 %ignore THOST_FTDC_VTC_FutureBankToFuture;
@@ -24,56 +34,229 @@ const static locale g_loc("zh_CN.GB18030");
 %ignore THOST_FTDC_FTC_BrokerLaunchBrokerToBank;
 
 
-%typemap(out) char[ANY], char[] {
-    const std::string &gb2312($1);
-    std::vector<wchar_t> wstr(gb2312.size());
-    wchar_t* wstrEnd = nullptr;
-    const char* gbEnd = nullptr;
-    mbstate_t state = {};
-    int res = use_facet<codecvt<wchar_t, char, mbstate_t> >
-        (g_loc).in(state,
-            gb2312.data(), gb2312.data() + gb2312.size(), gbEnd,
-            wstr.data(), wstr.data() + wstr.size(), wstrEnd);
- 
-    if (codecvt_base::ok == res)
-    {
-        wstring_convert<codecvt_utf8<wchar_t>> cutf8;
-        std::string result = cutf8.to_bytes(wstring(wstr.data(), wstrEnd));       
-        resultobj = SWIG_FromCharPtrAndSize(result.c_str(), result.size()); 
-    }
-    else
-    {
-        std::string result;
-        resultobj = SWIG_FromCharPtrAndSize(result.c_str(), result.size()); 
-    }
+%include "ctp_typemaps.i"
+%include <std_string.i>
+%include <exception.i>
+%exception TickRecorder::TickRecorder {
+  try {
+    $action
+  } catch (const std::exception &e) {
+    SWIG_exception(SWIG_ValueError, e.what());
+  }
+}
+%exception TickBusPublisher::TickBusPublisher {
+  try {
+    $action
+  } catch (const std::invalid_argument &e) {
+    SWIG_exception(SWIG_ValueError, e.what());
+  } catch (const std::exception &e) {
+    SWIG_exception(SWIG_IOError, e.what());
+  }
+}
+%exception ShardedTickQueue::ShardedTickQueue {
+  try {
+    $action
+  } catch (const std::exception &e) {
+    SWIG_exception(SWIG_ValueError, e.what());
+  }
 }
+%exception TickBusSubscriber::TickBusSubscriber {
+  try {
+    $action
+  } catch (const std::invalid_argument &e) {
+    SWIG_exception(SWIG_ValueError, e.what());
+  } catch (const std::exception &e) {
+    SWIG_exception(SWIG_IOError, e.what());
+  }
+}
+// 合约代码集合：str/bytes的任意序列或可迭代对象、单个代码或NumPy 'S'数组
 %typemap(in) char *[] {
-  /* Check if is a list */
-  if (PyList_Check($input)) {
-    int size = PyList_Size($input);
-    int i = 0;
-    $1 = (char **) malloc((size+1)*sizeof(char *));
-    for (i = 0; i < size; i++) {
-      PyObject *o = PyList_GetItem($input, i);
-      if (PyString_Check(o)) {
-        $1[i] = PyString_AsString(PyList_GetItem($input, i));
-      } else {
-        free($1);
-        PyErr_SetString(PyExc_TypeError, "list must contain strings");
-        SWIG_fail;
-      }
-    }
-    $1[i] = 0;
-  } else {
-    PyErr_SetString(PyExc_TypeError, "not a list");
+  if (ctp_native::InstrumentIdArray::local().assign($input) < 0) {
     SWIG_fail;
   }
+  $1 = ctp_native::InstrumentIdArray::local().data();
 }
-
-// This cleans up the char ** array we malloc'd before the function call
-%typemap(freearg) char ** {
-  free((char *) $1);
+%typemap(freearg) char *[] {
+  ctp_native::InstrumentIdArray::local().release();
+}
+// nCount可省略，默认为合约数量；显式传入时不能超过合约数量
+%typemap(default) int nCount {
+  $1 = -1;
 }
+%typemap(check) int nCount {
+  if ($1 == -1) {
+    $1 = ctp_native::InstrumentIdArray::local().size();
+  } else if ($1 < 0 || $1 > ctp_native::InstrumentIdArray::local().size()) {
+    SWIG_exception_fail(SWIG_ValueError, "nCount exceeds the number of instrument ids");
+  }
+}
+// 回放时保持GIL，Python子类的回调不必每条行情重新获取GIL
+%feature("nothreadallow") replay_ticks;
+%exception replay_ticks {
+  try {
+    $action
+  } catch (Swig::DirectorException &) {
+    SWIG_fail;
+  }
+}
+
+%include "thostmduserapi_generated.i"
 %include "ThostFtdcUserApiDataType.h"
 %include "ThostFtdcUserApiStruct.h"
-%include "ThostFtdcMdApi.h"
\ No newline at end of file
+%pythoncode %{
+_extend_structs(globals())
+%}
+%include "ThostFtdcMdApi.h"
+%include "ctp_sink.h"
+%include "ctp_recorder.h"
+%include "ctp_bus.h"
+%include "ctp_probe.h"
+%include "ctp_snapshot.h"
+%include "ctp_shard.h"
+%include "ctp_md_queue.h"
+%include "ctp_replay.h"
+
+// 批量订阅：超长合约列表自动拆分为多次请求，返回每批的返回码（0表示成功）
+%nothreadallow;
+%extend CThostFtdcMdApi {
+  PyObject *subscribe_market_data(PyObject *ids, int chunk_size = 500) {
+    return ctp_native::call_in_chunks($self, &CThostFtdcMdApi::SubscribeMarketData, ids, chunk_size);
+  }
+  PyObject *unsubscribe_market_data(PyObject *ids, int chunk_size = 500) {
+    return ctp_native::call_in_chunks($self, &CThostFtdcMdApi::UnSubscribeMarketData, ids, chunk_size);
+  }
+  PyObject *subscribe_for_quote_rsp(PyObject *ids, int chunk_size = 500) {
+    return ctp_native::call_in_chunks($self, &CThostFtdcMdApi::SubscribeForQuoteRsp, ids, chunk_size);
+  }
+  PyObject *unsubscribe_for_quote_rsp(PyObject *ids, int chunk_size = 500) {
+    return ctp_native::call_in_chunks($self, &CThostFtdcMdApi::UnSubscribeForQuoteRsp, ids, chunk_size);
+  }
+}
+%clearnothreadallow;
+
+// Python方法由_extends挂到类上，代理类和-builtin构建均适用
+%pythoncode %{
+@_extends(MdTickQueueSpi)
+class _MdTickQueueSpi:
+    def drain(self, max_n=1024, out=None):
+        """
+        批量取出最多max_n条深度行情，一次调用只获取一次GIL
+        :param max_n: 本次最多取出的行情条数
+        :param out: 可选的预分配DepthMarketData_dtype数组，用于复用内存
+        :return: DepthMarketData_dtype结构化数组
+        """
+        if out is None:
+            out = _np.empty(max_n, dtype=DepthMarketData_dtype)
+        elif out.dtype != DepthMarketData_dtype:
+            raise TypeError("out的dtype必须是DepthMarketData_dtype")
+        n = self.drain_into(out[:max_n])
+        return out[:n]
+
+    def add_sink(self, sink):
+        """
+        挂接行情旁路（如TickRecorder），每条深度行情在进入队列前于CTP线程中交给旁路处理
+        :param sink: TickSink子类实例，挂接期间由本对象持有引用
+        """
+        self._add_sink(sink)
+        sinks = self.__dict__.setdefault('_sinks', [])
+        if sink not in sinks:
+            sinks.append(sink)
+
+    def remove_sink(self, sink):
+        """移除行情旁路，返回后CTP线程不会再访问该旁路"""
+        self._remove_sink(sink)
+        sinks = self.__dict__.get('_sinks', [])
+        if sink in sinks:
+            sinks.remove(sink)
+%}
+
+%pythoncode %{
+@_extends(SnapshotCache)
+class _SnapshotCache:
+    def get_snapshot(self, ids=None, out=None):
+        """
+        读取最新快照，不影响脏集合
+        :param ids: 合约代码（单个或序列），默认为全部已有快照的合约
+        :param out: 可选的预分配DepthMarketData_dtype数组
+        :return: DepthMarketData_dtype结构化数组，与ids一一对应；尚无行情的合约为全零记录（InstrumentID为空）
+        """
+        if ids is None:
+            n = self.size()
+        elif isinstance(ids, (str, bytes)):
+            n = 1
+        else:
+            if not hasattr(ids, '__len__'):
+                ids = list(ids)
+            n = len(ids)
+        if out is None:
+            out = _np.empty(n, dtype=DepthMarketData_dtype)
+        elif out.dtype != DepthMarketData_dtype:
+            raise TypeError("out的dtype必须是DepthMarketData_dtype")
+        if ids is None:
+            return out[:self.snapshot_all_into(out[:n])]
+        if n == 0:
+            return out[:0]
+        return out[:self.snapshot_into(out[:n], ids)]
+
+    def drain(self, max_n=1024, out=None):
+        """
+        取出自上次drain以来有变化的合约的最新快照（脏集合）
+        :param max_n: 本次最多取出的合约数，其余留到下次
+        :param out: 可选的预分配DepthMarketData_dtype数组
+        :return: DepthMarketData_dtype结构化数组
+        """
+        if out is None:
+            out = _np.empty(max_n, dtype=DepthMarketData_dtype)
+        elif out.dtype != DepthMarketData_dtype:
+            raise TypeError("out的dtype必须是DepthMarketData_dtype")
+        return out[:self.drain_into(out[:max_n])]
+%}
+
+%pythoncode %{
+@_extends(ShardedTickQueue)
+class _ShardedTickQueue:
+    def drain(self, shard, max_n=1024, out=None):
+        """
+        取出某个分片中最多max_n条行情，同一合约的行情按到达顺序排列
+        :param shard: 分片序号
+        :param max_n: 本次最多取出的条数
+        :param out: 可选的预分配DepthMarketData_dtype数组
+        :return: DepthMarketData_dtype结构化数组
+        """
+        if out is None:
+            out = _np.empty(max_n, dtype=DepthMarketData_dtype)
+        elif out.dtype != DepthMarketData_dtype:
+            raise TypeError("out的dtype必须是DepthMarketData_dtype")
+        return out[:self.drain_into(shard, out[:max_n])]
+%}
+
+%pythoncode %{
+@_extends(TickBusSubscriber)
+class _TickBusSubscriber:
+    def read(self, max_n=1024, out=None):
+        """
+        读取总线上的新行情（已按订阅的合约过滤）
+        :param max_n: 本次最多读取的条数
+        :param out: 可选的预分配TickBusRecord_dtype数组
+        :return: TickBusRecord_dtype结构化数组，行情在'tick'字段中；没有新行情时为空数组
+        """
+        if out is None:
+            out = _np.empty(max_n, dtype=TickBusRecord_dtype)
+        elif out.dtype != TickBusRecord_dtype:
+            raise TypeError("out的dtype必须是TickBusRecord_dtype")
+        return out[:self.read_into(out[:max_n])]
+%}
+
+%pythoncode %{
+# 总线记录：全局序号、合约序号、合约内序号和完整的深度行情
+TickBusRecord_dtype = _np.dtype([
+    ('seq', '<u8'),
+    ('instrument', '<u4'),
+    ('instrument_seq', '<u4'),
+    ('tick', DepthMarketData_dtype),
+])
+if TickBusRecord_dtype.itemsize != TickBusSubscriber.record_size():
+    raise ImportError("TickBusRecord_dtype与原生总线记录布局不一致，请重新构建")
+if DepthMarketData_dtype.itemsize != MdTickQueueSpi.record_size():
+    raise ImportError("DepthMarketData_dtype与CThostFtdcDepthMarketDataField内存布局不一致，请重新构建")
+%}
\ No newline at end of file
@@ -1,40 +1,25 @@
 %module(directors="1") thosttraderapi 
 %{ 
 #include "ThostFtdcTraderApi.h"
-#include <codecvt>
-#include <locale>
+#include "ctp_order.h"
+#include "ctp_probe.h"
 #include <vector>
 #include <string>
 using namespace std;
-#ifdef _MSC_VER
-const static locale g_loc("zh-CN");
-#else    
-const static locale g_loc("zh_CN.GB18030");
-#endif
 %}
  
-%typemap(out) char[ANY], char[] {
-    const std::string &gb2312($1);
-    std::vector<wchar_t> wstr(gb2312.size());
-    wchar_t* wstrEnd = nullptr;
-    const char* gbEnd = nullptr;
-    mbstate_t state = {};
-    int res = use_facet<codecvt<wchar_t, char, mbstate_t> >
-        (g_loc).in(state,
-            gb2312.data(), gb2312.data() + gb2312.size(), gbEnd,
-            wstr.data(), wstr.data() + wstr.size(), wstrEnd);
- 
-    if (codecvt_base::ok == res)
-    {
-        wstring_convert<codecvt_utf8<wchar_t>> cutf8;
-        std::string result = cutf8.to_bytes(wstring(wstr.data(), wstrEnd));       
-        resultobj = SWIG_FromCharPtrAndSize(result.c_str(), result.size()); 
-    }
-    else
-    {
-        std::string result;
-        resultobj = SWIG_FromCharPtrAndSize(result.c_str(), result.size()); 
-    }
+%include "ctp_typemaps.i"
+%include <std_string.i>
+// 报单模板由OrderTemplatePool创建和持有
+%nodefaultctor OrderTemplate;
+%nodefaultdtor OrderTemplate;
+// 模板持有池的引用，由下面的Python包装方法add/find设置
+%rename(_add) OrderTemplatePool::add;
+%rename(_find) OrderTemplatePool::find;
+%typemap(check) const OrderTemplate *tmpl {
+  if (!$1) {
+    SWIG_exception_fail(SWIG_ValueError, "tmpl must be an OrderTemplate");
+  }
 }
 %feature("director") CThostFtdcTraderSpi; 
 %ignore THOST_FTDC_VTC_BankBankToFuture;
@@ -45,6 +30,90 @@ const static locale g_loc("zh_CN.GB18030");
 %ignore THOST_FTDC_FTC_BrokerLaunchBankToBroker;
 %ignore THOST_FTDC_FTC_BankLaunchBrokerToBank;
 %ignore THOST_FTDC_FTC_BrokerLaunchBrokerToBank;  
+%include "thosttraderapi_generated.i"
 %include "ThostFtdcUserApiDataType.h"
 %include "ThostFtdcUserApiStruct.h" 
-%include "ThostFtdcTraderApi.h"
\ No newline at end of file
+%pythoncode %{
+_extend_structs(globals())
+%}
+%include "ThostFtdcTraderApi.h"
+%include "ctp_probe.h"
+%include "ctp_order.h"
+
+// 报单快速通道：调用期间保持GIL，避免释放后等待回调线程归还GIL
+%feature("docstring") CThostFtdcTraderApi::insert_order "
+按模板报单，只改写价格、数量、方向、开平、报单引用和请求编号
+:param tmpl: OrderTemplatePool登记的OrderTemplate
+:param direction: THOST_FTDC_D_Buy / THOST_FTDC_D_Sell
+:param offset: THOST_FTDC_OF_Open / THOST_FTDC_OF_Close / THOST_FTDC_OF_CloseToday等
+:return: 成功时为本次分配的报单引用（正数），失败时为ReqOrderInsert的返回码（负数）
+";
+%feature("docstring") CThostFtdcTraderApi::cancel_order "
+按模板撤单：给出order_sys_id时按交易所报单编号撤单，否则按报单引用撤单
+:param front_id: 报单所属的前置编号，0表示当前会话
+:param session_id: 报单所属的会话编号，0表示当前会话
+:return: ReqOrderAction的返回码
+";
+%feature("kwargs") CThostFtdcTraderApi::insert_order;
+%feature("kwargs") CThostFtdcTraderApi::cancel_order;
+%nothreadallow;
+%extend CThostFtdcTraderApi {
+  int insert_order(const OrderTemplate *tmpl, double price, int volume, char direction, char offset,
+                   int nRequestID = 0) {
+    return ctp_native::insert_order($self, tmpl, price, volume, direction, offset, nRequestID);
+  }
+  int cancel_order(const OrderTemplate *tmpl, int order_ref, const char *order_sys_id = "", int front_id = 0,
+                   int session_id = 0, int nRequestID = 0) {
+    return ctp_native::cancel_order($self, tmpl, order_ref, order_sys_id, front_id, session_id, nRequestID);
+  }
+}
+%clearnothreadallow;
+
+// Python方法由_extends挂到类上，代理类和-builtin构建均适用
+%pythoncode %{
+@_extends(OrderTemplatePool)
+class _OrderTemplatePool:
+    def add(self, field):
+        """登记报单模板（CThostFtdcInputOrderField），已登记时返回原模板"""
+        tmpl = self._add(field)
+        tmpl._pool = self
+        return tmpl
+
+    def find(self, investor_id, instrument_id, hedge_flag=THOST_FTDC_HF_Speculation):
+        """查找已登记的报单模板，不存在时返回None"""
+        tmpl = self._find(investor_id, instrument_id, hedge_flag)
+        if tmpl is not None:
+            tmpl._pool = self
+        return tmpl
+
+    def create(self, broker_id, investor_id, instrument_id, exchange_id, user_id=None,
+               hedge_flag=THOST_FTDC_HF_Speculation, **fields):
+        """
+        登记报单模板，固定字段默认为限价、当日有效、任意数量、立即触发、非强平
+        :param user_id: 默认与investor_id相同
+        :param fields: 其他CThostFtdcInputOrderField字段，如OrderPriceType、TimeCondition、InvestUnitID、MacAddress
+        :return: OrderTemplate，已登记时返回原模板
+        """
+        field = CThostFtdcInputOrderField()
+        field.BrokerID = broker_id
+        field.InvestorID = investor_id
+        field.UserID = user_id or investor_id
+        field.InstrumentID = instrument_id
+        field.ExchangeID = exchange_id
+        field.CombHedgeFlag = hedge_flag
+        field.OrderPriceType = THOST_FTDC_OPT_LimitPrice
+        field.TimeCondition = THOST_FTDC_TC_GFD
+        field.VolumeCondition = THOST_FTDC_VC_AV
+        field.MinVolume = 1
+        field.ContingentCondition = THOST_FTDC_CC_Immediately
+        field.ForceCloseReason = THOST_FTDC_FCC_NotForceClose
+        for name, value in fields.items():
+            setattr(field, name, value)
+        return self.add(field)
+
+    def start(self, rsp_user_login):
+        """按登录应答（CThostFtdcRspUserLoginField）设置会话和起始报单引用"""
+        max_order_ref = rsp_user_login.MaxOrderRef.strip()
+        self.set_session(rsp_user_login.FrontID, rsp_user_login.SessionID,
+                         int(max_order_ref) + 1 if max_order_ref.isdigit() else 1)
+%}